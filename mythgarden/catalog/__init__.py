@@ -0,0 +1,6 @@
+# registry has no module-level model imports, so it's safe to import from inside the models package
+from .registry import get_catalog, preload_catalog, reset_catalog, refresh_catalog_if_stale, bump_catalog_generation
+from .records import PlaceRecord, BridgeRecord, ItemRecord, MythlingRecord, VillagerRecord, DialogueLineRecord, \
+    KnowledgeRecord, AchievementRecord, ScheduledEventRecord
+from .catalog import Catalog
+from .artifact import write_artifact, read_artifact
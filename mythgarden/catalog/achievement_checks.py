@@ -0,0 +1,212 @@
+from ..models._constants import HIGH_SCORE, ALL_VILLAGERS_HEARTS, MULTIPLE_BEST_FRIENDS, BEST_FRIENDS, FAST_FRIENDS, \
+    STEADFAST_FRIENDS, BESTEST_FRIENDS, FASTEST_FRIENDS, STEADFASTEST_FRIENDS, GROSS_INCOME, FAST_CASH, \
+    BALANCED_INCOME, FARMING_INTAKE, MINING_INTAKE, FISHING_INTAKE, FORAGING_INTAKE, DISCOVER_MYTHEGG, FAST_MYTHEGG, \
+    MULTIPLE_MYTHEGGS
+
+# Each achievement's check is compiled once, when the catalog is built, into a closure with its threshold, villager
+# and/or mythegg already bound in. Checks take the state their trigger is checked with as keyword arguments (see
+# Achievement.check_triggered_achievements), and ignore whatever they don't need.
+#
+# Achievements for getting some count up to a threshold get a progress closure too, giving (current, target) from
+# counters the hero state keeps up as it goes -- their check is just whether the count has reached its target.
+
+
+def compile_achievement_check(achievement, achievement_ids_by_type):
+    """The check for whether the achievement has been completed, or one that never passes for an achievement type
+    with no check"""
+    progress = compile_achievement_progress(achievement, achievement_ids_by_type)
+    if progress is not None:
+        return compile_progress_check(progress)
+
+    compile_check = ACHIEVEMENT_CHECK_COMPILERS.get(achievement.achievement_type)
+    if compile_check is None:
+        return never
+
+    return compile_check(achievement)
+
+
+def compile_achievement_progress(achievement, achievement_ids_by_type):
+    """How far along the achievement is, as (current, target) -- or None for achievements that aren't about getting
+    a count up to a threshold"""
+    compile_progress = ACHIEVEMENT_PROGRESS_COMPILERS.get(achievement.achievement_type)
+    if compile_progress is None:
+        return None
+
+    return compile_progress(achievement, achievement_ids_by_type)
+
+
+def compile_progress_check(progress):
+    def check_progress(**state):
+        current, target = progress(**state)
+
+        return target > 0 and current >= target
+
+    return check_progress
+
+
+def never(**state):
+    return False
+
+
+# progress
+def compile_hero_state_progress(attr):
+    def compile_progress(achievement, achievement_ids_by_type):
+        threshold = achievement.threshold
+
+        def hero_state_progress(hero_state, **state):
+            return getattr(hero_state, attr), threshold
+
+        return hero_state_progress
+
+    return compile_progress
+
+
+def compile_all_villagers_hearts_progress(achievement, achievement_ids_by_type):
+    threshold = achievement.threshold
+
+    def all_villagers_hearts_progress(hero_state, villager_count, **state):
+        return hero_state.count_villagers_with_hearts(threshold), villager_count
+
+    return all_villagers_hearts_progress
+
+
+def compile_multiple_best_friends_progress(achievement, achievement_ids_by_type):
+    # (imported here, since the models package imports the catalog)
+    from ..models import VillagerState
+
+    threshold = achievement.threshold
+    bestie_hearts = VillagerState.TOTAL_TIERS  # only a villager at max affinity has every heart
+
+    def multiple_best_friends_progress(hero_state, **state):
+        return hero_state.count_villagers_with_hearts(bestie_hearts), threshold
+
+    return multiple_best_friends_progress
+
+
+def compile_balanced_income_progress(achievement, achievement_ids_by_type):
+    threshold = achievement.threshold
+
+    def balanced_income_progress(hero_state, **state):
+        min_income = min([
+            hero_state.farming_koin_earned,
+            hero_state.mining_koin_earned,
+            hero_state.fishing_koin_earned,
+            hero_state.foraging_koin_earned
+        ])
+
+        return min_income, threshold
+
+    return balanced_income_progress
+
+
+def compile_achievement_count_progress(counted_type):
+    """Progress towards earning so many achievements of a type, counted in the hero's earned achievements"""
+    def compile_progress(achievement, achievement_ids_by_type):
+        counted_ids = frozenset(achievement_ids_by_type.get(counted_type, ()))
+        threshold = achievement.threshold
+
+        def achievement_count_progress(earned_achievement_ids, **state):
+            return len(counted_ids & earned_achievement_ids), threshold
+
+        return achievement_count_progress
+
+    return compile_progress
+
+
+# checks
+def compile_best_friends(achievement):
+    villager_id = achievement.villager_id
+
+    def check_best_friends(villager_state, **state):
+        return villager_state.villager_id == villager_id and villager_state.is_bestie
+
+    return check_best_friends
+
+
+def compile_fast_friends(achievement):
+    villager_id = achievement.villager_id
+    threshold_day_number = achievement.threshold_day_number
+
+    def check_fast_friends(villager_state, clock, **state):
+        is_right_villager = villager_state.villager_id == villager_id
+
+        return is_right_villager and villager_state.is_bestie and clock.day_index <= threshold_day_number
+
+    return check_fast_friends
+
+
+def compile_steadfast_friends(achievement):
+    villager_id = achievement.villager_id
+    threshold = achievement.threshold
+
+    def check_steadfast_friends(villager_state, **state):
+        return villager_state.villager_id == villager_id and villager_state.talked_to_count == threshold
+
+    return check_steadfast_friends
+
+
+def compile_fast_cash(achievement):
+    threshold = achievement.threshold
+    threshold_day_number = achievement.threshold_day_number
+
+    def check_fast_cash(hero_state, clock, **state):
+        return hero_state.koin_earned >= threshold and clock.day_index <= threshold_day_number
+
+    return check_fast_cash
+
+
+def compile_discover_mythegg(achievement):
+    mythegg_id = achievement.mythegg_id
+
+    def check_discover_mythegg(mythegg, mythling_state, **state):
+        return mythegg.id == mythegg_id and mythling_state.has_been_found
+
+    return check_discover_mythegg
+
+
+def compile_fast_mythegg(achievement):
+    mythegg_id = achievement.mythegg_id
+    threshold_day_number = achievement.threshold_day_number
+
+    def check_fast_mythegg(mythegg, mythling_state, clock, **state):
+        is_right_mythegg = mythegg_id is None or mythegg.id == mythegg_id
+
+        return is_right_mythegg and mythling_state.has_been_found and clock.day_index <= threshold_day_number
+
+    return check_fast_mythegg
+
+
+ACHIEVEMENT_PROGRESS_COMPILERS = {
+    # trigger_type SCORE_POINTS
+    HIGH_SCORE: compile_hero_state_progress('score'),
+    # trigger_type GAIN_HEARTS
+    ALL_VILLAGERS_HEARTS: compile_all_villagers_hearts_progress,
+    MULTIPLE_BEST_FRIENDS: compile_multiple_best_friends_progress,
+    # trigger_type GAIN_ACHIEVEMENT
+    BESTEST_FRIENDS: compile_achievement_count_progress(BEST_FRIENDS),
+    FASTEST_FRIENDS: compile_achievement_count_progress(FAST_FRIENDS),
+    STEADFASTEST_FRIENDS: compile_achievement_count_progress(STEADFAST_FRIENDS),
+    # trigger_type EARN_MONEY
+    GROSS_INCOME: compile_hero_state_progress('koin_earned'),
+    BALANCED_INCOME: compile_balanced_income_progress,
+    # trigger_types HARVEST & GATHER
+    FARMING_INTAKE: compile_hero_state_progress('farming_intake'),
+    MINING_INTAKE: compile_hero_state_progress('mining_intake'),
+    FISHING_INTAKE: compile_hero_state_progress('fishing_intake'),
+    FORAGING_INTAKE: compile_hero_state_progress('foraging_intake'),
+    # trigger_type FIND_MYTHEGG
+    MULTIPLE_MYTHEGGS: compile_hero_state_progress('mytheggs_found'),
+}
+
+ACHIEVEMENT_CHECK_COMPILERS = {
+    # trigger_type GAIN_HEARTS
+    BEST_FRIENDS: compile_best_friends,
+    FAST_FRIENDS: compile_fast_friends,
+    # trigger_type TALKED_TO_VILLAGERS
+    STEADFAST_FRIENDS: compile_steadfast_friends,
+    # trigger_type EARN_MONEY
+    FAST_CASH: compile_fast_cash,
+    # trigger_type FIND_MYTHEGG
+    DISCOVER_MYTHEGG: compile_discover_mythegg,
+    FAST_MYTHEGG: compile_fast_mythegg,
+}
@@ -0,0 +1,46 @@
+import marshal
+import mmap
+import os
+
+# bump the version suffix whenever the snapshot layout changes, so old artifacts are ignored instead of misread
+MAGIC = b'MYTHCAT1'
+
+
+def write_artifact(path, snapshot):
+    """Compile a catalog snapshot into a binary file: a magic header followed by the marshalled rows.
+    Written to a temp file and swapped in, so running workers never see a half-written artifact."""
+    tmp_path = f'{path}.tmp'
+
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        marshal.dump(snapshot, f)
+
+    os.replace(tmp_path, path)
+
+
+def read_artifact(path):
+    """Memory-map a compiled artifact and decode its snapshot, or return None if it's missing or unreadable (empty,
+    truncated, or not an artifact at all). Mapping the file just saves copying it into a read buffer first -- decoding
+    still builds the whole snapshot as fresh objects in this process (see preload_catalog for sharing those)."""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+
+    with f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):  # an empty file can't be mapped
+            return None
+
+        with mm:
+            if mm[:len(MAGIC)] != MAGIC:
+                return None
+
+            with memoryview(mm) as buffer:
+                try:
+                    snapshot = marshal.loads(buffer[len(MAGIC):])
+                except (EOFError, ValueError, TypeError):
+                    return None
+
+    return snapshot if isinstance(snapshot, dict) else None
@@ -0,0 +1,613 @@
+import bisect
+import heapq
+import json
+from collections import defaultdict
+from types import MappingProxyType
+
+from .achievement_checks import compile_achievement_check, compile_achievement_progress
+from .growth import GROWTH_TRANSITIONS, next_growth_stage_fields
+from .luck import LUCK_LEVELS, get_luck_level, get_rarity_weights
+from .sampling import AliasTable
+from .records import PlaceRecord, BridgeRecord, ItemRecord, MythlingRecord, VillagerRecord, DialogueLineRecord, \
+    KnowledgeRecord, AchievementRecord, ScheduledEventRecord
+from ..models._constants import HOME, TRAVEL_MINUTES, ENTER_EXIT_MINUTES, DAYS_OF_WEEK, MINUTES_IN_A_DAY, \
+    MINUTES_IN_A_WEEK, SEED, SPROUT, CROP, RARITIES
+
+
+def freeze(mapping):
+    return MappingProxyType(dict(mapping))
+
+
+def freeze_groups(groups):
+    return MappingProxyType({key: tuple(values) for key, values in groups.items()})
+
+
+class Catalog:
+    """An immutable, id-indexed view of all world content (places, items, villagers, dialogue, events, etc).
+    Built from a snapshot of plain rows (see loader.load_snapshot), so it never touches the database itself."""
+
+    def __init__(self, snapshot):
+        self.generation = snapshot['generation']
+        self.default_place_id = snapshot['default_place_id']
+
+        self.__build_places(snapshot)
+        self.__build_items(snapshot)
+        self.__build_villagers(snapshot)
+        self.__build_dialogue_lines(snapshot)
+        self.__build_knowledge(snapshot)
+        self.__build_achievements(snapshot)
+        self.__build_events(snapshot)
+
+    # lookups
+    @property
+    def default_place(self):
+        return self.places[self.default_place_id]
+
+    def bridges_for(self, place_id):
+        return self._bridges_by_place.get(place_id, ())
+
+    def buildings_in(self, place_id):
+        return self._buildings_by_surround.get(place_id, ())
+
+    def neighbors_of(self, place_id):
+        """The places one hop away (across a bridge, or in/out of a building), as (place_id, minutes) pairs"""
+        return self._neighbors.get(place_id, ())
+
+    def route(self, from_place_id, to_place_id):
+        """The places passed through on the quickest way from one place to another, ending with the destination
+        (so it's empty if they're the same place, or there's no way between them)"""
+        route = []
+        place_id = from_place_id
+
+        while place_id != to_place_id and (place_id, to_place_id) in self._next_hops:
+            place_id = self._next_hops[(place_id, to_place_id)]
+            route.append(place_id)
+
+        return tuple(route)
+
+    def travel_minutes(self, from_place_id, to_place_id):
+        """How long the quickest way from one place to another takes (before any speed boost), or None if there's
+        no way between them"""
+        return self._travel_minutes.get((from_place_id, to_place_id))
+
+    def events_between(self, from_minute, to_minute):
+        """The events due after one minute of the week, up to and including another later one, in the order they
+        should be triggered (chronologically, with a one-day event going after a daily one at the same time)"""
+        week_minutes, events = self._event_timeline
+        from_minute, to_minute = from_minute % MINUTES_IN_A_WEEK, to_minute % MINUTES_IN_A_WEEK
+
+        start = bisect.bisect_right(week_minutes, from_minute)
+        end = bisect.bisect_right(week_minutes, to_minute)
+
+        if to_minute < from_minute:
+            # across the end of the week, into the next one
+            return list(events[start:] + events[:end])
+
+        return list(events[start:end])
+
+    def villager_location_id(self, villager_id, minute, villagers_move=True):
+        """Where the villager's schedule has them at the given minute of the week (a place id, or None if they're out
+        and about) -- or at home all week, if villagers don't move (except for the ones who always do)"""
+        villager = self.villagers[villager_id]
+        home_id = villager.home.id if villager.home else None
+
+        if not villagers_move and not villager.always_moves:
+            return home_id
+
+        week_minutes, place_ids = self._villager_schedules.get(villager_id, ((), ()))
+        index = bisect.bisect_right(week_minutes, minute)
+
+        return place_ids[index - 1] if index > 0 else home_id
+
+    def villager_next_move(self, villager_id, minute, villagers_move=True):
+        """When & where the villager's schedule next moves them after the given minute of the week, as a
+        (minute, place id) pair -- or None if they're staying put for the rest of the week"""
+        if not villagers_move and not self.villagers[villager_id].always_moves:
+            return None
+
+        week_minutes, place_ids = self._villager_schedules.get(villager_id, ((), ()))
+        index = bisect.bisect_right(week_minutes, minute)
+
+        if index == len(week_minutes):
+            return None
+
+        return week_minutes[index], place_ids[index]
+
+    def item_pool(self, place_id):
+        return self._item_pools.get(place_id, ())
+
+    def draw_from_item_pool(self, place_id, luck_level):
+        """A random item from the place's item pool: weighted by rarity (modulated by the hero's luck level), then
+        each item type of that rarity equally likely, then each item of that type"""
+        rarity_table = self._gather_rarity_tables[place_id][get_luck_level(luck_level)]
+
+        if rarity_table is None:
+            raise ValueError(f'No items found in location {self.places[place_id].name} of any rarity')
+
+        return self._gather_item_tables[place_id][rarity_table.draw()].draw()
+
+    def gather_rarity_odds(self, place_id, luck_level):
+        """The chance of each rarity coming up when gathering at the place, as draw_from_item_pool draws them --
+        rarities the pool has nothing of never come up"""
+        rarity_table = self._gather_rarity_tables[place_id][get_luck_level(luck_level)]
+
+        return {rarity: rarity_table.probability_of(rarity) if rarity_table else 0 for rarity in RARITIES}
+
+    def mythegg_at(self, place_id):
+        return self._mytheggs_by_source_location.get(place_id)
+
+    def mythegg_knowledge_ids(self, mythegg_id):
+        """The ids of the knowledge that tells the hero about the mythegg (there's normally just the one)"""
+        return self._knowledge_ids_by_mythegg.get(mythegg_id, ())
+
+    def knowledge_keys_for(self, knowledge_ids):
+        """The keys (see KnowledgeRecord.key) of whichever of the knowledge tells about item prices or villager
+        preferences"""
+        knowledge_keys = (self._knowledge_keys.get(knowledge_id) for knowledge_id in knowledge_ids)
+
+        return {key for key in knowledge_keys if key is not None}
+
+    def get_mythling(self, mythling_type):
+        return self.mythlings_by_type[mythling_type]
+
+    def get_item_by_name(self, name):
+        return self.items_by_name[name]
+
+    def next_growth_stage_id(self, item_id, days_growing, advanced_crops, grow_golden_crops):
+        """The id of the item a watered seed/sprout grows into overnight (or None if the content is missing it).
+        Basic crops go seed -> sprout -> crop a day at a time, while advanced ones stay sprouts until they've been
+        growing for the item's growth_days; only crops come out golden."""
+        item = self.items[item_id]
+
+        if advanced_crops:
+            next_type = CROP if days_growing >= item.growth_days else SPROUT
+        else:
+            next_type = SPROUT if item.item_type == SEED else CROP
+
+        return self._growth_transitions.get((item_id, next_type, grow_golden_crops and next_type == CROP))
+
+    def items_of(self, item_type, rarity):
+        return self._items_by_type_and_rarity.get((item_type, rarity), ())
+
+    def get_dialogue(self, villager_id, trigger, affinity_tier=None):
+        try:
+            return self._dialogue_by_key[(villager_id, trigger, affinity_tier)]
+        except KeyError:
+            villager_name = self.villagers[villager_id].name
+            raise KeyError(f'no dialogue for {villager_name} with trigger {trigger} and affinity tier {affinity_tier}')
+
+    def achievements_triggered_by(self, trigger_type):
+        return self._achievements_by_trigger.get(trigger_type, ())
+
+    def achievement_checks_for(self, trigger_type):
+        """The (achievement, check) pairs for the achievements the trigger type can complete, with each check
+        compiled ahead of time (see achievement_checks)"""
+        return self._achievement_checks_by_trigger.get(trigger_type, ())
+
+    def achievement_progress_for(self, achievement_id):
+        """How far along the achievement is, as (current, threshold) from the state it's given -- or None, for
+        achievements that aren't about getting a count up to a threshold"""
+        return self._achievement_progress.get(achievement_id)
+
+    def achievements_for_ids(self, achievement_ids):
+        return [self.achievements[achievement_id] for achievement_id in sorted(achievement_ids)]
+
+    # builders
+    def __build_places(self, snapshot):
+        buildings = {row['place_ptr_id']: row for row in snapshot['buildings']}
+
+        item_pools = defaultdict(list)
+        for place_id, item_id in snapshot['place_item_pools']:
+            item_pools[place_id].append(item_id)
+
+        arrows = defaultdict(list)
+        for row in sorted(snapshot['bridges'], key=lambda r: r['id']):
+            arrows[row['place_1_id']].append((row['direction_2'], row['place_2_id']))
+        for row in sorted(snapshot['bridges'], key=lambda r: r['id']):
+            arrows[row['place_2_id']].append((row['direction_1'], row['place_1_id']))
+
+        places = {}
+
+        # surrounds have to exist before the buildings that point at them
+        pending = sorted(snapshot['places'], key=lambda r: r['id'])
+        while pending:
+            deferred = []
+
+            for row in pending:
+                building = buildings.get(row['id'])
+                if building and building['surround_id'] not in places:
+                    deferred.append(row)
+                    continue
+
+                places[row['id']] = self.__make_place(row, building, places, item_pools, arrows)
+
+            if len(deferred) == len(pending):
+                raise ValueError(f'Buildings with unknown surrounds: {[row["name"] for row in deferred]}')
+
+            pending = deferred
+
+        self.places = freeze(places)
+        self.places_by_name = freeze({place.name: place for place in places.values()})
+
+        buildings_by_surround = defaultdict(list)
+        for place in sorted(places.values(), key=lambda p: p.name):
+            if place.is_building:
+                buildings_by_surround[place.surround.id].append(place)
+        self._buildings_by_surround = freeze_groups(buildings_by_surround)
+
+        bridges = {}
+        bridges_by_place = defaultdict(list)
+        for row in sorted(snapshot['bridges'], key=lambda r: r['id']):
+            bridge = BridgeRecord(
+                id=row['id'],
+                place_1=places[row['place_1_id']],
+                place_2=places[row['place_2_id']],
+                direction_1=row['direction_1'],
+                direction_2=row['direction_2'],
+            )
+            bridges[bridge.id] = bridge
+            bridges_by_place[bridge.place_1_id].append(bridge)
+            bridges_by_place[bridge.place_2_id].append(bridge)
+
+        self.bridges = freeze(bridges)
+        self._bridges_by_place = freeze_groups(bridges_by_place)
+
+        self.__build_place_graph()
+
+    def __build_place_graph(self):
+        """Precomputes the quickest route between every pair of places (there are only a handful, so one
+        Dijkstra per place is plenty), stored as the next hop to take & total minutes for each pair."""
+        neighbors = defaultdict(list)
+
+        for bridge in self.bridges.values():
+            neighbors[bridge.place_1_id].append((bridge.place_2_id, TRAVEL_MINUTES))
+            neighbors[bridge.place_2_id].append((bridge.place_1_id, TRAVEL_MINUTES))
+
+        for place in self.places.values():
+            if place.is_building:
+                neighbors[place.surround.id].append((place.id, ENTER_EXIT_MINUTES))
+                neighbors[place.id].append((place.surround.id, ENTER_EXIT_MINUTES))
+
+        self._neighbors = freeze_groups({place_id: sorted(pairs) for place_id, pairs in neighbors.items()})
+
+        next_hops = {}
+        travel_minutes = {}
+
+        for origin_id in sorted(self.places):
+            # (minutes so far, place id, first hop taken) -- ties go to the lowest ids, so routes are stable
+            queue = [(0, origin_id, None)]
+            visited = set()
+
+            while queue:
+                minutes, place_id, first_hop = heapq.heappop(queue)
+                if place_id in visited:
+                    continue
+
+                visited.add(place_id)
+                travel_minutes[(origin_id, place_id)] = minutes
+                if first_hop is not None:
+                    next_hops[(origin_id, place_id)] = first_hop
+
+                for neighbor_id, hop_minutes in self._neighbors.get(place_id, ()):
+                    if neighbor_id not in visited:
+                        hop = neighbor_id if first_hop is None else first_hop
+                        heapq.heappush(queue, (minutes + hop_minutes, neighbor_id, hop))
+
+        self._next_hops = freeze(next_hops)
+        self._travel_minutes = freeze(travel_minutes)
+
+    def __make_place(self, row, building, places, item_pools, arrows):
+        fields = dict(
+            id=row['id'],
+            name=row['name'],
+            image_path=row['image_path'],
+            place_type=row['place_type'],
+            has_inventory=row['has_inventory'],
+            item_pool_ids=tuple(item_pools.get(row['id'], ())),
+            arrows=tuple(arrows.get(row['id'], ())),
+        )
+
+        if building:
+            fields.update(
+                surround=places[building['surround_id']],
+                over=building['over'],
+                down=building['down'],
+                opening_time=building['opening_time'],
+                closing_time=building['closing_time'],
+                is_farmhouse=building['surround_id'] == self.default_place_id and row['place_type'] == HOME,
+            )
+
+        return PlaceRecord(**fields)
+
+    def __build_items(self, snapshot):
+        mythlings = {row['item_ptr_id']: row for row in snapshot['mythlings']}
+
+        items = {}
+        for row in snapshot['items']:
+            mythling = mythlings.get(row['id'])
+
+            if mythling:
+                items[row['id']] = MythlingRecord(
+                    **row,
+                    mythling_type=mythling['mythling_type'],
+                    growth_stage=mythling['growth_stage'],
+                    acquisition_increase_step=mythling['acquisition_increase_step'],
+                    image_path=mythling['image_path'],
+                    favorite_soil_id=mythling['favorite_soil_id'],
+                    special_response_villager_id=mythling['special_response_villager_id'],
+                    source_location_id=mythling['source_location_id'],
+                )
+            else:
+                items[row['id']] = ItemRecord(**row)
+
+        self.items = freeze(items)
+        self.items_by_name = freeze({item.name: item for item in items.values()})
+
+        all_mythlings = [item for item in items.values() if isinstance(item, MythlingRecord)]
+        self.mythlings = freeze({mythling.id: mythling for mythling in all_mythlings})
+        self.mythlings_by_type = freeze({mythling.mythling_type: mythling for mythling in all_mythlings})
+        self._mytheggs_by_source_location = freeze({
+            mythling.source_location_id: mythling for mythling in all_mythlings if mythling.source_location_id
+        })
+
+        items_by_type_and_rarity = defaultdict(list)
+        for item in sorted(items.values(), key=lambda i: i.name):
+            items_by_type_and_rarity[(item.item_type, item.rarity)].append(item)
+        self._items_by_type_and_rarity = freeze_groups(items_by_type_and_rarity)
+
+        self._item_pools = freeze({
+            place.id: tuple(items[item_id] for item_id in place.item_pool_ids) for place in self.places.values()
+        })
+
+        self.__build_growth_transitions()
+        self.__build_gather_samplers()
+
+    def __build_gather_samplers(self):
+        """Sets up alias tables for gathering from each place's item pool, so a draw takes constant time: one per
+        rarity in the pool, over its items (each item type equally likely, then each item of that type), and one per
+        luck level over the rarities the pool has any items of -- which gives the same odds as drawing a rarity out of
+        all of them, and drawing again whenever the pool has none of it."""
+        item_tables = {}
+        rarity_tables = {}
+        rarity_tables_by_rarities = {}
+
+        for place_id, item_pool in self._item_pools.items():
+            items_by_rarity_and_type = defaultdict(lambda: defaultdict(list))
+            for item in item_pool:
+                items_by_rarity_and_type[item.rarity][item.item_type].append(item)
+
+            item_tables[place_id] = {
+                rarity: AliasTable(
+                    [item for items in items_by_type.values() for item in items],
+                    [1 / len(items_by_type) / len(items) for items in items_by_type.values() for item in items],
+                )
+                for rarity, items_by_type in items_by_rarity_and_type.items()
+            }
+
+            # the odds only depend on which rarities there are, so places with the same ones share their tables
+            rarities = tuple(rarity for rarity in RARITIES if rarity in items_by_rarity_and_type)
+            if rarities not in rarity_tables_by_rarities:
+                rarity_tables_by_rarities[rarities] = tuple(
+                    self.__make_rarity_table(rarities, luck_level) for luck_level in LUCK_LEVELS
+                )
+
+            rarity_tables[place_id] = rarity_tables_by_rarities[rarities]
+
+        self._gather_item_tables = freeze(item_tables)
+        self._gather_rarity_tables = freeze(rarity_tables)
+
+    def __make_rarity_table(self, rarities, luck_level):
+        weights = get_rarity_weights(luck_level)
+
+        try:
+            return AliasTable(rarities, [weights[rarity] for rarity in rarities])
+        except ValueError:
+            # nothing in the pool has any chance of coming up
+            return None
+
+    def __build_growth_transitions(self):
+        """Works out, for every seed & sprout, which item it grows into as a sprout, a crop & a golden crop, so that
+        growing the farm overnight is a dict lookup rather than string surgery on names & a database round trip.
+        Stages missing from the content are left out (Item.objects.create_growth_stages fills them in)."""
+        transitions = {}
+
+        for item in self.items.values():
+            if item.item_type not in [SEED, SPROUT]:
+                continue
+
+            for next_type, grow_golden_crops in GROWTH_TRANSITIONS:
+                next_item = self.items_by_name.get(next_growth_stage_fields(item, next_type, grow_golden_crops)['name'])
+
+                if next_item:
+                    transitions[(item.id, next_type, grow_golden_crops)] = next_item.id
+
+        self._growth_transitions = freeze(transitions)
+
+    def __build_villagers(self, snapshot):
+        preferences = defaultdict(list)
+        for villager_id, item_type, valence in sorted(snapshot['villager_preferences']):
+            preferences[villager_id].append((item_type, valence))
+
+        villagers = {}
+        for row in sorted(snapshot['villagers'], key=lambda r: r['name']):
+            villagers[row['id']] = VillagerRecord(
+                id=row['id'],
+                name=row['name'],
+                full_name=row['full_name'],
+                description=row['description'],
+                friendliness=row['friendliness'],
+                image_path=row['image_path'],
+                home=self.places.get(row['home_id']),
+                preferences=tuple(preferences.get(row['id'], ())),
+            )
+
+        self.villagers = freeze(villagers)
+
+    def __build_dialogue_lines(self, snapshot):
+        dialogue_lines = {}
+        dialogue_by_key = {}
+
+        for row in sorted(snapshot['dialogue_lines'], key=lambda r: r['id']):
+            line = DialogueLineRecord(
+                id=row['id'],
+                speaker=self.villagers[row['speaker_id']],
+                affinity_tier=row['affinity_tier'],
+                trigger=row['trigger'],
+                full_text=row['full_text'],
+            )
+            dialogue_lines[line.id] = line
+            # first line wins, same as the .get() this replaces would have (minus the MultipleObjectsReturned)
+            dialogue_by_key.setdefault((line.speaker_id, line.trigger, line.affinity_tier), line)
+
+        self.dialogue_lines = freeze(dialogue_lines)
+        self._dialogue_by_key = freeze(dialogue_by_key)
+
+    def __build_knowledge(self, snapshot):
+        subclass_fields = {}
+        for table in ['item_knowledge', 'villager_knowledge', 'mythegg_knowledge', 'mythling_power_knowledge']:
+            for row in snapshot[table]:
+                fields = dict(row)
+                subclass_fields[fields.pop('knowledge_ptr_id')] = fields
+
+        knowledge = {}
+        for row in sorted(snapshot['knowledge'], key=lambda r: r['id']):
+            knowledge[row['id']] = KnowledgeRecord(**row, **subclass_fields.get(row['id'], {}))
+
+        self.knowledge = freeze(knowledge)
+
+        knowledge_ids_by_mythegg = defaultdict(list)
+        for knowledge_record in self.knowledge.values():
+            if knowledge_record.mythegg_id:
+                knowledge_ids_by_mythegg[knowledge_record.mythegg_id].append(knowledge_record.id)
+        self._knowledge_ids_by_mythegg = freeze_groups(knowledge_ids_by_mythegg)
+
+        self._knowledge_keys = freeze({
+            knowledge_record.id: knowledge_record.key for knowledge_record in self.knowledge.values()
+            if knowledge_record.key is not None
+        })
+
+    def __build_achievements(self, snapshot):
+        unlocked_knowledge = defaultdict(list)
+        for knowledge in self.knowledge.values():
+            unlocked_knowledge[knowledge.unlocking_achievement_id].append(knowledge)
+
+        achievements = {}
+        achievements_by_trigger = defaultdict(list)
+
+        for row in sorted(snapshot['achievements'], key=lambda r: r['id']):
+            knowledge = unlocked_knowledge.get(row['id'], [])
+
+            achievement = AchievementRecord(
+                **row,
+                unlocked_knowledge_ids=tuple(k.id for k in knowledge),
+                unlocked_knowledge_names=tuple(sorted(set(k.display_name for k in knowledge))),
+            )
+            achievements[achievement.id] = achievement
+            achievements_by_trigger[achievement.trigger_type].append(achievement)
+
+        self.achievements = freeze(achievements)
+        self._achievements_by_trigger = freeze_groups(achievements_by_trigger)
+
+        achievement_ids_by_type = defaultdict(list)
+        for achievement in achievements.values():
+            achievement_ids_by_type[achievement.achievement_type].append(achievement.id)
+
+        progress_by_id = {}
+        for achievement in achievements.values():
+            progress = compile_achievement_progress(achievement, achievement_ids_by_type)
+            if progress is not None:
+                progress_by_id[achievement.id] = progress
+        self._achievement_progress = freeze(progress_by_id)
+
+        self._achievement_checks_by_trigger = freeze({
+            trigger_type: tuple(
+                (achievement, compile_achievement_check(achievement, achievement_ids_by_type))
+                for achievement in trigger_achievements
+            )
+            for trigger_type, trigger_achievements in achievements_by_trigger.items()
+        })
+
+    def __build_events(self, snapshot):
+        shop_events = {row['scheduledevent_ptr_id']: row for row in snapshot['populate_shop_events']}
+        villager_events = {row['scheduledevent_ptr_id']: row for row in snapshot['villager_appears_events']}
+
+        events = {}
+        for row in snapshot['scheduled_events']:
+            fields = dict(row)
+
+            shop_event = shop_events.get(row['id'])
+            if shop_event:
+                content_configs = shop_event['content_config_list']
+                if isinstance(content_configs, str):
+                    content_configs = json.loads(content_configs)
+
+                fields.update(
+                    shop=self.places[shop_event['shop_id']],
+                    content_configs=tuple(MappingProxyType(config) for config in content_configs),
+                )
+
+            villager_event = villager_events.get(row['id'])
+            if villager_event:
+                fields.update(
+                    villager=self.villagers[villager_event['villager_id']],
+                    place=self.places.get(villager_event['place_id']),
+                )
+
+            events[row['id']] = ScheduledEventRecord(**fields)
+
+        self.events = freeze(events)
+
+        # ordered by time, then is_daily=True, then is_daily=False, so that a one-day event can "overwrite"
+        # a daily one at the same time
+        self.ordered_events = tuple(sorted(events.values(), key=lambda e: (e.time, not e.is_daily, e.id)))
+
+        self.__build_event_timeline()
+        self.__build_villager_schedules()
+
+    def __build_event_timeline(self):
+        """Lays the events out on one timeline for the whole week (each day's events, plus the daily ones again),
+        with a parallel tuple of the minutes into the week they're due to bisect, so that finding the events in a
+        window of time is a single range lookup rather than a scan"""
+        timeline = []
+
+        for day_index, (day, _) in enumerate(DAYS_OF_WEEK):
+            start_of_day = day_index * MINUTES_IN_A_DAY
+            timeline += [
+                (start_of_day + event.time, event) for event in self.ordered_events if event.is_daily or event.day == day
+            ]
+
+        self._event_timeline = (tuple(minute for minute, _ in timeline), tuple(event for _, event in timeline))
+
+    def __build_villager_schedules(self):
+        """Compiles the villager appears events into a timeline per villager, of the minutes into the week when they
+        move & the place they move to (None meaning they're out), so finding them at any point is a binary search.
+        Replays the events the same way triggering them does: in order, later ones winning ties."""
+        moves = defaultdict(list)
+
+        for week_minute, event in zip(*self._event_timeline):
+            if event.villager is None:
+                continue
+
+            villager_moves = moves[event.villager.id]
+
+            if villager_moves and villager_moves[-1][0] == week_minute:
+                villager_moves.pop()
+
+            villager_moves.append((week_minute, event.place.id if event.place else None))
+
+        schedules = {}
+        for villager_id, villager_moves in moves.items():
+            home = self.villagers[villager_id].home
+            place_id = home.id if home else None
+            week_minutes, place_ids = [], []
+
+            # only keep the events that actually move them somewhere new
+            for week_minute, next_place_id in villager_moves:
+                if next_place_id != place_id:
+                    week_minutes.append(week_minute)
+                    place_ids.append(next_place_id)
+                    place_id = next_place_id
+
+            schedules[villager_id] = (tuple(week_minutes), tuple(place_ids))
+
+        self._villager_schedules = freeze(schedules)
@@ -0,0 +1,72 @@
+from ..models._constants import ITEM_TYPES, SEED, SPROUT, CROP, CROP_PROFIT_MULTIPLIER, GOLD_CROP_PREFIX, \
+    GOLD_CROP_PROFIT_MULTIPLIER, RARITIES, RARITY_TO_INDEX
+
+# the stages a plant can grow into, and whether they can come out golden
+GROWTH_TRANSITIONS = [(SPROUT, False), (CROP, False), (CROP, True)]
+
+
+def next_growth_stage_fields(item, next_type, grow_golden_crops):
+    """The fields of the item that a seed/sprout grows into at the given type. Works on anything with an item's
+    fields -- a model, a catalog record, or the historical model in a migration -- and never touches the database."""
+    return {
+        'name': next_name(item, next_type, grow_golden_crops),
+        'item_type': next_type,
+        'price': next_price(item, next_type, grow_golden_crops),
+        'rarity': next_rarity(item, next_type, grow_golden_crops),
+        'growth_days': item.growth_days,
+        'effort_time': item.effort_time,
+    }
+
+
+def growth_stage_closure(items):
+    """The fields of every item the given items can grow into (seed -> sprout -> crop, golden or not), once each"""
+    stages = {}
+
+    for item in items:
+        if item.item_type not in [SEED, SPROUT]:
+            continue
+
+        for next_type, grow_golden_crops in GROWTH_TRANSITIONS:
+            fields = next_growth_stage_fields(item, next_type, grow_golden_crops)
+            stages.setdefault(fields['name'], fields)
+
+    # a sprout grows into the same crops as its seed, so there's no need to go round again
+    return list(stages.values())
+
+
+def next_name(item, next_type, grow_golden_crops):
+    # could have some Item.name validation that ensures that the name ends with the item type for seed/sprout/crop
+    # e.g. Parsnip Seed -> Parsnip Sprout -> Parsnip
+
+    curr_type_name = dict(ITEM_TYPES)[item.item_type]
+    next_type_name = dict(ITEM_TYPES)[next_type]
+
+    if next_type == CROP:
+        crop_name = item.name.replace(f' {curr_type_name}', '')
+        if grow_golden_crops:
+            return f'{GOLD_CROP_PREFIX} {crop_name.split()[-1]}'
+        else:
+            return crop_name
+    else:
+        return item.name.replace(curr_type_name, next_type_name)
+
+
+def next_price(item, next_type, grow_golden_crops):
+    # seed -> sprout is mostly irrelevant, so goal is to make seed -> crop hit the CROP_PROFIT_MULTIPLIER
+    # let's be ridiculous and say that seeds and sprouts are =, and then you multiply when you get to the crop
+
+    if next_type == CROP:
+        if grow_golden_crops:
+            return item.price * GOLD_CROP_PROFIT_MULTIPLIER
+        else:
+            return item.price * CROP_PROFIT_MULTIPLIER
+    else:
+        return item.price
+
+
+def next_rarity(item, next_type, grow_golden_crops):
+    if next_type == CROP and grow_golden_crops:
+        # rarity += 1
+        return RARITIES[RARITY_TO_INDEX[item.rarity] + 1]
+    else:
+        return item.rarity
@@ -0,0 +1,78 @@
+from .artifact import read_artifact
+from ..models import CatalogGeneration, Place, Building, Bridge, Item, Mythling, Villager, DialogueLine, Achievement, Knowledge, \
+    ItemKnowledge, VillagerKnowledge, MytheggKnowledge, MythlingPowerKnowledge, ScheduledEvent, PopulateShopEvent, \
+    VillagerAppearsEvent
+
+
+def load_snapshot():
+    """Read all world content out of the database as plain rows (dicts & tuples), ready to build a Catalog from."""
+    # this can create the default place, which bumps the generation, so it has to come first
+    default_place_id = Place.get_default_pk()
+
+    return {
+        # read the generation before the content, so an edit that lands mid-load just triggers another reload
+        'generation': CatalogGeneration.get_current(),
+        'default_place_id': default_place_id,
+        'places': list(Place.objects.order_by('pk').values('id', 'name', 'image_path', 'place_type', 'has_inventory')),
+        'buildings': list(Building.objects.order_by('pk').values(
+            'place_ptr_id', 'surround_id', 'over', 'down', 'opening_time', 'closing_time'
+        )),
+        'place_item_pools': list(Place.item_pool.through.objects.order_by('pk').values_list('place_id', 'item_id')),
+        'bridges': list(Bridge.objects.order_by('pk').values(
+            'id', 'place_1_id', 'place_2_id', 'direction_1', 'direction_2'
+        )),
+        'items': list(Item.objects.order_by('pk').values(
+            'id', 'name', 'item_type', 'price', 'rarity', 'growth_days', 'effort_time'
+        )),
+        'mythlings': list(Mythling.objects.order_by('pk').values(
+            'item_ptr_id', 'mythling_type', 'growth_stage', 'acquisition_increase_step', 'image_path',
+            'favorite_soil_id', 'special_response_villager_id', 'source_location_id'
+        )),
+        'villagers': list(Villager.objects.order_by('pk').values(
+            'id', 'name', 'full_name', 'description', 'friendliness', 'image_path', 'home_id'
+        )),
+        'villager_preferences': list(Villager.item_type_preferences.through.objects.order_by('pk').values_list(
+            'villager_id', 'itemtypepreference__item_type', 'itemtypepreference__valence'
+        )),
+        'dialogue_lines': list(DialogueLine.objects.order_by('pk').values(
+            'id', 'speaker_id', 'affinity_tier', 'trigger', 'full_text'
+        )),
+        'achievements': list(Achievement.objects.order_by('pk').values(
+            'id', 'name', 'description', 'achievement_type', 'trigger_type', 'threshold', 'threshold_day_number',
+            'villager_id', 'mythegg_id'
+        )),
+        'knowledge': list(Knowledge.objects.order_by('pk').values(
+            'id', 'unlocking_achievement_id', 'display_name', 'knowledge_type'
+        )),
+        'item_knowledge': list(ItemKnowledge.objects.order_by('pk').values('knowledge_ptr_id', 'item_type', 'rarity')),
+        'villager_knowledge': list(VillagerKnowledge.objects.order_by('pk').values(
+            'knowledge_ptr_id', 'villager_id', 'valence'
+        )),
+        'mythegg_knowledge': list(MytheggKnowledge.objects.order_by('pk').values('knowledge_ptr_id', 'mythegg_id')),
+        'mythling_power_knowledge': list(MythlingPowerKnowledge.objects.order_by('pk').values(
+            'knowledge_ptr_id', 'mythling_id'
+        )),
+        'scheduled_events': list(ScheduledEvent.objects.order_by('pk').values(
+            'id', 'day', 'is_daily', 'time', 'event_type'
+        )),
+        'populate_shop_events': list(PopulateShopEvent.objects.order_by('pk').values(
+            'scheduledevent_ptr_id', 'shop_id', 'content_config_list'
+        )),
+        'villager_appears_events': list(VillagerAppearsEvent.objects.order_by('pk').values(
+            'scheduledevent_ptr_id', 'villager_id', 'place_id'
+        )),
+    }
+
+
+def load_compiled_snapshot(path):
+    """Read a snapshot from a compiled artifact (see the compile_catalog command), as long as it was compiled
+    from the current generation of world content. Returns None if there's no usable artifact."""
+    if not path:
+        return None
+
+    snapshot = read_artifact(path)
+
+    if snapshot is None or snapshot.get('generation') != CatalogGeneration.get_current():
+        return None
+
+    return snapshot
@@ -0,0 +1,54 @@
+from ..models._constants import COMMON, UNCOMMON, RARE, EPIC, MYTHIC, RARITIES, RARITY_WEIGHTS, LUCK_DENOMINATOR, \
+    MAX_LUCK_LEVEL
+
+# how much each rarity's weight changes with luck (as a fraction of luck_percent) -- luck takes from commons,
+# and shares it out between the rarer rarities
+LUCK_GROWTH_BY_RARITY = {
+    COMMON: -1,
+    UNCOMMON: 4 / 7,
+    RARE: 2 / 7,
+    EPIC: 1 / 7,
+    MYTHIC: 0,
+}
+
+# every luck level that counts -- anything past MAX_LUCK_LEVEL (say, with a spoopy bonus) counts as the max
+LUCK_LEVELS = range(MAX_LUCK_LEVEL + 1)
+
+# luck level -> luck percent, for scaling mythegg draw chances
+LUCK_PERCENTS = tuple(luck_level / LUCK_DENOMINATOR for luck_level in LUCK_LEVELS)
+
+# luck level -> {rarity: weight}, for picking the rarity of a gathered item. Luck only moves weight between rarities,
+# so each level's weights still add up to 1; they're rounded so commons come out at exactly 0 at max luck, rather
+# than a float crumb either side of it
+RARITY_WEIGHTS_BY_LUCK_LEVEL = tuple(
+    {
+        rarity: round(RARITY_WEIGHTS[rarity] + luck_percent * LUCK_GROWTH_BY_RARITY[rarity], 12)
+        for rarity in RARITIES
+    }
+    for luck_percent in LUCK_PERCENTS
+)
+
+
+def get_luck_level(luck_level, luck_bonus=0):
+    """The luck level that counts for a draw: the hero's own, plus any bonus, capped at MAX_LUCK_LEVEL"""
+    return min(max(luck_level + luck_bonus, 0), MAX_LUCK_LEVEL)
+
+
+def get_luck_percent(luck_level):
+    return LUCK_PERCENTS[get_luck_level(luck_level)]
+
+
+def get_rarity_weights(luck_level):
+    return RARITY_WEIGHTS_BY_LUCK_LEVEL[get_luck_level(luck_level)]
+
+
+def get_rarity_odds(luck_level, rarities=RARITIES):
+    """The chance of each of the given rarities coming up at this luck level, when those are the only ones on offer
+    (as when gathering from an item pool without any of the others)"""
+    weights = get_rarity_weights(luck_level)
+    total = sum(weights[rarity] for rarity in rarities)
+
+    if total <= 0:
+        return {rarity: 0 for rarity in rarities}
+
+    return {rarity: weights[rarity] / total for rarity in rarities}
@@ -0,0 +1,369 @@
+from dataclasses import dataclass
+
+from django.templatetags.static import static
+
+from ..models._constants import ITEM_EMOJIS, IMAGE_PREFIX, PLACE_IMAGE_DIR, VILLAGER_PORTRAIT_DIR, \
+    MYTHLING_PORTRAIT_DIR, ACTIVITY_ICON_PATHS, WILD_TYPES, FOREST, MOUNTAIN, BEACH, NEUTRAL, LOVE, LIKE, GATHER, \
+    ACHIEVEMENT_EMOJIS, RARITY_CHOICES, ALWAYS_MOVING_VILLAGERS
+from ..models.action import Action
+from ..models.clock import Clock
+from ..models.item_type_preference import ItemTypePreference
+
+# Records are read-only snapshots of world content, shared by every request in the process.
+# They mirror the attribute names of the models they're built from, so game logic can use them interchangeably.
+# eq=False keeps identity semantics: compare records by id, never by value.
+record = dataclass(frozen=True, slots=True, eq=False)
+
+
+@record
+class PlaceRecord:
+    id: int
+    name: str
+    image_path: str
+    place_type: str
+    has_inventory: bool
+    item_pool_ids: tuple = ()
+
+    # only defined for buildings
+    surround: 'PlaceRecord' = None
+    over: int = None
+    down: int = None
+    opening_time: int = None
+    closing_time: int = None
+
+    is_farmhouse: bool = False
+    arrows: tuple = ()  # (direction, place_id) pairs, precomputed from bridges
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def is_building(self):
+        return self.surround is not None
+
+    @property
+    def image_url(self):
+        if not self.image_path:
+            return None
+
+        return static(f'{IMAGE_PREFIX}/{PLACE_IMAGE_DIR}/{self.image_path}')
+
+    @property
+    def coordinates(self):
+        return {
+            'over': self.over,
+            'down': self.down
+        }
+
+    def is_open(self, time):
+        if not self.opening_time or not self.closing_time:
+            return True
+        else:
+            return self.opening_time <= time < self.closing_time
+
+    def get_time_display(self, time):
+        if not time:
+            return ""
+
+        return Clock.convert_time_to_display(time)
+
+    def serialize(self):
+        place_data = {
+            'name': self.name,
+            'imageUrl': self.image_url,
+            'id': self.id,
+            'hasInventory': self.has_inventory,
+            'arrows': [{'direction': direction, 'id': place_id} for direction, place_id in self.arrows],
+            'activities': self.get_activities()
+        }
+
+        if not self.is_building:
+            return place_data
+
+        building_data = {
+            'coords': self.coordinates,
+            'openingTime': self.opening_time,
+            'closingTime': self.closing_time,
+            'openingTimeDisplay': self.get_time_display(self.opening_time),
+            'closingTimeDisplay': self.get_time_display(self.closing_time)
+        }
+
+        return building_data | place_data
+
+    def get_activities(self):
+        activities = []
+
+        if self.place_type in WILD_TYPES:
+
+            if self.place_type == FOREST:
+                image_path = ACTIVITY_ICON_PATHS['BASKET']
+            if self.place_type == MOUNTAIN:
+                image_path = ACTIVITY_ICON_PATHS['PICKAXE']
+            if self.place_type == BEACH:
+                image_path = ACTIVITY_ICON_PATHS['FISHING_ROD']
+
+            activities.append({'actionType': Action.GATHER, 'imageUrl': static(f'{IMAGE_PREFIX}/{image_path}')})
+
+        if self.is_building:
+            image_path = ACTIVITY_ICON_PATHS['DOOR']
+
+            activities.append({
+                'actionType': Action.TRAVEL,
+                'id': self.surround.id,
+                'imageUrl': static(f'{IMAGE_PREFIX}/{image_path}')
+            })
+
+        if self.is_farmhouse:
+            image_path = ACTIVITY_ICON_PATHS['BED']
+            activities.append({'actionType': Action.SLEEP, 'imageUrl': static(f'{IMAGE_PREFIX}/{image_path}')})
+
+        return activities
+
+
+@record
+class BridgeRecord:
+    id: int
+    place_1: PlaceRecord
+    place_2: PlaceRecord
+    direction_1: str
+    direction_2: str
+
+    @property
+    def place_1_id(self):
+        return self.place_1.id
+
+    @property
+    def place_2_id(self):
+        return self.place_2.id
+
+
+@record
+class ItemRecord:
+    id: int
+    name: str
+    item_type: str
+    price: int
+    rarity: str
+    growth_days: int = None
+    effort_time: int = None
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def emoji(self):
+        return ITEM_EMOJIS[self.item_type]
+
+    def get_rarity_display(self):
+        return dict(RARITY_CHOICES)[self.rarity]
+
+    def serialize(self):
+        return {
+            'name': self.name,
+            'rarity': self.get_rarity_display(),
+        }
+
+
+@record
+class MythlingRecord(ItemRecord):
+    mythling_type: str = None
+    growth_stage: str = None
+    acquisition_increase_step: float = None
+    image_path: str = None
+
+    favorite_soil_id: int = None
+    special_response_villager_id: int = None
+    source_location_id: int = None
+
+    @property
+    def image_url(self):
+        if not self.image_path:
+            return None
+
+        return static(f'{IMAGE_PREFIX}/{MYTHLING_PORTRAIT_DIR}/{self.image_path}')
+
+
+@record
+class VillagerRecord:
+    id: int
+    name: str
+    full_name: str
+    description: str
+    friendliness: int
+    image_path: str
+    home: PlaceRecord = None
+    preferences: tuple = ()  # (item_type, valence) pairs
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def image_url(self):
+        if not self.image_path:
+            return None
+
+        return static(f'{IMAGE_PREFIX}/{VILLAGER_PORTRAIT_DIR}/{self.image_path}')
+
+    @property
+    def always_moves(self):
+        return self.name in ALWAYS_MOVING_VILLAGERS
+
+    def serialize(self):
+        return {
+            'name': self.name,
+            'imageUrl': self.image_url
+        }
+
+    def gift_valence(self, item):
+        """return how villager feels about a gift"""
+        for item_type, valence in self.preferences:
+            if item_type == item.item_type:
+                return valence
+
+        return ItemTypePreference.UNIVERSAL_PREFERENCES.get(item.item_type, NEUTRAL)
+
+    def get_preferred_emoji(self, valence):
+        return [ITEM_EMOJIS[item_type] for item_type, pref_valence in self.preferences if pref_valence == valence]
+
+    @property
+    def loved_emoji(self):
+        return self.get_preferred_emoji(LOVE)
+
+    @property
+    def liked_emoji(self):
+        return self.get_preferred_emoji(LIKE)
+
+
+@record
+class DialogueLineRecord:
+    id: int
+    speaker: VillagerRecord
+    affinity_tier: int
+    trigger: str
+    full_text: str
+
+    @property
+    def speaker_id(self):
+        return self.speaker.id
+
+    def serialize(self):
+        return {
+            'name': self.speaker.name,
+            'imageUrl': self.speaker.image_url,
+            'fullText': self.full_text,
+            'id': self.id,
+        }
+
+
+@record
+class KnowledgeRecord:
+    id: int
+    unlocking_achievement_id: int
+    display_name: str
+    knowledge_type: str
+
+    # only one group of these is defined, depending on knowledge_type
+    item_type: str = None
+    rarity: str = None
+    villager_id: int = None
+    valence: str = None
+    mythegg_id: int = None
+    mythling_id: int = None
+
+    @property
+    def key(self):
+        """What the knowledge tells the hero about, as serialization looks it up: (item_type, rarity) for an item
+        type's prices, (villager_id, valence) for a villager's gift preferences, or None for anything else"""
+        if self.item_type is not None:
+            return item_knowledge_key(self.item_type, self.rarity)
+
+        if self.villager_id is not None:
+            return villager_knowledge_key(self.villager_id, self.valence)
+
+        return None
+
+
+def item_knowledge_key(item_type, rarity):
+    return item_type, rarity
+
+
+def villager_knowledge_key(villager_id, valence):
+    return villager_id, valence
+
+
+@record
+class AchievementRecord:
+    id: int
+    name: str
+    description: str
+    achievement_type: str
+    trigger_type: str
+    threshold: int = None
+    threshold_day_number: int = None
+    villager_id: int = None
+    mythegg_id: int = None
+    unlocked_knowledge_ids: tuple = ()
+    unlocked_knowledge_names: tuple = ()
+
+    def __str__(self):
+        return f"{self.name}: {self.description}"
+
+    def serialize(self, progress=None):
+        serialized = {
+            'name': self.name,
+            'description': self.description,
+            'emoji': self.emoji,
+            'id': self.id,
+            'unlockedKnowledge': list(self.unlocked_knowledge_names) or None
+        }
+
+        # (current, threshold), for a progress bar
+        if progress is not None:
+            current, threshold = progress
+            serialized['progress'] = {'current': min(current, threshold), 'threshold': threshold}
+
+        return serialized
+
+    @property
+    def emoji(self):
+        if self.trigger_type == GATHER:
+            return ACHIEVEMENT_EMOJIS[GATHER][self.achievement_type]
+        else:
+            return ACHIEVEMENT_EMOJIS[self.trigger_type]
+
+    @property
+    def unlocked_message(self):
+        return f"🎉 Achievement Unlocked: {self.name}!"
+
+
+@record
+class ScheduledEventRecord:
+    id: int
+    day: str
+    is_daily: bool
+    time: int
+    event_type: str
+
+    # only defined for shop events
+    shop: PlaceRecord = None
+    content_configs: tuple = ()
+
+    # only defined for villager events
+    villager: VillagerRecord = None
+    place: PlaceRecord = None
+
+    @property
+    def pk(self):
+        return self.id
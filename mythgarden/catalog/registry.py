@@ -0,0 +1,71 @@
+import gc
+import threading
+
+_catalog = None
+# reentrant, since loading can create the default place, whose post_save signal resets the catalog
+_lock = threading.RLock()
+
+
+def get_catalog():
+    """Return the process-wide world catalog, loading it on first use: from the compiled artifact if there's an
+    up-to-date one, else straight from the database."""
+    global _catalog
+
+    if _catalog is None:
+        with _lock:
+            if _catalog is None:
+                from django.conf import settings
+
+                from .catalog import Catalog
+                from .loader import load_snapshot, load_compiled_snapshot
+
+                snapshot = load_compiled_snapshot(settings.CATALOG_ARTIFACT_PATH) or load_snapshot()
+                _catalog = Catalog(snapshot)
+
+    return _catalog
+
+
+def preload_catalog():
+    """Load the catalog in the gunicorn master before it forks its workers (see mythsite/gunicorn.conf.py), so they
+    start out sharing its pages copy-on-write instead of each building a copy of their own.
+
+    The loaded objects are frozen out of the garbage collector's way, since a collection would otherwise write to
+    every one of them and copy all their pages into the worker. Refcount changes still copy the pages a worker
+    actually reads from, and a worker that sees the generation move on rebuilds its own catalog -- so this shares
+    most of the catalog, most of the time, not all of it always."""
+    from django.db import connections
+
+    get_catalog()
+    gc.freeze()
+
+    # the workers mustn't inherit the master's database connection
+    connections.close_all()
+
+
+def reset_catalog():
+    """Drop the cached catalog so the next get_catalog() call rebuilds it (e.g. after world content is edited)."""
+    global _catalog
+
+    with _lock:
+        _catalog = None
+
+
+def refresh_catalog_if_stale():
+    """Drop the cached catalog if world content has changed (in any process) since it was loaded.
+    Costs one single-row query, so it's cheap enough to run at the start of every request."""
+    catalog = _catalog
+    if catalog is None:
+        return
+
+    from ..models import CatalogGeneration
+
+    if CatalogGeneration.get_current() != catalog.generation:
+        reset_catalog()
+
+
+def bump_catalog_generation():
+    """Mark world content as changed: resets this process's catalog and tells every other worker to reload theirs."""
+    from ..models import CatalogGeneration
+
+    CatalogGeneration.bump()
+    reset_catalog()
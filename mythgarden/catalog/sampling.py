@@ -0,0 +1,62 @@
+import random
+
+
+class AliasTable:
+    """Draws from a fixed set of weighted outcomes in constant time, however many there are, using Walker's alias
+    method (set up the way Vose describes): each of the n columns holds one outcome's share of the weight, topped up
+    to an even 1/n with a share of one other ("alias") outcome, so a draw is one random column and one coin flip."""
+    __slots__ = ('outcomes', '_probabilities', '_aliases')
+
+    def __init__(self, outcomes, weights):
+        # outcomes that can never come up are left out entirely, so float error can't ever pick one
+        weighted = [(outcome, weight) for outcome, weight in zip(outcomes, weights) if weight > 0]
+        if len(weighted) == 0:
+            raise ValueError('An alias table needs at least one outcome with a positive weight')
+
+        self.outcomes = tuple(outcome for outcome, _ in weighted)
+
+        count = len(weighted)
+        total = sum(weight for _, weight in weighted)
+        scaled = [weight * count / total for _, weight in weighted]
+
+        probabilities = [1.0] * count
+        aliases = list(range(count))
+
+        small = [index for index, share in enumerate(scaled) if share < 1]
+        large = [index for index, share in enumerate(scaled) if share >= 1]
+
+        while small and large:
+            less, more = small.pop(), large.pop()
+
+            probabilities[less] = scaled[less]
+            aliases[less] = more
+
+            scaled[more] = scaled[more] + scaled[less] - 1
+            (small if scaled[more] < 1 else large).append(more)
+
+        # whatever's left over is (up to float error) exactly full, so keeps its own column
+
+        self._probabilities = tuple(probabilities)
+        self._aliases = tuple(aliases)
+
+    def draw(self):
+        column = random.randrange(len(self.outcomes))
+
+        if random.random() < self._probabilities[column]:
+            return self.outcomes[column]
+
+        return self.outcomes[self._aliases[column]]
+
+    def probability_of(self, outcome):
+        """The exact chance of drawing the given outcome, as the table encodes it"""
+        if outcome not in self.outcomes:
+            return 0
+
+        index = self.outcomes.index(outcome)
+
+        share = self._probabilities[index] + sum(
+            1 - probability for probability, alias in zip(self._probabilities, self._aliases)
+            if alias == index and probability < 1
+        )
+
+        return share / len(self.outcomes)
@@ -5,5 +5,6 @@ from .mythegg_powers import MytheggPowers
 # main game logic classes
 from .action_executor import ActionExecutor
 from .action_generator import ActionGenerator
+from .action_resolver import ActionResolver
 from .action_validator import ActionValidator
 from .event_operator import EventOperator
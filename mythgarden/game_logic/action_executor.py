@@ -1,13 +1,14 @@
-import random
-
+from .action_generator import ActionGenerator
+from .event_operator import EventOperator
 from .mythegg_finder import MytheggFinder
 from .mythegg_powers import MytheggPowers
+from ..catalog import get_catalog
+from ..catalog.luck import get_luck_level
 from ..models import Action, Session, ItemToken, DialogueLine, Achievement
-from ..models._constants import SEED, MAX_ITEMS, MAX_LUCK_LEVEL, LUCK_DENOMINATOR, RARITIES, COMMON, UNCOMMON, RARE, \
-    EPIC, \
-    MYTHIC, RARITY_WEIGHTS, LOVE, LIKE, NEUTRAL, \
+from ..models._constants import SEED, MAX_ITEMS, COMMON, UNCOMMON, RARE, EPIC, \
+    MYTHIC, LOVE, LIKE, NEUTRAL, \
     DISLIKE, HATE, TALK_TO_VILLAGERS, SCORE_POINTS, GAIN_HEARTS, EARN_MONEY, HARVEST, GATHER, GAIN_ACHIEVEMENT, MYTHEGG, \
-    SPOOPY_LUCK_BONUS, CORAL_PRICE_MULTIPLIER, FORAGING_ITEM_TYPES, MOUNTAIN, FISH, SPARKLY_FRIENDLINESS
+    CORAL_PRICE_MULTIPLIER, FORAGING_ITEM_TYPES, FISH, SPARKLY_FRIENDLINESS
 from ..static_helpers import guard_type
 
 
@@ -26,13 +27,14 @@ class ActionExecutor:
 
         if hasattr(self, ex) and callable(getattr(self, ex)):
             getattr(self, ex)(action, session)
+            session.forget_cached_actions()
         else:
             raise ValueError(f'Unknown action type: {action.get_action_type_display().lower()}')
 
     def execute_travel_action(self, action, session):
         """Executes a travel action, which updates the current location and ticks the clock"""
 
-        session.location = action.target_place
+        session.location = get_catalog().places[action.target_place_id]
         session.save()
 
         log_statement = self.__add_emoji(action, action.log_statement)
@@ -42,11 +44,41 @@ class ActionExecutor:
 
         session.mark_fresh('buildings', 'clock', 'localItemTokens', 'messages', 'place', 'villagerStates')
 
+    def execute_journey_action(self, action, session):
+        """Executes a journey, which makes each travel action along the quickest route to the destination in turn,
+        letting time pass between them just as if they'd been requested one by one (the caller still reacts to the
+        time passed on the last one). Stops short if a building on the way is closed, or the day or game ends."""
+        action_generator = ActionGenerator()
+        event_operator = EventOperator()
+
+        destination = get_catalog().places[action.target_place_id]
+        hops = action_generator.gen_journey_hops(session.location, destination)
+        hops = action_generator.apply_speed_boost(hops, session.hero.boost_level)
+
+        start_day = session.clock.day_of_run
+
+        for index, hop in enumerate(hops):
+            if index > 0:
+                event_operator.react_to_time_passing(session.clock, session)
+
+                if session.game_over or session.clock.day_of_run != start_day:
+                    break
+
+            if hop.get_travel_type_of_action() == Action.ENTER:
+                building = get_catalog().places[hop.target_place_id]
+
+                if not action_generator.gen_enter_actions([building], session.clock, session):
+                    session.messages.create(text=f'⚠️ {building.name} is closed right now.', is_error=True)
+                    session.mark_fresh('messages')
+                    break
+
+            self.execute_travel_action(hop, session)
+
     def execute_talk_action(self, action, session):
         """Executes a talk action, which displays some dialogue, adds to the villager's affinity, and ticks the clock"""
 
         # grab villager & villager_state
-        villager = action.target_villager
+        villager = get_catalog().villagers[action.target_villager_id]
         villager_state = session.get_villager_state(villager)
 
         # get and set dialogue
@@ -97,12 +129,12 @@ class ActionExecutor:
         and adds to the villager's affinity"""
 
         # grab villager, villager_state, and gift
-        villager = action.target_villager
+        villager = get_catalog().villagers[action.target_villager_id]
         villager_state = session.get_villager_state(villager)
         gift = action.target_item
 
         # remove gift from inventory
-        session.inventory.item_tokens.remove(gift)
+        session.inventory.use_up_from_stack(gift)
         if gift.item_type == MYTHEGG:
             self.mythegg_finder.mark_mythegg_token_given_away(session, gift)
 
@@ -151,16 +183,24 @@ class ActionExecutor:
         session.mark_fresh('clock', 'dialogue', 'hero', 'inventory', 'messages', 'speaker', 'villagerStates')
 
     def execute_sell_action(self, action, session):
-        """Executes a sell action, which removes an item from the hero's inventory
+        """Executes a sell action, which removes one of an item from the hero's inventory
         and adds the price in koin to the hero's wallet"""
 
+        self.__sell_items(action, session, 1)
+
+    def execute_sell_all_action(self, action, session):
+        """Executes a sell-all action, which sells a whole stack of an item from the hero's inventory at once"""
+
+        self.__sell_items(action, session, action.target_item.count)
+
+    def __sell_items(self, action, session, quantity):
         item = action.target_item
         price = action.cost_amount
 
         if self.mythegg_powers.coral_active(session) and item.item_type == FISH:
             price *= CORAL_PRICE_MULTIPLIER
 
-        session.inventory.item_tokens.remove(item)
+        session.inventory.use_up_from_stack(item, quantity)
         session.wallet.money += price
         session.wallet.save()
 
@@ -169,17 +209,20 @@ class ActionExecutor:
 
         #  if the item should get repopulated into the store, do that
         if item.bought_from_store and item.item_type != SEED:
-            matching_item_in_store = session.local_item_tokens.filter(item=item.item)
-            store_has_open_slot = session.local_item_tokens.count() < MAX_ITEMS
+            local_item_tokens = list(session.local_item_tokens)
+            matching_item_in_store = [token for token in local_item_tokens if token.item_id == item.item_id]
+            store_has_open_slot = len(local_item_tokens) < MAX_ITEMS
 
-            if matching_item_in_store.exists():
-                matching_item = matching_item_in_store.first()
-                matching_item.quantity += 1
+            if matching_item_in_store:
+                matching_item = matching_item_in_store[0]
+                matching_item.quantity += quantity
                 matching_item.save()
             elif store_has_open_slot:
-                item.quantity = 1
-                item.save()
-                session.location_state.item_tokens.add(item)
+                returned_item = item.make_copy()
+                returned_item.bought_from_store = True
+                returned_item.quantity = quantity
+                returned_item.save()
+                session.location_state.add_item_tokens(returned_item)
 
         # if the item isn't being "returned", then increment hero's koin earned
         if not item.bought_from_store:
@@ -200,18 +243,18 @@ class ActionExecutor:
         new_item = item.make_copy()
         new_item.bought_from_store = True
         new_item.quantity = None
-        new_item.save()
 
         if new_item.item_type == MYTHEGG:
+            new_item.save()
             self.mythegg_finder.award_mythegg_token(session, session.inventory, new_item)
         else:
-            session.inventory.item_tokens.add(new_item)
+            session.inventory.stack_item_tokens(new_item)
 
         if item.quantity:
             item.quantity -= 1
 
             if item.quantity == 0:
-                session.location_state.item_tokens.remove(item)
+                session.location_state.remove_item_tokens(item)
             else:
                 item.save()
 
@@ -230,8 +273,8 @@ class ActionExecutor:
 
         item = action.target_item
 
-        session.inventory.item_tokens.remove(item)
-        session.location_state.item_tokens.add(item)
+        session.inventory.remove_item_tokens(item)
+        session.location_state.stack_item_tokens(item)
 
         log_statement = self.__add_emoji(action, action.log_statement)
         session.messages.create(text=log_statement)
@@ -244,8 +287,8 @@ class ActionExecutor:
 
         item = action.target_item
 
-        session.location_state.item_tokens.remove(item)
-        session.inventory.item_tokens.add(item)
+        session.location_state.remove_item_tokens(item)
+        session.inventory.stack_item_tokens(item)
 
         log_statement = self.__add_emoji(action, action.log_statement)
         session.messages.create(text=log_statement)
@@ -255,10 +298,10 @@ class ActionExecutor:
     def execute_plant_action(self, action, session):
         """Executes a plant action, which moves a seed from the hero's inventory into the session contents"""
 
-        session.inventory.item_tokens.remove(action.target_item)
-        action.target_item.days_growing = 1
-        action.target_item.save()
-        session.location_state.item_tokens.add(action.target_item)
+        seed = session.inventory.take_from_stack(action.target_item)
+        seed.days_growing = 1
+        seed.save()
+        session.location_state.add_item_tokens(seed)
 
         log_statement = self.__add_emoji(action, action.log_statement)
         session.messages.create(text=log_statement)
@@ -284,13 +327,18 @@ class ActionExecutor:
     def execute_harvest_action(self, action, session):
         """Executes a harvest action, which moves a crop from the session contents into the hero's inventory"""
 
-        session.inventory.item_tokens.add(action.target_item)
-        session.location_state.item_tokens.remove(action.target_item)
+        crop = action.target_item
+
+        # once it's out of the field, a crop stacks with the others like it
+        session.location_state.remove_item_tokens(crop)
+        crop.days_growing = None
+        crop.has_been_watered = False
+        session.inventory.stack_item_tokens(crop)
 
         log_statement = self.__add_emoji(action, action.log_statement)
         session.messages.create(text=log_statement)
 
-        session.hero_state.farming_intake += action.target_item.price
+        session.hero_state.farming_intake += crop.price
         session.hero_state.save()
 
         session.clock.advance(action.cost_amount).save()
@@ -303,22 +351,19 @@ class ActionExecutor:
         """Executes a gather action, which finds a random item in the current location's item pool
         and adds a copy to the hero's inventory"""
 
-        luck_level = session.hero.luck_level
+        # the mythegg and the item draws both go by the same luck (see catalog.luck)
+        luck_level = get_luck_level(session.hero.luck_level, self.mythegg_powers.gather_luck_bonus(session))
 
-        if self.mythegg_powers.spoopy_active(session) and session.location.place_type == MOUNTAIN:
-            luck_level += SPOOPY_LUCK_BONUS
-
-        luck_percent = min(luck_level, MAX_LUCK_LEVEL) / LUCK_DENOMINATOR
-
-        mythegg, mythling_state = self.mythegg_finder.draw_for_mythegg(session, session.location.mythegg, luck_percent) or (None, None)
+        mythegg = get_catalog().mythegg_at(session.location.id)
+        mythegg, mythling_state = self.mythegg_finder.draw_for_mythegg(session, mythegg, luck_level) or (None, None)
 
         if mythegg:
             item = mythegg
             self.mythegg_finder.award_mythegg(session, session.inventory, mythegg, mythling_state)
 
         else:
-            item = self.__pull_item_from_pool(session.location, luck_percent)
-            session.inventory.item_tokens.add(ItemToken.objects.create(session=session, item=item))
+            item = self.__pull_item_from_pool(session.location, luck_level)
+            session.inventory.stack_item_tokens(ItemToken(session=session, item_id=item.id))
 
         log_statement = self.__add_emoji(action, action.log_statement.format(result=item.name))
         session.messages.create(text=log_statement)
@@ -350,53 +395,14 @@ class ActionExecutor:
     def __add_emoji(self, action, log_statement):
         return f'{action.emoji} {log_statement}'
 
-    def __pull_item_from_pool(self, location, luck_percent):
+    def __pull_item_from_pool(self, location, luck_level=0):
         """Returns a random item from the given location's item pool, weighted by rarity.
         Modulate rarity percentages based on hero luck level"""
 
-        # Pick a rarity, find an item of that rarity;
-        # if none found, try again with another rarity;
-        # if no items at all, error out
-        rarities = [r for r in RARITIES]
-
-        while len(rarities) > 0:
-            weights = [self.__get_luck_modified_weight(r, luck_percent) for r in rarities]
-            rarity = random.choices(rarities, weights=weights, k=1)[0]
-
-            items_at_rarity = location.item_pool.filter(rarity=rarity)
-
-            # find the item types among items at this rarity, then pick a random type to filter on
-            available_types = list(items_at_rarity.values_list("item_type", flat=True).distinct())
-
-            item_type = random.choice(available_types)
-
-            choices = items_at_rarity.filter(item_type=item_type)
-
-            if choices.count() > 0:
-                item = choices.order_by('?').first()
-                return item
-            else:
-                # 'No items found in location with that rarity, so we try other rarities.
-                rarities.remove(rarity)
-                continue
-
-        raise ValueError(f'No items found in location {location.name} of any rarity')
-
-    def __get_luck_modified_weight(self, rarity, luck_percent):
-        LUCK_GROWTH_BY_RARITY = {
-            COMMON: -1,
-            UNCOMMON: 4 / 7,
-            RARE: 2 / 7,
-            EPIC: 1 / 7,
-            MYTHIC: 0,
-        }
-
-        luck_factor = LUCK_GROWTH_BY_RARITY[rarity]
-
-        base_weight = RARITY_WEIGHTS[rarity]
-        modified_weight = base_weight + luck_percent * luck_factor
-
-        return modified_weight
+        # the catalog has alias tables set up for every place's item pool, so this is a couple of random numbers
+        # (picking a rarity, falling back to the other rarities if there are no items of it, then a random item type
+        # and a random item of that type), and errors out if there are no items at all
+        return get_catalog().draw_from_item_pool(location.id, luck_level)
 
     def __set_dialogue_for_talk_action(self, session, villager_state, villager):
         if villager_state.has_ever_been_interacted_with:
@@ -406,9 +412,9 @@ class ActionExecutor:
             trigger = DialogueLine.FIRST_MEETING
             affinity_tier = None
 
-        dialogue = villager.get_dialogue(trigger, affinity_tier)
+        dialogue = get_catalog().get_dialogue(villager.id, trigger, affinity_tier)
 
-        session.current_dialogue = dialogue
+        session.current_dialogue_id = dialogue.id
         session.save()
 
     def __set_dialogue_for_gift_action(self, session, villager, valence):
@@ -423,16 +429,16 @@ class ActionExecutor:
         }
 
         trigger = VALENCE_TO_DIALOGUE_TRIGGER_MAP[valence]
-        dialogue = villager.get_dialogue(trigger)
+        dialogue = get_catalog().get_dialogue(villager.id, trigger)
 
-        session.current_dialogue = dialogue
+        session.current_dialogue_id = dialogue.id
         session.save()
 
     def __set_mythegg_dialogue(self, session, villager):
         trigger = DialogueLine.GRANTING_MYTHEGG
-        dialogue = villager.get_dialogue(trigger)
+        dialogue = get_catalog().get_dialogue(villager.id, trigger)
 
-        session.current_dialogue = dialogue
+        session.current_dialogue_id = dialogue.id
         session.save()
 
     def __calc_talk_affinity_change(self, talked_to_count, friendliness):
@@ -475,7 +481,7 @@ class ActionExecutor:
 
         hearts_gained = new_tier - old_tier
 
-        hero_state.increment_hearts_earned(hearts_gained, new_tier).save()
+        hero_state.increment_hearts_earned(hearts_gained, new_tier).move_villager_hearts(old_tier, new_tier).save()
 
         return hearts_gained
 
@@ -519,8 +525,8 @@ class ActionExecutor:
 
     def __check_gain_hearts_achievements(self, session, villager_state):
         newly_notched_count = Achievement.check_triggered_achievements(
-            GAIN_HEARTS, session, villager_state=villager_state,
-            villager_states=session.villager_states.all(), clock=session.clock
+            GAIN_HEARTS, session, villager_state=villager_state, hero_state=session.hero_state,
+            villager_count=len(session.aggregate.villager_states), clock=session.clock
         )
 
         if newly_notched_count > 0:
@@ -552,6 +558,4 @@ class ActionExecutor:
             session.mark_fresh('achievements')
 
     def __check_gain_achievement_achievements(self, session):
-        Achievement.check_triggered_achievements(
-            GAIN_ACHIEVEMENT, session, hero=session.hero
-        )
+        Achievement.check_triggered_achievements(GAIN_ACHIEVEMENT, session)
@@ -1,26 +1,48 @@
 import math
 from fractions import Fraction
 
+from ..catalog import get_catalog, PlaceRecord, BridgeRecord
 from ..models import Bridge, Building, ItemToken, Place, VillagerState, Action
-from ..models._constants import FARM, SHOP, WILD_TYPES, SUNSET, DAWN, SEED, SPROUT, CROP, FOREST, MOUNTAIN, BEACH, \
+from ..models._constants import DIRECTIONS, FARM, SHOP, WILD_TYPES, SUNSET, DAWN, SEED, SPROUT, CROP, FOREST, MOUNTAIN, BEACH, \
     TALK_MINUTES_PER_FRIENDLINESS, EXIT_DESCRIPTION, FISHING_DESCRIPTION, MINING_DESCRIPTION, FORAGING_DESCRIPTION, \
-    BOOST_DENOMINATOR, MAX_BOOST_LEVEL, TIME_TYPE, MYTHEGG
+    TRAVEL_MINUTES, ENTER_EXIT_MINUTES, BOOST_DENOMINATOR, MAX_BOOST_LEVEL, TIME_TYPE, MYTHEGG
 from ..static_helpers import guard_types, guard_type
 
 
 class ActionGenerator:
     def get_actions_for_session(self, session):
         place = session.location
-        inventory = list(session.inventory.item_tokens.all())
-        contents = list(session.local_item_tokens.all())
-        villager_states = list(session.occupant_states.all())
+        inventory = session.inventory.get_item_tokens()
+        contents = list(session.local_item_tokens)
+        villager_states = list(session.occupant_states)
         clock = session.clock
         boost_level = session.hero.boost_level
 
-        actions = self.gen_available_actions(place, inventory, contents, villager_states, clock, boost_level, session)
+        # the same state always generates the same actions, so they only need generating once per request
+        fingerprint = self.get_action_fingerprint(place, inventory, contents, villager_states, clock, boost_level)
+        actions = session.get_cached_actions(fingerprint)
+
+        if actions is None:
+            actions = self.gen_available_actions(place, inventory, contents, villager_states, clock, boost_level, session)
+            session.cache_actions(fingerprint, actions)
 
         return actions
 
+    def get_action_fingerprint(self, place, inventory, contents, villager_states, clock, boost_level):
+        """Returns a cheap summary of everything gen_available_actions looks at, which changes whenever the
+        available actions could"""
+        def token_summary(item_tokens):
+            return tuple((t.pk, t.item_id, t.has_been_watered, t.quantity) for t in item_tokens)
+
+        return (
+            place.id,
+            clock.minute,
+            boost_level,
+            token_summary(inventory),
+            token_summary(contents),
+            tuple((v.villager_id, v.has_been_talked_to, v.has_been_given_gift) for v in villager_states),
+        )
+
     def gen_available_actions(self, place, inventory, contents, villager_states, clock, boost_level, session=None):
         """Returns a list of available actions for the hero in the current session, taking into account:
         - the current inventory
@@ -29,15 +51,14 @@ class ActionGenerator:
 
         available_actions = []
 
-        buildings = list(place.buildings.all())
-        bridges = list(Bridge.objects.filter(place_1=place) | Bridge.objects.filter(place_2=place))
+        catalog = get_catalog()
+        place = catalog.places[place.id]
 
-        try:
-            building = place.building
-            if building.surround is not None:
-                available_actions += [self.gen_exit_action(building)]
-        except Building.DoesNotExist:
-            pass
+        buildings = list(catalog.buildings_in(place.id))
+        bridges = list(catalog.bridges_for(place.id))
+
+        if place.is_building:
+            available_actions += [self.gen_exit_action(place)]
 
         if len(bridges) > 0:
             available_actions += self.gen_travel_actions(place, bridges)
@@ -107,13 +128,18 @@ class ActionGenerator:
             if item_token.item_type == MYTHEGG:
                 continue
 
+            # (ahead of the single sell, which stays the action an item's pill shows)
+            sell_all_action = self.gen_sell_all_action(item_token)
+            if sell_all_action:
+                actions.append(sell_all_action)
+
             actions.append(self.gen_sell_action(item_token))
 
         return actions
 
     def gen_gather_actions(self, place):
         """Returns a list of gathering actions tied to the current place type"""
-        guard_type(place, Place)
+        guard_type(place, (Place, PlaceRecord))
 
         actions = []
 
@@ -128,7 +154,7 @@ class ActionGenerator:
 
     def gen_enter_actions(self, buildings, clock, session=None):
         """Returns a list of enter actions: what buildings can be entered, based on the time of day"""
-        guard_types(buildings, Building)
+        guard_types(buildings, (Building, PlaceRecord))
 
         actions = []
 
@@ -148,25 +174,46 @@ class ActionGenerator:
 
     def gen_travel_actions(self, place, bridges):
         """Returns a list of travel actions: what directions you can walk to cross a bridge another place"""
-        guard_type(place, Place)
-        guard_types(bridges, Bridge)
+        guard_type(place, (Place, PlaceRecord))
+        guard_types(bridges, (Bridge, BridgeRecord))
 
         actions = []
 
         for bridge in bridges:
-            if bridge.place_1 == place:
+            if bridge.place_1_id == place.id:
                 destination = bridge.place_2
                 direction = bridge.direction_2
-                display_direction = bridge.get_direction_2_display()
             else:
                 destination = bridge.place_1
                 direction = bridge.direction_1
-                display_direction = bridge.get_direction_1_display()
+
+            display_direction = dict(DIRECTIONS)[direction]
 
             actions.append(self.gen_travel_action(destination, direction, display_direction))
 
         return actions
 
+    def gen_journey_hops(self, place, destination):
+        """Returns the travel actions (walking, entering & exiting) along the quickest route from place to destination"""
+        catalog = get_catalog()
+        place = catalog.places[place.id]
+        hops = []
+
+        for next_place_id in catalog.route(place.id, destination.id):
+            next_place = catalog.places[next_place_id]
+
+            if place.is_building and place.surround.id == next_place.id:
+                hops.append(self.gen_exit_action(place))
+            elif next_place.is_building and next_place.surround.id == place.id:
+                hops.append(self.gen_enter_action(next_place))
+            else:
+                direction = next(direction for direction, place_id in place.arrows if place_id == next_place.id)
+                hops.append(self.gen_travel_action(next_place, direction, dict(DIRECTIONS)[direction]))
+
+            place = next_place
+
+        return hops
+
     def gen_social_actions(self, villager_states, inventory):
         """Returns a list of social actions: which villagers can be talked to,
         and what items can be given to them as gifts"""
@@ -177,7 +224,7 @@ class ActionGenerator:
         gift_actions = []
 
         for villager_state in villager_states:
-            villager = villager_state.villager
+            villager = villager_state.villager_record
             if not villager_state.has_been_talked_to:
                 talk_actions.append(self.gen_talk_action(villager))
 
@@ -209,7 +256,7 @@ class ActionGenerator:
         return Action(
             description=f'Gift {item_token.name} to {villager.name}',
             action_type=Action.GIVE,
-            target_villager=villager,
+            target_villager_id=villager.id,
             target_item=item_token,
             cost_amount=cost_amount,
             cost_unit=Action.MIN,
@@ -223,7 +270,7 @@ class ActionGenerator:
         return Action(
             description=f'Talk to {villager.name}',
             action_type=Action.TALK,
-            target_villager=villager,
+            target_villager_id=villager.id,
             cost_amount=cost_amount,
             cost_unit=Action.MIN,
             cost_wait_class=Action.MINUTES_TO_WAIT_CLASS[cost_amount],
@@ -241,6 +288,20 @@ class ActionGenerator:
             log_statement='You sold {name} for {price} fleurs.',
         )
 
+    def gen_sell_all_action(self, item_token):
+        """Returns an action that sells the whole stack of given item, or None if there's just the one"""
+        if item_token.count < 2:
+            return None
+
+        return Action(
+            description=f'Sell all {item_token.count} {item_token.name}',
+            action_type=Action.SELL_ALL,
+            target_item=item_token,
+            cost_amount=item_token.price * item_token.count,
+            cost_unit=Action.KOIN,
+            log_statement=f'You sold {item_token.count} {{name}} for {{price}} fleurs.',
+        )
+
     def gen_buy_action(self, item_token):
         """Returns an action that buys given item"""
         return Action(
@@ -272,11 +333,11 @@ class ActionGenerator:
 
     def gen_enter_action(self, building):
         """Returns an action that enters given building"""
-        cost_amount = 5
+        cost_amount = ENTER_EXIT_MINUTES
         return Action(
             description=f'Enter {building.name}',
             action_type=Action.TRAVEL,
-            target_place=building,
+            target_place_id=building.id,
             cost_amount=cost_amount,
             cost_unit=Action.MIN,
             cost_wait_class=Action.MINUTES_TO_WAIT_CLASS[cost_amount],
@@ -285,11 +346,11 @@ class ActionGenerator:
 
     def gen_exit_action(self, building):
         """Returns an action that exits the current place"""
-        cost_amount = 5
+        cost_amount = ENTER_EXIT_MINUTES
         return Action(
             description=EXIT_DESCRIPTION,
             action_type=Action.TRAVEL,
-            target_place=building.surround,
+            target_place_id=building.surround.id,
             cost_amount=cost_amount,
             cost_unit=Action.MIN,
             cost_wait_class=Action.MINUTES_TO_WAIT_CLASS[cost_amount],
@@ -298,7 +359,7 @@ class ActionGenerator:
 
     def gen_plant_action(self, seed_token):
         """Returns an action that plants given seed"""
-        cost_amount = seed_token.item.effort_time
+        cost_amount = seed_token.item_record.effort_time
 
         return Action(
             description=f'Plant {seed_token.name}',
@@ -312,7 +373,7 @@ class ActionGenerator:
 
     def gen_water_action(self, plant_token):
         """Returns an action that waters given seed/sprout"""
-        cost_amount = plant_token.item.effort_time
+        cost_amount = plant_token.item_record.effort_time
 
         return Action(
             description=f'Water {plant_token.name}',
@@ -326,7 +387,7 @@ class ActionGenerator:
 
     def gen_harvest_action(self, crop_token):
         """Returns an action that harvests given crop"""
-        cost_amount = crop_token.item.effort_time
+        cost_amount = crop_token.item_record.effort_time
 
         return Action(
             description=f'Harvest {crop_token.name}',
@@ -340,11 +401,11 @@ class ActionGenerator:
 
     def gen_travel_action(self, destination, direction, display_direction):
         """Returns an action that travels to given destination in given direction"""
-        cost_amount = 60
+        cost_amount = TRAVEL_MINUTES
         return Action(
             description=f'Go {display_direction}',
             action_type=Action.TRAVEL,
-            target_place=destination,
+            target_place_id=destination.id,
             direction=direction,
             cost_amount=cost_amount,
             cost_unit=Action.MIN,
@@ -352,6 +413,34 @@ class ActionGenerator:
             log_statement=f'You travelled to {destination.name}.',
         )
 
+    def gen_journey_action(self, place, destination):
+        """Returns an action that travels all the way to the given destination, or None if it's unreachable
+        or only one hop away (plain travel actions cover those)"""
+        hops = self.gen_journey_hops(place, destination)
+        if len(hops) < 2:
+            return None
+
+        return Action(
+            description=f'Travel to {destination.name}',
+            action_type=Action.JOURNEY,
+            target_place_id=destination.id,
+            cost_amount=sum(hop.cost_amount for hop in hops),
+            cost_unit=Action.MIN,
+            log_statement=f'You travelled to {destination.name}.',
+        )
+
+    def gen_journey_actions(self, place):
+        """Returns a journey action to every place more than one hop away from given place"""
+        actions = []
+
+        for destination in get_catalog().places.values():
+            journey_action = self.gen_journey_action(place, destination)
+
+            if journey_action:
+                actions.append(journey_action)
+
+        return actions
+
     def gen_fishing_action(self):
         """Returns an action that catches a fish"""
         cost_amount = 60
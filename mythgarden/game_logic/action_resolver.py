@@ -0,0 +1,172 @@
+from .action_generator import ActionGenerator
+from ..catalog import get_catalog
+from ..models import Action
+from ..models._constants import FARM, SHOP, WILD_TYPES, SUNSET, DAWN
+
+
+class ActionResolver:
+    """Rebuilds a requested action straight from its unique digest (see Action.unique_digest), by running the
+    ActionGenerator's rules for just that action type and the targets the digest names -- instead of generating
+    every available action and searching through them for the digest."""
+
+    # how many target ids each action type's digest carries
+    TARGET_COUNTS = {
+        Action.TRAVEL: 1,
+        Action.TALK: 1,
+        Action.GIVE: 2,
+        Action.PLANT: 1,
+        Action.WATER: 1,
+        Action.HARVEST: 1,
+        Action.BUY: 1,
+        Action.SELL: 1,
+        Action.SELL_ALL: 1,
+        Action.STOW: 1,
+        Action.RETRIEVE: 1,
+        Action.GATHER: 0,
+        Action.SLEEP: 0,
+        Action.JOURNEY: 1,
+    }
+
+    def __init__(self):
+        self.action_generator = ActionGenerator()
+
+    def resolve(self, digest, session):
+        """Returns the action with the given digest, or None if it isn't available in the session right now"""
+        try:
+            action_type, target_ids = self.parse_digest(digest)
+        except ValueError:
+            return None
+
+        resolve_candidates = getattr(self, f'resolve_{action_type.lower()}_candidates')
+        candidates = resolve_candidates(session, *target_ids)
+
+        for action in candidates:
+            if action.unique_digest == digest:
+                return self.action_generator.apply_speed_boost([action], session.hero.boost_level)[0]
+
+    def parse_digest(self, digest):
+        """Splits a digest like 'GIVE-12-3' into its action type and target ids (item, then villager, then place)"""
+        if not isinstance(digest, str):
+            raise ValueError(f'Digest should be a string, not {digest!r}')
+
+        action_type, _, target_part = digest.partition('-')
+
+        if action_type not in self.TARGET_COUNTS:
+            raise ValueError(f'Unknown action type in digest: {digest}')
+
+        target_ids = [int(target_id) for target_id in target_part.split('-') if target_id]
+
+        if len(target_ids) != self.TARGET_COUNTS[action_type]:
+            raise ValueError(f'Wrong number of targets in digest: {digest}')
+
+        return action_type, target_ids
+
+    # candidates -- the actions the generator would make for these targets, if any
+    def resolve_travel_candidates(self, session, place_id):
+        catalog = get_catalog()
+        place = session.location
+        candidates = []
+
+        if place.is_building:
+            candidates.append(self.action_generator.gen_exit_action(place))
+
+        candidates += self.action_generator.gen_travel_actions(place, list(catalog.bridges_for(place.id)))
+
+        building = catalog.places.get(place_id)
+        if building in catalog.buildings_in(place.id):
+            candidates += self.action_generator.gen_enter_actions([building], session.clock, session)
+
+        return candidates
+
+    def resolve_journey_candidates(self, session, place_id):
+        # journeys aren't listed with the other actions (there'd be one for every place in the world) but by the
+        # journeys endpoint, so any place can be asked for by its id
+        destination = get_catalog().places.get(place_id)
+        if not destination:
+            return []
+
+        journey_action = self.action_generator.gen_journey_action(session.location, destination)
+
+        return [journey_action] if journey_action else []
+
+    def resolve_talk_candidates(self, session, villager_id):
+        villager_state = self.__get_occupant_state(session, villager_id)
+        if not villager_state:
+            return []
+
+        return self.action_generator.gen_social_actions([villager_state], [])
+
+    def resolve_give_candidates(self, session, item_token_id, villager_id):
+        villager_state = self.__get_occupant_state(session, villager_id)
+        item_token = self.__find_item_token(session.inventory.get_item_tokens(), item_token_id)
+        if not villager_state or not item_token:
+            return []
+
+        return self.action_generator.gen_social_actions([villager_state], [item_token])
+
+    def resolve_plant_candidates(self, session, item_token_id):
+        return self.__resolve_item_candidates(session, item_token_id, FARM, self.action_generator.gen_farming_actions)
+
+    def resolve_water_candidates(self, session, item_token_id):
+        return self.__resolve_item_candidates(session, item_token_id, FARM, self.action_generator.gen_farming_actions)
+
+    def resolve_harvest_candidates(self, session, item_token_id):
+        return self.__resolve_item_candidates(session, item_token_id, FARM, self.action_generator.gen_farming_actions)
+
+    def resolve_buy_candidates(self, session, item_token_id):
+        return self.__resolve_item_candidates(session, item_token_id, SHOP, self.action_generator.gen_shopping_actions)
+
+    def resolve_sell_candidates(self, session, item_token_id):
+        return self.__resolve_item_candidates(session, item_token_id, SHOP, self.action_generator.gen_shopping_actions)
+
+    def resolve_sell_all_candidates(self, session, item_token_id):
+        return self.__resolve_item_candidates(session, item_token_id, SHOP, self.action_generator.gen_shopping_actions)
+
+    def resolve_stow_candidates(self, session, item_token_id):
+        if not session.location.is_farmhouse:
+            return []
+
+        return self.__resolve_item_candidates(session, item_token_id, None, self.action_generator.gen_storage_actions)
+
+    def resolve_retrieve_candidates(self, session, item_token_id):
+        if not session.location.is_farmhouse:
+            return []
+
+        return self.__resolve_item_candidates(session, item_token_id, None, self.action_generator.gen_storage_actions)
+
+    def resolve_gather_candidates(self, session):
+        if session.location.place_type not in WILD_TYPES:
+            return []
+
+        return self.action_generator.gen_gather_actions(session.location)
+
+    def resolve_sleep_candidates(self, session):
+        clock = session.clock
+        if not session.location.is_farmhouse or not (clock.time >= SUNSET or clock.time < DAWN):
+            return []
+
+        return [self.action_generator.gen_sleep_action()]
+
+    # helpers
+    def __resolve_item_candidates(self, session, item_token_id, place_type, gen_actions):
+        """Runs the given generator method (which takes the place's contents, then the inventory) on just the
+        requested item token, from wherever it is"""
+        if place_type and session.location.place_type != place_type:
+            return []
+
+        contents = self.__find_item_token(session.local_item_tokens, item_token_id)
+        inventory = self.__find_item_token(session.inventory.get_item_tokens(), item_token_id)
+
+        return gen_actions([contents] if contents else [], [inventory] if inventory else [])
+
+    def __get_occupant_state(self, session, villager_id):
+        villager_state = session.aggregate.get_villager_state(villager_id)
+        location_state = session.location_state
+
+        if not villager_state or not location_state or villager_state.location_state_id != location_state.id:
+            return None
+
+        return villager_state
+
+    def __find_item_token(self, item_tokens, item_token_id):
+        return next((item_token for item_token in item_tokens if item_token.pk == item_token_id), None)
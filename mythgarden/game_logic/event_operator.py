@@ -1,10 +1,10 @@
-import json
 import random
 
 from .mythegg_finder import MytheggFinder
 from .mythegg_powers import MytheggPowers
-from ..models import ScheduledEvent, VillagerState, PlaceState, Item, MerchSlot, ItemToken
-from ..models._constants import SHOP, FARM, SEED, SPROUT, CROP, DAWN, DAY_TO_INDEX, KYS_MESSAGE, FIRST_DAY, MAX_ITEMS, \
+from ..catalog import get_catalog
+from ..models import ScheduledEvent, VillagerState, MerchSlot, ItemToken
+from ..models._constants import SHOP, FARM, SEED, SPROUT, DAWN, DAY_TO_INDEX, KYS_MESSAGE, MAX_ITEMS, \
     RAINBOW_BONUS_TIME
 
 
@@ -23,7 +23,7 @@ class EventOperator:
         # run scheduled events (from yesterday & today)
         self.trigger_scheduled_events(clock, session)
 
-        # if start of a new day, run hard-coded events, have the hero go to sleep, then run events
+        # if start of a new day, run hard-coded events, have the hero go to sleep, then run the events up to waking
         if clock.is_new_day:
             # unless you have the rainbow egg!
             if self.mythegg_powers.rainbow_active(session) \
@@ -35,90 +35,71 @@ class EventOperator:
             self.reset_for_new_day(session)
             self.sleep_through_the_night(clock, session)  # advances the clock, sets is_new_day to False
 
-            self.react_to_time_passing(clock, session)  # run this function again!
+            # sleeping only ever moves the clock on to the morning, so it can't have ended the week
+            self.trigger_scheduled_events(clock, session)
 
     def trigger_scheduled_events(self, clock, session):
-        """Trigger events which are set to go off between last_triggered_day/last_triggered_time and clock.day/clock.time.
-        Then set last_triggered_* to now :)"""
+        """Trigger events which are set to go off between clock.last_triggered_minute and clock.minute.
+        Then set last_triggered_minute to now :)"""
         events_to_trigger_queue = self.build_events_to_trigger_queue(clock)
 
         self.trigger_events(list(events_to_trigger_queue), session)
+        self.place_villagers(clock, session)
 
         clock.mark_last_triggered_point_as_now().save()
 
     def build_events_to_trigger_queue(self, clock):
         """Build an ordered queue of events to trigger with the following properties:
-        -- has not yet occurred AND
-        -- is_daily OR is set to occur on the given day
+        -- has not yet occurred, ie is after clock.last_triggered_minute and up to clock.minute
+        (which, across midnight, means the rest of yesterday's events and then today's so far) AND
+        -- is_daily OR is set to occur on the day it falls on
         -- is ordered by time ascending, then is_daily=true, then is_daily=false
         (by having is_daily=True first, we can "overwrite" a daily event with a more specific one-day event at the same time)
         """
 
-        yesterday_events_to_trigger = self.get_yesterday_events_to_trigger(clock)
-        today_events_to_trigger = self.get_today_events_to_trigger(clock)
+        # the catalog's event timeline is already in that order, and gets bisected down to the window
+        # (villager appears events are compiled into the villager schedules instead, see place_villagers)
+        events = get_catalog().events_between(clock.last_triggered_minute, clock.minute)
 
-        events_to_trigger_queue = yesterday_events_to_trigger | today_events_to_trigger
+        return [event for event in events if event.event_type != ScheduledEvent.VILLAGER_APPEARS]
 
-        events_to_trigger_queue = events_to_trigger_queue.order_by('time', '-is_daily', 'pk')  # orders by time, then is_daily=True, then is_daily=False
-
-        events_to_trigger_queue = events_to_trigger_queue.select_related('villagerappearsevent__villager', 'villagerappearsevent__place')
-
-        return events_to_trigger_queue
-
-    def get_yesterday_events_to_trigger(self, clock):
-        # If we haven't triggered any events yet today, then we want to trigger any lingering events from yesterday.
-        # That means any event where the day is right (daily or yesterday) and the time is > last_triggered_time
-
-        if clock.last_triggered_day == clock.day:
-            return ScheduledEvent.objects.none()
-
-        events_of_valid_day = ScheduledEvent.objects.filter(day=clock.last_triggered_day) | \
-                              ScheduledEvent.objects.filter(is_daily=True)
-
-        events_of_valid_day_and_time = events_of_valid_day.filter(time__gt=clock.last_triggered_time)
-
-        return events_of_valid_day_and_time
+    def trigger_events(self, events, session):
+        # the session's own place states, so the changes below show up without a refresh
+        place_states = session.aggregate.place_states
 
-    def get_today_events_to_trigger(self, clock):
-        # We want to trigger any events where the day is right (daily or today)
-        # and the time is BOTH > last_triggered_time and <= now.
+        for event in events:
+            self.trigger_event(event, session, place_states)
 
-        events_of_valid_day = ScheduledEvent.objects.filter(day=clock.day) | \
-                              ScheduledEvent.objects.filter(is_daily=True)
+    def trigger_event(self, event, session, place_states):
+        """Triggers the given event based on the event_type"""
+        if event.event_type == ScheduledEvent.SHOP_POPULATES:
+            return self.populate_shop(event, session, place_states)
 
-        events_of_valid_day_and_time = events_of_valid_day.filter(time__gt=clock.last_triggered_time, time__lte=clock.time)
+    def place_villagers(self, clock, session):
+        """Moves every villager to wherever their schedule has them right now (see Catalog.villager_location_id),
+        saving just the ones who've moved"""
+        catalog = get_catalog()
+        settings = session.hero.settings if hasattr(session.hero, 'settings') else None
+        villagers_move = not settings or settings.villagers_move
 
-        return events_of_valid_day_and_time
+        place_states = session.aggregate.place_states
+        moved_villager_states = []
 
-    def trigger_events(self, events, session):
-        villager_states = VillagerState.objects.select_related('villager').filter(session=session)
-        place_states = PlaceState.objects.select_related('place').filter(session=session)
+        for villager_state in session.aggregate.villager_states.values():
+            place_id = catalog.villager_location_id(villager_state.villager_id, clock.minute, villagers_move)
+            place_state = place_states.get(place_id)
 
-        villager_results = {}
+            if villager_state.location_state_id != (place_state.id if place_state else None):
+                session.aggregate.move_villager(villager_state, place_state)
+                moved_villager_states.append(villager_state)
 
-        for event in events:
-            result = self.trigger_event(event, session, villager_states, place_states)
-            if isinstance(result, VillagerState):
-                villager_results[result.villager.name] = result  # needed for when one villager has multiple events in a time span -- only want to save the last location_state
+        if len(moved_villager_states) > 0:
+            VillagerState.objects.bulk_update(moved_villager_states, ['location_state'])
+            for villager_state in moved_villager_states:
+                villager_state.reset_dirty_fields(['location_state'])
 
-        if len(villager_results) > 0:
-            VillagerState.objects.bulk_update(villager_results.values(), ['location_state'])
             session.mark_fresh('villagerStates')
 
-    def trigger_event(self, event, session, villager_states, place_states):
-        """Triggers the given event based on the event_type"""
-        settings = session.hero.settings if hasattr(session.hero, 'settings') else None
-
-        if event.event_type == ScheduledEvent.SHOP_POPULATES:
-            return self.populate_shop(event.populateshopevent, session, place_states)  # django forces PopulateShopEvent into populateshopevent
-
-        if event.event_type == ScheduledEvent.VILLAGER_APPEARS:
-            # Skip villager movement events if villagers_move is disabled, except for Trix
-            villager_name = event.villagerappearsevent.villager.name
-            if settings and not settings.villagers_move and villager_name != 'Trix':
-                return
-            return self.villager_appears(event.villagerappearsevent, villager_states, place_states)
-
     def populate_shop(self, event, session, place_states):
         """Fill the shop inventory for the day, which includes:
         -unlimited stock of a seed
@@ -126,6 +107,7 @@ class EventOperator:
         -random merchandise (determined by merch_slots)"""
 
         item_tokens = []
+        items = []
         blocked_item_types = []
         settings = session.hero.settings if hasattr(session.hero, 'settings') else None
         use_basic_crops = settings and not settings.advanced_crops
@@ -142,9 +124,7 @@ class EventOperator:
             'Mythfruit Seed': 'Mythfruit Seed',
         }
 
-        content_configs = json.loads(event.content_config_list)
-
-        for content_config in content_configs:
+        for content_config in event.content_configs:
             item_name = content_config.get('item_name', None)
             quantity = content_config.get('quantity', None)
             merch_type = content_config.get('merch_type', None)
@@ -154,7 +134,7 @@ class EventOperator:
                 if use_basic_crops and item_name in SEED_MAPPING:
                     item_name = SEED_MAPPING[item_name]
 
-                item = Item.objects.get_by_natural_key(item_name)
+                item = get_catalog().get_item_by_name(item_name)
             elif merch_type:
                 # For fixed shop mode, skip random merchandise items entirely
                 if not use_dynamic_shop:
@@ -166,29 +146,28 @@ class EventOperator:
             else:
                 raise ValueError('Content config should have item_name or merch_type')
 
-            item_token = ItemToken(session=session, item=item, quantity=quantity)
+            item_token = ItemToken(session=session, item_id=item.id, quantity=quantity)
             item_tokens.append(item_token)
+            items.append(item)
 
         # draw for shop populate
         mythegg, mythling_state = self.mythegg_finder.draw_for_shop_populate_mythegg(session) or (None, None)
 
         if mythegg:
             mythling_state.mark_deferred()
-            mythegg_token = ItemToken(session=session, item=mythegg, quantity=1)
+            mythegg_token = ItemToken(session=session, item_id=mythegg.id, quantity=1)
 
             if len(item_tokens) == MAX_ITEMS:
                 # replace the first non-seed item
-                seed_count = len([item_token for item_token in item_tokens if item_token.item_type == SEED])
+                seed_count = len([item for item in items if item.item_type == SEED])
                 item_tokens[seed_count] = mythegg_token
             else:
                 item_tokens.insert(0, mythegg_token)
 
         ItemToken.objects.bulk_create(item_tokens)
 
-        place_state = place_states.filter(place=event.shop).first()
-        # Clear existing items before adding new ones to avoid MAX_ITEMS validation error
-        place_state.item_tokens.clear()
-        place_state.item_tokens.set(item_tokens)
+        place_state = place_states[event.shop.id]
+        place_state.set_item_tokens(item_tokens)
 
         if session.location.place_type == SHOP:
             session.mark_fresh('localItemTokens')
@@ -213,9 +192,9 @@ class EventOperator:
                 'Parsnip Seed', 'Potato Seed', 'Rhubarb Seed', 'Cauliflower Seed',
                 'Melon Seed', 'Pumpkin Seed', 'Mythfruit Seed'
             ]
-            items = list(Item.objects.filter(name__in=basic_seed_names, rarity=rarity).order_by('name'))
+            items = [item for item in get_catalog().items_of(SEED, rarity) if item.name in basic_seed_names]
         else:
-            items = list(Item.objects.filter(item_type=item_type, rarity=rarity).order_by('name'))
+            items = list(get_catalog().items_of(item_type, rarity))
 
         # For fixed shop, use day-seeded random; for dynamic shop, use random ordering
         if use_dynamic_shop:
@@ -228,86 +207,68 @@ class EventOperator:
 
         return item
 
-    def villager_appears(self, event, villager_states, place_states):
-        villager_state = villager_states.filter(villager=event.villager).first()
-        place_state = place_states.filter(place=event.place).first()
-
-        villager_state.location_state = place_state
-
-        return villager_state
-
     def reset_for_new_day(self, session):
-        self.reset_villager_states(session.villager_states.all(), session)
-        self.grow_crops(session.place_states.all(), session)
+        """Rolls the session's state over to the next day -- works out everything in memory from the session's
+        aggregate, then writes each part in bulk, so the number of statements doesn't grow with the farm or the world"""
+        self.reset_villager_states(session.aggregate.villager_states.values(), session)
+        self.grow_crops(session.aggregate.place_states.values(), session)
         self.conjure_mythegg_if_needed(session)
 
     def reset_villager_states(self, villager_states, session):
-        villager_states.update(has_been_talked_to=False, has_been_given_gift=False)
+        for villager_state in villager_states:
+            villager_state.has_been_talked_to = False
+            villager_state.has_been_given_gift = False
+            villager_state.reset_dirty_fields(['has_been_talked_to', 'has_been_given_gift'])
+
+        VillagerState.objects.filter(session=session).update(has_been_talked_to=False, has_been_given_gift=False)
         session.mark_fresh('villagerStates')
 
     def grow_crops(self, place_states, session):
         """Find all seeds/sprouts in the farm and "grow" them if they've been watered –
-        ie replace them with a new item token at the next growth stage."""
+        ie replace them with a new item token at the next growth stage.
 
-        farm_state = next((state for state in place_states if state.place.place_type == FARM))
-        if session.is_fresh('localItemTokens'):
-            farm_state.refresh_from_db()
+        What each plant grows into comes from the catalog's growth transitions, so the new item tokens only need the
+        grown items' ids, and are created in one go."""
 
-        item_tokens = farm_state.item_tokens.all()
-        new_contents = []
-        golden_mythegg_active = self.mythegg_powers.golden_active(session)
-        settings = session.hero.settings if hasattr(session.hero, 'settings') else None
-        use_basic_crops = settings and not settings.advanced_crops
+        catalog = get_catalog()
+        farm_state = next((state for state in place_states if catalog.places[state.place_id].place_type == FARM))
 
-        for token in item_tokens:
-            if token.item_type not in [SEED, SPROUT] or not token.has_been_watered:
-                new_contents.append(token)
-                continue
+        item_tokens = farm_state.get_item_tokens()
+        growing_tokens = [token for token in item_tokens if token.item_type in [SEED, SPROUT] and token.has_been_watered]
 
-            if use_basic_crops:
-                # Basic crops mode: simple 2-day growth (SEED -> SPROUT -> CROP)
-                new_item = self.__get_next_growth_stage_basic(token, golden_mythegg_active)
-            else:
-                # Advanced crops mode: variable growth times based on item properties
-                new_item = token.item.get_next_growth_stage(token.days_growing, golden_mythegg_active)
+        if len(growing_tokens) == 0:
+            return
 
-            new_item_token = ItemToken.objects.create(
-                session=session, item=new_item, days_growing=token.days_growing + 1
-            )
-            new_contents.append(new_item_token)
+        golden_mythegg_active = self.mythegg_powers.golden_active(session)
+        settings = session.hero.settings if hasattr(session.hero, 'settings') else None
+        # basic crops mode: simple 2-day growth (SEED -> SPROUT -> CROP), advanced: variable growth times
+        use_advanced_crops = not settings or settings.advanced_crops
+
+        next_item_ids = [
+            catalog.next_growth_stage_id(token.item_id, token.days_growing, use_advanced_crops, golden_mythegg_active)
+            for token in growing_tokens
+        ]
+
+        # (a plant whose next stage is missing from the content stays as it is, see Item.objects.create_growth_stages)
+        grown_tokens = {
+            token.pk: ItemToken(session=session, item_id=next_item_id, days_growing=token.days_growing + 1)
+            for token, next_item_id in zip(growing_tokens, next_item_ids) if next_item_id is not None
+        }
+        ItemToken.objects.bulk_create(grown_tokens.values())
 
-        farm_state.item_tokens.set(new_contents)
+        farm_state.set_item_tokens([grown_tokens.get(token.pk, token) for token in item_tokens])
 
         if session.location.place_type == FARM:
             session.mark_fresh('localItemTokens')
 
-    def __get_next_growth_stage_basic(self, token, grow_golden_crops):
-        """Basic crops mode: all crops follow simple SEED -> SPROUT (day 1) -> CROP (day 2) pattern"""
-        # Determine next type based on current type
-        if token.item_type == SEED:
-            next_type = SPROUT
-        else:  # SPROUT
-            next_type = CROP
-
-        # Use the item's existing logic for name, price, and rarity
-        next_name = token.item.get_next_name(next_type, grow_golden_crops)
-        next_price = token.item.get_next_price(next_type, grow_golden_crops)
-        next_rarity = token.item.get_next_rarity(next_type, grow_golden_crops)
-
-        instance, created = Item.objects.get_or_create(
-            name=next_name, item_type=next_type, price=next_price,
-            rarity=next_rarity, growth_days=token.item.growth_days, effort_time=token.item.effort_time
-        )
-
-        return instance
-
     def conjure_mythegg_if_needed(self, session):
         mythegg, mythling_state = self.mythegg_finder.draw_for_new_day_mythegg(session) or (None, None)
 
         if not mythegg:
             return
 
-        farmhouse_state = next((state for state in session.place_states.all() if state.place.is_farmhouse))
+        places = get_catalog().places
+        farmhouse_state = next((state for state in session.aggregate.place_states.values() if places[state.place_id].is_farmhouse))
 
         if farmhouse_state.is_full:
             mythling_state.mark_deferred().save()
@@ -362,7 +323,7 @@ class EventOperator:
         return session.reset_session_state(end_of_game_message)
 
     def trigger_kys(self, session):
-        days_completed = DAY_TO_INDEX[session.clock.day]
+        days_completed = session.clock.day_index
         session.hero.luck_level += days_completed
         session.hero.save()
 
@@ -384,4 +345,4 @@ class EventOperator:
         return f'{start} {middle} {end}'
 
     def __is_game_over(self, clock):
-        return clock.is_new_day and clock.day == FIRST_DAY
+        return clock.is_end_of_week
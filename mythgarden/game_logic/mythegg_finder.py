@@ -1,7 +1,9 @@
 import random
 
-from ..models import ItemToken, MythlingState, Mythling, Achievement
-from ..models._constants import MYTHLING_TYPE_TO_DRAW_VARIABLE, MAX_LUCK_LEVEL, LUCK_DENOMINATOR, SPARKLY, RAINBOW, \
+from ..catalog import get_catalog
+from ..catalog.luck import get_luck_percent
+from ..models import ItemToken, Achievement
+from ..models._constants import MYTHLING_TYPE_TO_DRAW_VARIABLE, SPARKLY, RAINBOW, \
     GOLDEN, FIND_MYTHEGG
 
 
@@ -10,51 +12,56 @@ class MytheggFinder:
         if hearts_gained <= 0:
             return
 
-        luck_percent = min(session.hero.luck_level, MAX_LUCK_LEVEL) / LUCK_DENOMINATOR
-        mythegg_to_draw_for = Mythling.objects.get(mythling_type=SPARKLY)
+        mythegg_to_draw_for = get_catalog().mythlings_by_type[SPARKLY]
 
-        draw_count = 0
-        i = 0
-        while i < hearts_gained:
-            draw_count += (villager_state.affinity_tier - i)
-            i += 1
-            # so if you gain 1 heart and get up to tier 3, you get 3 draws
-            # if you gain 2 hearts and get up to tier 4, you get 4 + 3 draws
+        # a draw for each heart's tier, counting down from the one reached: so if you gain 1 heart and get up to
+        # tier 3, you get 3 draws; if you gain 2 hearts and get up to tier 4, you get 4 + 3 draws
+        tier = villager_state.affinity_tier
+        draw_count = hearts_gained * tier - hearts_gained * (hearts_gained - 1) // 2
 
-        return self.draw_for_mythegg(session, mythegg_to_draw_for, luck_percent, draw_count)
+        return self.draw_for_mythegg(session, mythegg_to_draw_for, session.hero.luck_level, draw_count)
 
     def draw_for_new_day_mythegg(self, session):
         if session.hero_state.mytheggs_found < 5:
             return
 
-        mythegg_to_draw_for = Mythling.objects.get(mythling_type=RAINBOW)
+        mythegg_to_draw_for = get_catalog().mythlings_by_type[RAINBOW]
         return self.draw_for_mythegg(session, mythegg_to_draw_for, is_guaranteed=True)
 
     def draw_for_shop_populate_mythegg(self, session):
-        luck_percent = min(session.hero.luck_level, MAX_LUCK_LEVEL) / LUCK_DENOMINATOR
-        mythegg_to_draw_for = Mythling.objects.get(mythling_type=GOLDEN)
+        mythegg_to_draw_for = get_catalog().mythlings_by_type[GOLDEN]
 
-        return self.draw_for_mythegg(session, mythegg_to_draw_for, luck_percent)
+        return self.draw_for_mythegg(session, mythegg_to_draw_for, session.hero.luck_level)
 
-    def draw_for_mythegg(self, session, mythegg, luck_percent=0, draw_count=1, is_guaranteed=False):
-        if not session.hero.knowledge.filter(mytheggknowledge__mythegg=mythegg).exists():
+    def draw_for_mythegg(self, session, mythegg, luck_level=0, draw_count=1, is_guaranteed=False):
+        if not self.can_find_mythegg(session, mythegg):
             return
 
-        mythling_state, created = MythlingState.objects.get_or_create(session=session, mythling=mythegg)
-        if mythling_state.has_been_found:
-            return
+        mythling_state = session.aggregate.get_mythling_state(mythegg.id)
         if mythling_state.deferred_acquire or is_guaranteed:
             return mythegg, mythling_state
 
-        draw_chance = self.get_mythegg_draw_chance(mythegg, session.hero_state, luck_percent)
+        draw_chance = self.get_mythegg_draw_chance(mythegg, session.hero_state, luck_level)
+
+        if random.random() < self.get_combined_draw_chance(draw_chance, draw_count):
+            return mythegg, mythling_state
+
+    def can_find_mythegg(self, session, mythegg):
+        """Whether the hero knows of the mythegg, and hasn't found it yet this week -- from the loaded session,
+        without going back to the database (bar loading the hero's knowledge, the first time it's needed)"""
+        if session.aggregate.get_mythling_state(mythegg.id).has_been_found:
+            return False
 
-        i = 0
-        while i < draw_count:
-            if random.random() < draw_chance:
-                return mythegg, mythling_state
-            i += 1
+        return session.aggregate.knows_of_mythegg(mythegg.id)
 
-    def get_mythegg_draw_chance(self, mythegg, hero_state, luck_percent):
+    def get_combined_draw_chance(self, draw_chance, draw_count):
+        """The chance of at least one of draw_count draws coming up, each with the given chance -- so a handful of
+        draws takes one random number rather than one each"""
+        draw_chance = min(max(draw_chance, 0), 1)
+
+        return 1 - (1 - draw_chance) ** max(draw_count, 0)
+
+    def get_mythegg_draw_chance(self, mythegg, hero_state, luck_level=0):
         base_value_attr = MYTHLING_TYPE_TO_DRAW_VARIABLE[mythegg.mythling_type]
 
         if hasattr(hero_state, base_value_attr):
@@ -62,20 +69,20 @@ class MytheggFinder:
         else:
             raise ValueError(f'Expected hero_state to have {base_value_attr} attr for mythegg draw')
 
-        draw_chance = base_value * mythegg.acquisition_increase_step * (1 + luck_percent)
+        draw_chance = base_value * mythegg.acquisition_increase_step * (1 + get_luck_percent(luck_level))
 
         return draw_chance
 
     def award_mythegg(self, session, item_destination, mythegg, mythling_state):
-        item_destination.item_tokens.add(ItemToken.objects.create(session=session, item=mythegg))
+        item_destination.add_item_tokens(ItemToken.objects.create(session=session, item_id=mythegg.id))
 
         self.__mark_mythegg_awarded(session, mythegg, mythling_state)
 
     def award_mythegg_token(self, session, item_destination, mythegg_token):
-        item_destination.item_tokens.add(mythegg_token)
+        item_destination.add_item_tokens(mythegg_token)
 
-        mythling_state, created = MythlingState.objects.get_or_create(session=session, mythling=mythegg_token.item)
-        self.__mark_mythegg_awarded(session, mythegg_token.item.mythling, mythling_state)
+        mythling_state = session.aggregate.get_mythling_state(mythegg_token.item_id)
+        self.__mark_mythegg_awarded(session, get_catalog().mythlings[mythegg_token.item_id], mythling_state)
 
     def __mark_mythegg_awarded(self, session, mythegg, mythling_state):
         session.mark_fresh('hero', 'inventory')
@@ -85,6 +92,9 @@ class MytheggFinder:
 
         mythling_state.mark_found().save()
 
+        session.gain_mythling_power(mythegg.mythling_type)
+        session.save()
+
         self.__check_find_mythegg_achievements(session, mythegg, mythling_state)
 
     def __check_find_mythegg_achievements(self, session, mythegg, mythling_state):
@@ -103,5 +113,8 @@ class MytheggFinder:
             session.messages.create(text="You get the strangest feeling... like there's something magical waiting for you at home.")
 
     def mark_mythegg_token_given_away(self, session, mythegg_token):
-        mythling_state, created = MythlingState.objects.get_or_create(session=session, mythling=mythegg_token.item)
+        mythling_state = session.aggregate.get_mythling_state(mythegg_token.item_id)
         mythling_state.mark_given_away().save()
+
+        session.lose_mythling_power(get_catalog().mythlings[mythegg_token.item_id].mythling_type)
+        session.save()
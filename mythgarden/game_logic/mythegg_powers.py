@@ -1,4 +1,4 @@
-from ..models._constants import SPARKLY, RAINBOW, GOLDEN, SPOOPY, VERDANT, CORAL
+from ..models._constants import SPARKLY, RAINBOW, GOLDEN, SPOOPY, VERDANT, CORAL, MOUNTAIN, SPOOPY_LUCK_BONUS
 
 class MytheggPowers:
     def spoopy_active(self, session):
@@ -19,10 +19,12 @@ class MytheggPowers:
     def rainbow_active(self, session):
         return self.is_active(RAINBOW, session)
 
-    def is_active(self, mythling_type, session):
-        mythling_state = session.mythling_states.filter(mythling__mythling_type=mythling_type)
+    def gather_luck_bonus(self, session):
+        """The extra luck levels the hero gathers with where they are right now"""
+        if self.spoopy_active(session) and session.location.place_type == MOUNTAIN:
+            return SPOOPY_LUCK_BONUS
 
-        if len(mythling_state) == 0:
-            return False
+        return 0
 
-        return mythling_state.first().is_in_possession
+    def is_active(self, mythling_type, session):
+        return session.has_mythling_power(mythling_type)
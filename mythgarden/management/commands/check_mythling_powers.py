@@ -0,0 +1,42 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mythgarden.models import Session, MythlingState
+
+
+class Command(BaseCommand):
+    help = "Checks every session's mythling_powers against the mythlings its mythling states have in possession."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help='Overwrite any masks that are out of step with the ones worked out from the states')
+
+    def handle(self, *args, **options):
+        mythling_types_by_session = defaultdict(list)
+        in_possession = MythlingState.objects.filter(is_in_possession=True) \
+            .values_list('session_id', 'mythling__mythling_type')
+
+        for session_id, mythling_type in in_possession:
+            mythling_types_by_session[session_id].append(mythling_type)
+
+        mismatched = []
+        for session in Session.objects.only('key', 'mythling_powers'):
+            expected = Session.get_mythling_powers_mask(mythling_types_by_session[session.key])
+
+            if session.mythling_powers != expected:
+                self.stdout.write(f'{session}: mythling_powers is {session.mythling_powers:#08b}, '
+                                  f'its mythling states say {expected:#08b}')
+
+                session.mythling_powers = expected
+                mismatched.append(session)
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS('Every session\'s mythling powers match its mythling states'))
+            return
+
+        if not options['fix']:
+            raise CommandError(f'{len(mismatched)} session(s) have mythling powers out of step (run with --fix)')
+
+        Session.objects.bulk_update(mismatched, ['mythling_powers'])
+        self.stdout.write(self.style.SUCCESS(f'Fixed the mythling powers of {len(mismatched)} session(s)'))
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django import db
+
+from mythgarden.catalog import write_artifact, reset_catalog
+from mythgarden.catalog.loader import load_snapshot
+from mythgarden.models import CatalogGeneration
+
+
+class Command(BaseCommand):
+    help = 'Compiles all world content into a binary catalog artifact that workers memory-map on startup.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', type=str, default=settings.CATALOG_ARTIFACT_PATH,
+                            help='Path to write the artifact to (defaults to CATALOG_ARTIFACT_PATH)')
+
+    def handle(self, *args, **options):
+        # generation 0 just means "never bumped", which a brand new database shares; make sure we're past it
+        # so an artifact compiled here can't be mistaken for the content of some other fresh database
+        if CatalogGeneration.get_current() == 0:
+            CatalogGeneration.bump()
+            reset_catalog()
+
+        snapshot = load_snapshot()
+        write_artifact(options['output'], snapshot)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Compiled catalog generation {snapshot["generation"]} to {options["output"]}'
+        ))
+
+        db.connections.close_all()
@@ -4,6 +4,7 @@ import sys
 
 # noinspection PyUnresolvedReferences
 from mythgarden.models import *
+from mythgarden.catalog import bump_catalog_generation
 from ._command_helpers import str_to_class, snakecase_to_titlecase
 
 
@@ -19,4 +20,7 @@ class Command(BaseCommand):
             table_cls.objects.all().delete()
             self.stdout.write(self.style.SUCCESS(f'Flushed table {table}'))
 
+        # running workers may still have the flushed rows cached in their catalogs
+        bump_catalog_generation()
+
         db.connections.close_all()
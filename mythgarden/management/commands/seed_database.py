@@ -8,6 +8,7 @@ import re
 
 # noinspection PyUnresolvedReferences
 from mythgarden.models import *
+from mythgarden.catalog import bump_catalog_generation
 from ._command_helpers import str_to_class, snakecase_to_titlecase
 
 
@@ -168,6 +169,12 @@ class Command(BaseCommand):
             f'Successfully seeded database by creating {self.created_count} and finding {self.found_count} instances')
         )
 
+        growth_stage_count = Item.objects.create_growth_stages()
+        self.stdout.write(self.style.SUCCESS(f'Created {growth_stage_count} missing growth stage items'))
+
+        # one final bump, in case any content was written through a path that doesn't send model signals
+        bump_catalog_generation()
+
         db.connections.close_all()
 
     def parse_fk_cell(self, field_name, field_value):
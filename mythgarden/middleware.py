@@ -0,0 +1,14 @@
+from .catalog import refresh_catalog_if_stale
+
+
+class CatalogGenerationMiddleware:
+    """Checks at the start of each request whether world content was edited since this worker loaded its catalog
+    (e.g. in the admin or by a seeding command), and drops the stale catalog if so."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        refresh_catalog_if_stale()
+
+        return self.get_response(request)
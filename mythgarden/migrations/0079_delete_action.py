@@ -0,0 +1,16 @@
+# Generated by Django 4.1.5 on 2026-10-18 14:18
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mythgarden', '0078_catalog_generation'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='Action',
+        ),
+    ]
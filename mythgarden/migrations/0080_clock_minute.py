@@ -0,0 +1,66 @@
+# Generated manually to replace the clock's day & time columns with minutes since the start of the run
+
+from django.db import migrations, models
+import django.core.validators
+
+DAYS = ['MON', 'TUE', 'WED', 'THU', 'FRI', 'SAT', 'SUN']
+MINUTES_IN_A_DAY = 24 * 60
+
+
+def convert_to_minutes(apps, schema_editor):
+    """Set each clock's minute & last triggered minute from its day & time."""
+    Clock = apps.get_model('mythgarden', 'Clock')
+
+    for clock in Clock.objects.all():
+        clock.minute = DAYS.index(clock.day) * MINUTES_IN_A_DAY + clock.time
+        clock.last_triggered_minute = DAYS.index(clock.last_triggered_day) * MINUTES_IN_A_DAY + clock.last_triggered_time
+        clock.save(update_fields=['minute', 'last_triggered_minute'])
+
+
+def convert_from_minutes(apps, schema_editor):
+    """Set each clock's day & time back from its minute & last triggered minute."""
+    Clock = apps.get_model('mythgarden', 'Clock')
+
+    for clock in Clock.objects.all():
+        day_index, clock.time = divmod(clock.minute, MINUTES_IN_A_DAY)
+        clock.day = DAYS[day_index % len(DAYS)]
+        day_index, clock.last_triggered_time = divmod(clock.last_triggered_minute, MINUTES_IN_A_DAY)
+        clock.last_triggered_day = DAYS[day_index % len(DAYS)]
+        clock.save(update_fields=['day', 'time', 'last_triggered_day', 'last_triggered_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mythgarden', '0079_delete_action'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clock',
+            name='minute',
+            field=models.IntegerField(default=360, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AddField(
+            model_name='clock',
+            name='last_triggered_minute',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.RunPython(convert_to_minutes, convert_from_minutes),
+        migrations.RemoveField(
+            model_name='clock',
+            name='day',
+        ),
+        migrations.RemoveField(
+            model_name='clock',
+            name='time',
+        ),
+        migrations.RemoveField(
+            model_name='clock',
+            name='last_triggered_day',
+        ),
+        migrations.RemoveField(
+            model_name='clock',
+            name='last_triggered_time',
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated manually to create every growth stage item up front, rather than while the farm grows
+
+from django.db import migrations
+from django.db.models import F
+
+# the growth rules as they stood when this migration was written (see catalog/growth.py), copied in so that later
+# changes to them can't change what this migration does
+TYPE_NAMES = {'SEED': 'Seed', 'SPROUT': 'Sprout', 'CROP': 'Crop'}
+RARITIES = ['COMMON', 'UNCOMMON', 'RARE', 'EPIC', 'MYTHIC']
+CROP_PROFIT_MULTIPLIER = 10
+GOLD_CROP_PREFIX = 'Golden'
+GOLD_CROP_PROFIT_MULTIPLIER = 20
+
+GROWTH_TRANSITIONS = [('SPROUT', False), ('CROP', False), ('CROP', True)]
+
+
+def next_growth_stage_fields(item, next_type, grow_golden_crops):
+    curr_type_name = TYPE_NAMES[item.item_type]
+    next_type_name = TYPE_NAMES[next_type]
+
+    if next_type == 'CROP':
+        crop_name = item.name.replace(f' {curr_type_name}', '')
+        name = f'{GOLD_CROP_PREFIX} {crop_name.split()[-1]}' if grow_golden_crops else crop_name
+        price = item.price * (GOLD_CROP_PROFIT_MULTIPLIER if grow_golden_crops else CROP_PROFIT_MULTIPLIER)
+        rarity = RARITIES[RARITIES.index(item.rarity) + 1] if grow_golden_crops else item.rarity
+    else:
+        name = item.name.replace(curr_type_name, next_type_name)
+        price = item.price
+        rarity = item.rarity
+
+    return {
+        'name': name,
+        'item_type': next_type,
+        'price': price,
+        'rarity': rarity,
+        'growth_days': item.growth_days,
+        'effort_time': item.effort_time,
+    }
+
+
+def growth_stage_closure(items):
+    stages = {}
+
+    for item in items:
+        for next_type, grow_golden_crops in GROWTH_TRANSITIONS:
+            fields = next_growth_stage_fields(item, next_type, grow_golden_crops)
+            stages.setdefault(fields['name'], fields)
+
+    return list(stages.values())
+
+
+def create_growth_stages(apps, schema_editor):
+    """Create whichever sprouts, crops & golden crops the seeds can grow into that don't exist yet."""
+    Item = apps.get_model('mythgarden', 'Item')
+    CatalogGeneration = apps.get_model('mythgarden', 'CatalogGeneration')
+
+    existing_names = set(Item.objects.values_list('name', flat=True))
+    stages = growth_stage_closure(Item.objects.filter(item_type__in=['SEED', 'SPROUT']))
+    missing = [Item(**fields) for fields in stages if fields['name'] not in existing_names]
+
+    if missing:
+        Item.objects.bulk_create(missing)
+        # world content changed, so any compiled or cached catalog is out of date
+        CatalogGeneration.objects.filter(pk=1).update(generation=F('generation') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mythgarden', '0080_clock_minute'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_growth_stages, migrations.RunPython.noop),
+    ]
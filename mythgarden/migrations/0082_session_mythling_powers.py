@@ -0,0 +1,36 @@
+# Generated manually to add the session's mythling power bitmask, filled in from its mythling states
+
+from django.db import migrations, models
+
+# the bits from MYTHLING_POWER_BITS, as they were when this migration was written
+MYTHLING_POWER_BITS = {'SPOOPY': 1, 'VERDANT': 2, 'CORAL': 4, 'SPARKLY': 8, 'GOLDEN': 16, 'RAINBOW': 32}
+
+
+def fill_mythling_powers(apps, schema_editor):
+    """Set each session's mythling powers from the mythlings it has in possession."""
+    Session = apps.get_model('mythgarden', 'Session')
+    MythlingState = apps.get_model('mythgarden', 'MythlingState')
+
+    masks = {}
+    in_possession = MythlingState.objects.filter(is_in_possession=True).values_list('session_id', 'mythling__mythling_type')
+    for session_id, mythling_type in in_possession:
+        masks[session_id] = masks.get(session_id, 0) | MYTHLING_POWER_BITS[mythling_type]
+
+    for session_id, mask in masks.items():
+        Session.objects.filter(pk=session_id).update(mythling_powers=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mythgarden', '0081_create_growth_stages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='mythling_powers',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_mythling_powers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated manually to add the hero state's count of villagers at each number of hearts, filled in from the
+# session's villager states
+
+from django.db import migrations, models
+
+AFFINITY_TIER_SIZE = 20
+TOTAL_TIERS = 5
+
+
+def fill_villagers_with_hearts(apps, schema_editor):
+    """Count, for each hero state, how many of its session's villagers are at 1 heart or more, 2 or more, etc."""
+    HeroState = apps.get_model('mythgarden', 'HeroState')
+    VillagerState = apps.get_model('mythgarden', 'VillagerState')
+
+    counts_by_session = {}
+    for session_id, affinity in VillagerState.objects.values_list('session_id', 'affinity'):
+        counts = counts_by_session.setdefault(session_id, [0] * TOTAL_TIERS)
+
+        for tier in range(1, affinity // AFFINITY_TIER_SIZE + 1):
+            counts[tier - 1] += 1
+
+    for session_id, counts in counts_by_session.items():
+        HeroState.objects.filter(session_id=session_id).update(villagers_with_hearts=counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mythgarden', '0082_session_mythling_powers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='herostate',
+            name='villagers_with_hearts',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(fill_villagers_with_hearts, migrations.RunPython.noop),
+    ]
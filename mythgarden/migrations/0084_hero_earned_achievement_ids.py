@@ -0,0 +1,45 @@
+# Generated manually to store the hero's earned achievements as a sorted list of ids on the hero's own row, filled in
+# from the achievements many-to-many
+
+from django.db import migrations, models
+
+
+def fill_earned_achievement_ids(apps, schema_editor):
+    Hero = apps.get_model('mythgarden', 'Hero')
+
+    earned_by_hero = {}
+    for hero_id, achievement_id in Hero.achievements.through.objects.values_list('hero_id', 'achievement_id'):
+        earned_by_hero.setdefault(hero_id, []).append(achievement_id)
+
+    for hero_id, achievement_ids in earned_by_hero.items():
+        Hero.objects.filter(pk=hero_id).update(earned_achievement_ids=sorted(set(achievement_ids)))
+
+
+def fill_achievements(apps, schema_editor):
+    """Copy the earned ids back to the many-to-many, for anything earned since"""
+    Hero = apps.get_model('mythgarden', 'Hero')
+    Through = Hero.achievements.through
+
+    existing = set(Through.objects.values_list('hero_id', 'achievement_id'))
+    Through.objects.bulk_create([
+        Through(hero_id=hero_id, achievement_id=achievement_id)
+        for hero_id, achievement_ids in Hero.objects.values_list('pk', 'earned_achievement_ids')
+        for achievement_id in achievement_ids
+        if (hero_id, achievement_id) not in existing
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mythgarden', '0083_herostate_villagers_with_hearts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hero',
+            name='earned_achievement_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(fill_earned_achievement_ids, fill_achievements),
+    ]
@@ -0,0 +1,121 @@
+# Generated manually to move item tokens from the inventory/place state many-to-manys onto a container foreign key
+# (and slot) on the token itself, filled in from the through tables
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+MAX_ITEMS = 6
+
+
+def fill_containers(apps, schema_editor):
+    """Point each token at the container it's in, in slots numbered in token order (a token that was somehow in more
+    than one keeps the first; any past MAX_ITEMS go unslotted)"""
+    ItemToken = apps.get_model('mythgarden', 'ItemToken')
+    InventoryItemTokens = apps.get_model('mythgarden', 'Inventory_item_tokens')
+    PlaceStateItemTokens = apps.get_model('mythgarden', 'PlaceState_item_tokens')
+
+    containers = {}
+    links = [
+        *(('inventory_id', holder_id, token_id) for holder_id, token_id in
+          InventoryItemTokens.objects.order_by('itemtoken_id').values_list('inventory_id', 'itemtoken_id')),
+        *(('place_state_id', holder_id, token_id) for holder_id, token_id in
+          PlaceStateItemTokens.objects.order_by('itemtoken_id').values_list('placestate_id', 'itemtoken_id')),
+    ]
+
+    slots_taken = {}
+    for container_field, holder_id, token_id in links:
+        if token_id in containers:
+            continue
+
+        slot = slots_taken.get((container_field, holder_id), 0)
+        slots_taken[(container_field, holder_id)] = slot + 1
+
+        containers[token_id] = (container_field, holder_id, slot if slot < MAX_ITEMS else None)
+
+    item_tokens = ItemToken.objects.filter(pk__in=containers).only('pk')
+    for item_token in item_tokens:
+        container_field, holder_id, slot = containers[item_token.pk]
+        setattr(item_token, container_field, holder_id)
+        item_token.slot = slot
+
+    ItemToken.objects.bulk_update(item_tokens, ['inventory', 'place_state', 'slot'], batch_size=500)
+
+
+def fill_through_tables(apps, schema_editor):
+    ItemToken = apps.get_model('mythgarden', 'ItemToken')
+    InventoryItemTokens = apps.get_model('mythgarden', 'Inventory_item_tokens')
+    PlaceStateItemTokens = apps.get_model('mythgarden', 'PlaceState_item_tokens')
+
+    in_containers = ItemToken.objects.values_list('pk', 'inventory_id', 'place_state_id')
+
+    InventoryItemTokens.objects.bulk_create([
+        InventoryItemTokens(inventory_id=inventory_id, itemtoken_id=token_id)
+        for token_id, inventory_id, place_state_id in in_containers if inventory_id is not None
+    ])
+    PlaceStateItemTokens.objects.bulk_create([
+        PlaceStateItemTokens(placestate_id=place_state_id, itemtoken_id=token_id)
+        for token_id, inventory_id, place_state_id in in_containers if place_state_id is not None
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mythgarden', '0084_hero_earned_achievement_ids'),
+    ]
+
+    operations = [
+        # (no reverse accessors until the many-to-manys are gone, since they'd clash)
+        migrations.AddField(
+            model_name='itemtoken',
+            name='inventory',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL,
+                                    related_name='+', to='mythgarden.inventory'),
+        ),
+        migrations.AddField(
+            model_name='itemtoken',
+            name='place_state',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL,
+                                    related_name='+', to='mythgarden.placestate'),
+        ),
+        migrations.AddField(
+            model_name='itemtoken',
+            name='slot',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_containers, fill_through_tables),
+        migrations.RemoveField(
+            model_name='inventory',
+            name='item_tokens',
+        ),
+        migrations.RemoveField(
+            model_name='placestate',
+            name='item_tokens',
+        ),
+        migrations.AlterField(
+            model_name='itemtoken',
+            name='inventory',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL,
+                                    related_name='item_tokens', to='mythgarden.inventory'),
+        ),
+        migrations.AlterField(
+            model_name='itemtoken',
+            name='place_state',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL,
+                                    related_name='item_tokens', to='mythgarden.placestate'),
+        ),
+        migrations.AddConstraint(
+            model_name='itemtoken',
+            constraint=models.CheckConstraint(
+                check=models.Q(('inventory__isnull', True), ('place_state__isnull', True), _connector='OR'),
+                name='item_token_in_one_container'
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='itemtoken',
+            constraint=models.CheckConstraint(
+                check=models.Q(('slot__isnull', True), ('slot__lt', 6), _connector='OR'),
+                name='item_token_slot_within_max_items'
+            ),
+        ),
+    ]
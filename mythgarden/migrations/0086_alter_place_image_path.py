@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mythgarden', '0085_itemtoken_container'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='place',
+            name='image_path',
+            field=models.CharField(default='farm-kz.jpeg', max_length=255),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.1.5 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mythgarden', '0086_alter_place_image_path'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='itemtoken',
+            constraint=models.UniqueConstraint(condition=models.Q(('inventory__isnull', False)), fields=('inventory', 'slot'), name='item_token_unique_inventory_slot'),
+        ),
+        migrations.AddConstraint(
+            model_name='itemtoken',
+            constraint=models.UniqueConstraint(condition=models.Q(('place_state__isnull', False)), fields=('place_state', 'slot'), name='item_token_unique_place_state_slot'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 # models which import zero other models
 from .action import Action
 from .bridge import Bridge
+from .catalog_generation import CatalogGeneration
 from .clock import Clock
 from .dialogue import DialogueLine
 from .farmer_portrait import FarmerPortrait
@@ -10,6 +11,7 @@ from .message import Message
 from .inventory import Inventory
 from .item import Item, ItemToken, Mythling, MythlingState  # should move mythling into own file, yes yes
 from .item_type_preference import ItemTypePreference
+from .unit_of_work import UnitOfWork
 from .wallet import Wallet
 
 # imports from .farmer_portrait
@@ -25,5 +27,7 @@ from .villager import Villager, VillagerState
 
 # imports from .villager and .knowledge
 from .achievement import Achievement
-# imports from .hero, .place, .villager, and .item (mythling)
+# imports from .place, .villager, and .item (mythling)
+from .session_aggregate import SessionAggregate
+# imports from .hero, .place, .villager, .item (mythling), and .session_aggregate
 from .session import Session
@@ -13,6 +13,7 @@ DIRECTIONS = [
 MAX_ITEMS = 6
 
 MINUTES_IN_A_DAY = 24 * 60
+MINUTES_IN_A_WEEK = 7 * MINUTES_IN_A_DAY
 MINUTES_IN_A_HALF_DAY = 12 * 60
 MINUTES_IN_A_QUARTER_DAY = 6 * 60
 DAWN = MINUTES_IN_A_QUARTER_DAY
@@ -260,6 +261,9 @@ EXIT_DESCRIPTION = 'Exit'
 WELCOME_MESSAGE = 'Welcome to Mythgarden! You have one week to grow crops, make friends, and find treasures. Ooh and you can pick an avatar and change your name if you want! Good luck and have fun!'
 
 TALK_MINUTES_PER_FRIENDLINESS = 10
+ALWAYS_MOVING_VILLAGERS = ['Trix']  # follow their schedule even when the villagers_move setting is off
+TRAVEL_MINUTES = 60  # to cross a bridge
+ENTER_EXIT_MINUTES = 5  # to go in or out of a building
 
 BOOST_DENOMINATOR = 30  # means that every level of boost reduces action time by 1/30th, aka from 90->87, 60->58, 30->29, 5->4
 MAX_BOOST_LEVEL = BOOST_DENOMINATOR - 5  # max boost will reduce all action times by 25/30ths, aka from 90->15, 60->10, 30->5, 5->0
@@ -361,6 +365,9 @@ MYTHLING_TYPES = [
     (RAINBOW, 'rainbow'),
 ]
 
+# each mythling type's bit in Session.mythling_powers -- only ever add to the end, since the masks are stored
+MYTHLING_POWER_BITS = {mythling_type: 1 << index for index, (mythling_type, _) in enumerate(MYTHLING_TYPES)}
+
 MYTHLING_TYPE_TO_DRAW_VARIABLE = {
     SPOOPY: 'mining_attempts',
     VERDANT: 'foraging_attempts',
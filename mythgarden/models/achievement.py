@@ -1,9 +1,8 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
-from .knowledge import Knowledge
-from ._constants import ACHIEVEMENT_TYPES, ACHIEVEMENT_TRIGGER_TYPES, GATHER, ACHIEVEMENT_EMOJIS, BEST_FRIENDS, \
-    FAST_FRIENDS, STEADFAST_FRIENDS
+from ._constants import ACHIEVEMENT_TYPES, ACHIEVEMENT_TRIGGER_TYPES
+from ..catalog import get_catalog
 
 
 class AchievementManager(models.Manager):
@@ -27,165 +26,69 @@ class Achievement(models.Model):
     def __str__(self):
         return f"{self.name}: {self.description}"
 
-    def serialize(self):
-        return {
-            'name': self.name,
-            'description': self.description,
-            'emoji': self.emoji,
-            'id': self.id,
-            'unlockedKnowledge': self.unlocked_knowledge_names
-        }
-
-    @property
-    def emoji(self):
-        if self.trigger_type == GATHER:
-            return ACHIEVEMENT_EMOJIS[GATHER][self.achievement_type]
-        else:
-            return ACHIEVEMENT_EMOJIS[self.trigger_type]
-
-    @property
-    def unlocked_message(self):
-        return f"🎉 Achievement Unlocked: {self.name}!"
-
-    @property
-    def unlocked_knowledge_names(self):
-        if self.unlocked_knowledge.count() == 0:
-            return
-
-        unlocked_knowledge_names = self.unlocked_knowledge.all().values_list('display_name', flat=True)
-
-        return list(set(unlocked_knowledge_names))
-
     @classmethod
-    def check_triggered_achievements(cls, trigger_type, session, *args, **kwargs):
-        achievements = cls.objects.filter(trigger_type=trigger_type)
+    def check_triggered_achievements(cls, trigger_type, session, **state):
+        achievement_checks = get_catalog().achievement_checks_for(trigger_type)
 
-        return cls.check_achievements(achievements, session, *args, **kwargs)
+        return cls.check_achievements(achievement_checks, session, **state)
 
     @classmethod
-    def check_achievements(cls, achievements, session, *args, **kwargs):
-        already_earned = session.hero.achievements.select_related('villager').all()
+    def check_achievements(cls, achievement_checks, session, **state):
+        """Run the given (catalog achievement record, compiled check) pairs against the given state, and award any
+        newly completed ones (plus their knowledge) to the session's hero. The hero's earned achievements come from
+        the session aggregate, so this only goes to the database to write what's newly notched (to the hero's row)."""
+        earned_achievement_ids = session.aggregate.earned_achievement_ids
         notched_achievements = []
 
-        for achievement in achievements:
-            if achievement in already_earned:
+        for achievement, check in achievement_checks:
+            if achievement.id in earned_achievement_ids:
                 continue
 
-            achieved = achievement.check_if_completed(*args, **kwargs)
-
-            if achieved:
-                session.hero.achievements.add(achievement)
+            if check(earned_achievement_ids=earned_achievement_ids, **state):
                 session.messages.create(text=achievement.unlocked_message)
                 notched_achievements.append(achievement)
 
-        new_knowledge = Knowledge.objects.filter(unlocking_achievement__in=notched_achievements)
-        session.hero.knowledge.add(*new_knowledge)
-
-        return len(notched_achievements)
-
-    def check_if_completed(self, *args, **kwargs):
-        ck = f'check_{self.achievement_type.lower()}'
-
-        if hasattr(self, ck) and callable(getattr(self, ck)):
-            return getattr(self, ck)(*args, **kwargs)
-
-    # trigger_type SCORE_POINTS
-    def check_high_score(self, hero_state):
-        return hero_state.score >= self.threshold
-
-    # trigger_type GAIN_HEARTS
-    def check_all_villagers_hearts(self, villager_states, *args, **kwargs):
-        min_hearts = min([v_state.affinity_tier for v_state in villager_states])
-
-        return min_hearts >= self.threshold
-
-    def check_multiple_best_friends(self, villager_states, *args, **kwargs):
-        best_friends = [v_state for v_state in villager_states if v_state.is_bestie]
-
-        return len(best_friends) >= self.threshold
-
-    def check_best_friends(self, villager_state, *args, **kwargs):
-        is_right_villager = villager_state.villager == self.villager
+        if len(notched_achievements) == 0:
+            return 0
 
-        return villager_state.is_bestie and is_right_villager
+        session.hero.earn_achievements(*[achievement.id for achievement in notched_achievements])
+        earned_achievement_ids.update(achievement.id for achievement in notched_achievements)
 
-    def check_fast_friends(self, villager_state, clock, *args, **kwargs):
-        is_right_villager = villager_state.villager == self.villager
-        is_fast = clock.day_index <= self.threshold_day_number
+        new_knowledge_ids = [k_id for achievement in notched_achievements for k_id in achievement.unlocked_knowledge_ids]
+        if len(new_knowledge_ids) > 0:
+            session.learn_knowledge(*new_knowledge_ids)
 
-        return is_fast and villager_state.is_bestie and is_right_villager
-
-    # trigger_type TALKED_TO_VILLAGERS
-    def check_steadfast_friends(self, villager_state, *args, **kwargs):
-        is_right_villager = villager_state.villager == self.villager
-        is_steadfast = villager_state.talked_to_count == self.threshold
-
-        return is_steadfast and is_right_villager
-
-    # trigger_type GAIN_ACHIEVEMENT
-    def check_bestest_friends(self, hero):
-        achievement_count = hero.achievements.filter(achievement_type=BEST_FRIENDS).count()
-
-        return achievement_count >= self.threshold
-
-    def check_fastest_friends(self, hero):
-        achievement_count = hero.achievements.filter(achievement_type=FAST_FRIENDS).count()
-
-        return achievement_count >= self.threshold
-
-    def check_steadfastest_friends(self, hero):
-        achievement_count = hero.achievements.filter(achievement_type=STEADFAST_FRIENDS).count()
-
-        return achievement_count >= self.threshold
-
-    # trigger_type EARN_MONEY
-    def check_gross_income(self, hero_state, *args, **kwargs):
-        return hero_state.koin_earned >= self.threshold
-
-    def check_fast_cash(self, hero_state, clock, *args, **kwargs):
-        earned_enough = hero_state.koin_earned >= self.threshold
-        fast_enough = clock.day_index <= self.threshold_day_number
-
-        return earned_enough and fast_enough
-
-    def check_balanced_income(self, hero_state, *args, **kwargs):
-        min_income = min([
-            hero_state.farming_koin_earned,
-            hero_state.mining_koin_earned,
-            hero_state.fishing_koin_earned,
-            hero_state.foraging_koin_earned
-        ])
-
-        return min_income >= self.threshold
-
-    # trigger_type HARVEST
-    def check_farming_intake(self, hero_state):
-        return hero_state.farming_intake >= self.threshold
-
-    # trigger_type GATHER
-    def check_mining_intake(self, hero_state):
-        return hero_state.mining_intake >= self.threshold
+        return len(notched_achievements)
 
-    def check_fishing_intake(self, hero_state):
-        return hero_state.fishing_intake >= self.threshold
+    @classmethod
+    def get_progress(cls, session):
+        """How far the hero is along each achievement with a threshold that they haven't earned yet -- all from
+        counters kept on the hero state, so this doesn't query anything the session hasn't loaded already"""
+        catalog = get_catalog()
+        earned_achievement_ids = session.aggregate.earned_achievement_ids
+        state = {
+            'hero_state': session.hero_state,
+            'villager_count': len(session.aggregate.villager_states),
+            'earned_achievement_ids': earned_achievement_ids,
+        }
 
-    def check_foraging_intake(self, hero_state):
-        return hero_state.foraging_intake >= self.threshold
+        progress = []
+        for achievement in catalog.achievements.values():
+            get_achievement_progress = catalog.achievement_progress_for(achievement.id)
 
-    # trigger_type FIND_MYTHEGG
+            if achievement.id not in earned_achievement_ids and get_achievement_progress is not None:
+                progress.append(AchievementProgress(achievement, *get_achievement_progress(**state)))
 
-    def check_discover_mythegg(self, mythegg, mythling_state, *args, **kwargs):
-        is_right_mythegg = mythegg == self.mythegg
-        is_found = mythling_state.has_been_found
+        return progress
 
-        return is_found and is_right_mythegg
 
-    def check_fast_mythegg(self, mythegg, mythling_state, clock, *args, **kwargs):
-        is_right_mythegg = mythegg == self.mythegg or self.mythegg is None
-        is_found = mythling_state.has_been_found
-        fast_enough = clock.day_index <= self.threshold_day_number
+class AchievementProgress:
+    """An achievement the hero is working towards, and how far along they are"""
 
-        return fast_enough and is_found and is_right_mythegg
+    def __init__(self, achievement, current, threshold):
+        self.achievement = achievement
+        self.current = current
+        self.threshold = threshold
 
-    def check_multiple_mytheggs(self, hero_state, *args, **kwargs):
-        return hero_state.mytheggs_found >= self.threshold
+    def serialize(self):
+        return self.achievement.serialize(progress=(self.current, self.threshold))
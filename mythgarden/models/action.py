@@ -1,10 +1,18 @@
-from django.db import models
-
-from ._constants import DIRECTIONS, KOIN_SIGN, FISHING_DESCRIPTION, MINING_DESCRIPTION, FORAGING_DESCRIPTION, \
+from ._constants import KOIN_SIGN, FISHING_DESCRIPTION, MINING_DESCRIPTION, FORAGING_DESCRIPTION, \
     EXIT_DESCRIPTION, ITEM_ENTITY, VILLAGER_ENTITY, PLACE_ENTITY, GIFT_ENTITY, MONEY_TYPE, TIME_TYPE
 
 
-class Action(models.Model):
+class Action:
+    """Something the hero can do right now. Actions are generated fresh for every request and never saved, so this is
+    a plain slotted object rather than a model -- and since nothing but the cost changes after it's built (see
+    ActionGenerator.apply_speed_boost), its digest, entity info & emoji are all worked out once, up front."""
+
+    __slots__ = (
+        'action_type', 'description', 'cost_amount', 'cost_unit', 'cost_wait_class', 'target_item', 'target_item_id',
+        'target_villager_id', 'target_place_id', 'direction', 'log_statement', 'unique_digest', 'entity_id',
+        'entity_type', 'emoji',
+    )
+
     TRAVEL = 'TRAVEL'
     TALK = 'TALK'
     GIVE = 'GIVE'
@@ -13,10 +21,12 @@ class Action(models.Model):
     HARVEST = 'HARVEST'
     BUY = 'BUY'
     SELL = 'SELL'
+    SELL_ALL = 'SELL_ALL'  # a whole stack at once
     STOW = 'STOW'
     RETRIEVE = 'RETRIEVE'
     GATHER = 'GATHER'
     SLEEP = 'SLEEP'
+    JOURNEY = 'JOURNEY'  # several travel actions in a row, to get somewhere further away
 
     ENTER = 'ENTER'
     EXIT = 'EXIT'
@@ -38,6 +48,7 @@ class Action(models.Model):
         HARVEST: '🌾',
         BUY: '🛒',
         SELL: '💰',
+        SELL_ALL: '💰',
         STOW: '📦',
         RETRIEVE: '🎒',
         GATHER: {
@@ -46,6 +57,7 @@ class Action(models.Model):
             FORAGING: '🌲',
         },
         SLEEP: '💤',
+        JOURNEY: '🗺️',
     }
 
     ACTION_TYPES = [
@@ -57,10 +69,12 @@ class Action(models.Model):
         (HARVEST, 'Harvest'),
         (BUY, 'Buy'),
         (SELL, 'Sell'),
+        (SELL_ALL, 'Sell_all'),  # (lowercased, it names the executor method)
         (STOW, 'Stow'),
         (RETRIEVE, 'Retrieve'),
         (GATHER, 'Gather'),
         (SLEEP, 'Sleep'),
+        (JOURNEY, 'Journey'),
     ]
 
     MIN = 'MINUTE'
@@ -125,25 +139,39 @@ class Action(models.Model):
     TIME_UNITS = [MIN, HOUR]
     MONEY_UNITS = [KOIN]
 
-    action_type = models.CharField(max_length=8, choices=ACTION_TYPES)
-    description = models.CharField(max_length=255)
+    ACTION_TYPE_DISPLAYS = dict(ACTION_TYPES)
+    COST_UNIT_DISPLAYS = dict(COST_UNITS)
+    WAIT_CLASS_DISPLAYS = dict(WAIT_CLASSES)
 
-    cost_amount = models.IntegerField(null=True, blank=True)
-    cost_unit = models.CharField(max_length=6, choices=COST_UNITS, null=True, blank=True)
-    cost_wait_class = models.CharField(max_length=17, choices=WAIT_CLASSES, null=True, blank=True)
+    def __init__(self, action_type=None, description='', cost_amount=None, cost_unit=None, cost_wait_class=None,
+                 target_item=None, target_item_id=None, target_villager_id=None, target_place_id=None, direction=None,
+                 log_statement=''):
+        self.action_type = action_type
+        self.description = description
 
-    target_item = models.ForeignKey('ItemToken', on_delete=models.CASCADE, null=True, blank=True)
-    target_villager = models.ForeignKey('Villager', on_delete=models.CASCADE, null=True, blank=True)
-    target_place = models.ForeignKey('Place', on_delete=models.CASCADE, null=True, blank=True)
+        self.cost_amount = cost_amount
+        self.cost_unit = cost_unit
+        self.cost_wait_class = cost_wait_class
 
-    direction = models.CharField(max_length=5, choices=DIRECTIONS, null=True, blank=True)
+        self.target_item = target_item
+        self.target_item_id = target_item.pk if target_item is not None else target_item_id
+        self.target_villager_id = target_villager_id
+        self.target_place_id = target_place_id
 
-    log_statement = models.CharField(
-        max_length=255)  # this should really be generated from the action_type, direct objects, etc
+        self.direction = direction
+        self.log_statement = log_statement  # this should really be generated from the action_type, direct objects, etc
+
+        self.unique_digest = self.__get_unique_digest()
+        self.entity_id = self.__get_entity_id()
+        self.entity_type = self.__get_entity_type()
+        self.emoji = self.__get_emoji()
 
     def __str__(self):
         return self.description
 
+    def __repr__(self):
+        return f'<Action: {self.unique_digest}>'
+
     def serialize(self):
         return {
             'description': self.description,
@@ -157,16 +185,24 @@ class Action(models.Model):
             'uniqueDigest': self.unique_digest,
         }
 
-    @property
-    def emoji(self):
+    def get_action_type_display(self):
+        return self.ACTION_TYPE_DISPLAYS.get(self.action_type, self.action_type)
+
+    def get_cost_unit_display(self):
+        return self.COST_UNIT_DISPLAYS.get(self.cost_unit, self.cost_unit)
+
+    def get_cost_wait_class_display(self):
+        return self.WAIT_CLASS_DISPLAYS.get(self.cost_wait_class, self.cost_wait_class)
+
+    def __get_emoji(self):
         if self.action_type == self.GATHER:
             gather_type = self.get_gather_type_of_action()
-            return self.ACTION_EMOJIS[self.GATHER][gather_type]
+            return self.ACTION_EMOJIS[self.GATHER].get(gather_type)
         elif self.action_type == self.TRAVEL:
             travel_type = self.get_travel_type_of_action()
             return self.ACTION_EMOJIS[self.TRAVEL][travel_type]
         else:
-            return self.ACTION_EMOJIS[self.action_type]
+            return self.ACTION_EMOJIS.get(self.action_type)
 
     def get_gather_type_of_action(self):
         GATHER_DESCRIPTION_MAP = {
@@ -175,7 +211,7 @@ class Action(models.Model):
             FORAGING_DESCRIPTION: self.FORAGING,
         }
 
-        return GATHER_DESCRIPTION_MAP[self.description]
+        return GATHER_DESCRIPTION_MAP.get(self.description)
 
     def get_travel_type_of_action(self):
         if self.description == EXIT_DESCRIPTION:
@@ -196,14 +232,17 @@ class Action(models.Model):
             return str(self.cost_amount) + self.get_cost_unit_display()
 
     @property
-    def unique_digest(self):
-        pks = [f'{target.pk}' for target in [self.target_item, self.target_villager, self.target_place] if target]
+    def target_ids(self):
+        # ids only, so world targets (villagers, places) never have to be fetched just to build the digest
+        return [t for t in [self.target_item_id, self.target_villager_id, self.target_place_id] if t is not None]
+
+    def __get_unique_digest(self):
+        pks = [f'{target_id}' for target_id in self.target_ids]
 
         return f'{self.action_type}-{"-".join(pks)}'
 
-    @property
-    def entity_id(self):
-        pks = [f'{target.pk}' for target in [self.target_item, self.target_villager, self.target_place] if target]
+    def __get_entity_id(self):
+        pks = [f'{target_id}' for target_id in self.target_ids]
 
         if len(pks) == 0:
             return None
@@ -214,15 +253,14 @@ class Action(models.Model):
             # and add an extra villagers-id property or something later
             return pks[0]
 
-    @property
-    def entity_type(self):
+    def __get_entity_type(self):
         entity_types = []
 
-        if self.target_item:
+        if self.target_item_id is not None:
             entity_types.append(ITEM_ENTITY)
-        if self.target_villager:
+        if self.target_villager_id is not None:
             entity_types.append(VILLAGER_ENTITY)
-        if self.target_place:
+        if self.target_place_id is not None:
             entity_types.append(PLACE_ENTITY)
 
         if len(entity_types) == 0:
@@ -238,7 +276,7 @@ class Action(models.Model):
         if self.action_type != Action.GIVE:
             return
         else:
-            return self.target_villager.pk
+            return self.target_villager_id
 
     @property
     def cost_type(self):
@@ -251,7 +289,7 @@ class Action(models.Model):
 
     @property
     def target_count(self):
-        return sum(1 for t in [self.target_item, self.target_villager, self.target_place] if t)
+        return len(self.target_ids)
 
     def is_cost_in_money(self):
         return self.cost_unit in self.MONEY_UNITS
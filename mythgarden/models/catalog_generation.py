@@ -0,0 +1,26 @@
+from django.db import models
+from django.db.models import F
+
+
+class CatalogGeneration(models.Model):
+    """Single-row counter that's bumped whenever world content changes, so every worker can tell
+    (with one cheap query) whether its in-process catalog is stale."""
+    SINGLETON_PK = 1
+
+    generation = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'Catalog generation {self.generation}'
+
+    @classmethod
+    def get_current(cls):
+        generation = cls.objects.filter(pk=cls.SINGLETON_PK).values_list('generation', flat=True).first()
+
+        return generation or 0
+
+    @classmethod
+    def bump(cls):
+        updated = cls.objects.filter(pk=cls.SINGLETON_PK).update(generation=F('generation') + 1)
+
+        if not updated:
+            cls.objects.get_or_create(pk=cls.SINGLETON_PK, defaults={'generation': 1})
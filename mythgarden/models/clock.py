@@ -1,18 +1,24 @@
-from django.core.validators import MinValueValidator, MaxValueValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
 from django.db import models
 
-from ._constants import MINUTES_IN_A_DAY, DAYS_OF_WEEK, FIRST_DAY, DAWN, MINUTES_IN_A_HALF_DAY, \
-    OVERSLEPT_TIME, DAY_TO_INDEX, SUNSET
+from .dirty_fields import DirtyFieldsMixin
+from .unit_of_work import WriteBehindMixin
 
+from ._constants import MINUTES_IN_A_DAY, DAYS_OF_WEEK, DAWN, MINUTES_IN_A_HALF_DAY, \
+    OVERSLEPT_TIME, DAY_TO_INDEX, SUNSET, MINUTES_IN_A_WEEK
+
+
+class Clock(WriteBehindMixin, DirtyFieldsMixin, models.Model):
+    """Keeps time as minutes since the start of the run (midnight on the first day), so that windows of time are
+    plain integer ranges -- day & time are worked out from that as they're needed."""
+    validate_on_save = True
 
-class Clock(models.Model):
     session = models.OneToOneField('Session', on_delete=models.CASCADE, primary_key=True)
-    day = models.CharField(default=FIRST_DAY, max_length=9, choices=DAYS_OF_WEEK)
-    time = models.IntegerField(default=DAWN, validators=[MinValueValidator(0), MaxValueValidator(MINUTES_IN_A_DAY - 1)])
+    minute = models.IntegerField(default=DAWN, validators=[MinValueValidator(0)])
     is_new_day = models.BooleanField(default=False)
 
-    last_triggered_day = models.CharField(default=FIRST_DAY, max_length=9, choices=DAYS_OF_WEEK)
-    last_triggered_time = models.IntegerField(default=0, validators=[MinValueValidator(0), MaxValueValidator(MINUTES_IN_A_DAY - 1)])
+    last_triggered_minute = models.IntegerField(default=0, validators=[MinValueValidator(0)])
 
     def __str__(self):
         return 'Clock ' + self.session.abbr_key_tag()
@@ -36,40 +42,78 @@ class Clock(models.Model):
 
         return f"{hours}:{minutes:02d}{suffix}"
 
+    @classmethod
+    def convert_to_week_minute(cls, day, time):
+        """ Returns the number of minutes from the start of the week to the given day & time """
+        return DAY_TO_INDEX[day] * MINUTES_IN_A_DAY + time
+
+    @classmethod
+    def convert_from_week_minute(cls, week_minute):
+        """ Returns the (day, time) that's the given number of minutes from the start of the week """
+        day_index, time = divmod(week_minute, MINUTES_IN_A_DAY)
+
+        return DAYS_OF_WEEK[day_index][0], time
+
     @property
     def display(self):
         return self.get_day_display() + ' ' + self.get_time_display()
 
+    @property
+    def day_of_run(self):
+        return self.minute // MINUTES_IN_A_DAY
+
     @property
     def day_index(self):
-        return DAY_TO_INDEX[self.day]
+        return self.day_of_run % len(DAYS_OF_WEEK)
+
+    @property
+    def day(self):
+        return DAYS_OF_WEEK[self.day_index][0]
+
+    @day.setter
+    def day(self, day):
+        self.minute = Clock.convert_to_week_minute(day, self.time)
+
+    @property
+    def time(self):
+        return self.minute % MINUTES_IN_A_DAY
+
+    @time.setter
+    def time(self, time):
+        if not 0 <= time < MINUTES_IN_A_DAY:
+            raise ValidationError({'time': f'Time should be between 0 and {MINUTES_IN_A_DAY - 1}, not {time}'})
+
+        self.minute = self.day_of_run * MINUTES_IN_A_DAY + time
+
+    @property
+    def is_end_of_week(self):
+        return self.minute >= MINUTES_IN_A_WEEK
+
+    def get_day_display(self):
+        return dict(DAYS_OF_WEEK)[self.day]
 
     def get_time_display(self):
         """ Returns the time as a string in the format 'hh:mmam' or 'hh:mmpm' """
         return Clock.convert_time_to_display(self.time)
 
     def advance(self, amount_in_minutes):
-        """ Updates the day and time by the given amount of time,
-        rolling the clock and days over at midnight and end of saturday respectively. """
+        """ Moves the clock on by the given amount of time, however many days that takes it across
+        (marking it as a new day if it crosses midnight). """
+        day_of_run = self.day_of_run
 
-        self.time += amount_in_minutes
+        self.minute += amount_in_minutes
 
-        days_to_add = self.time // MINUTES_IN_A_DAY
-        if days_to_add > 0:
-            self.time = self.time % MINUTES_IN_A_DAY
-            self.advance_day(days_to_add)
+        if self.day_of_run > day_of_run:
+            self.is_new_day = True
 
         return self  # for chaining
 
     def advance_day(self, days_to_add):
-        """ Advances the day by the given number of days, rolling over at the end of the week. """
-        new_day_index = (self.day_index + days_to_add) % 7
-        self.day = DAYS_OF_WEEK[new_day_index][0]
-        self.is_new_day = True
+        """ Advances the clock by the given number of whole days. """
+        self.advance(days_to_add * MINUTES_IN_A_DAY)
 
     def mark_last_triggered_point_as_now(self):
-        self.last_triggered_day = self.day
-        self.last_triggered_time = self.time
+        self.last_triggered_minute = self.minute
 
         return self  # for chaining
 
@@ -91,7 +135,3 @@ class Clock(models.Model):
     @property
     def minutes_to_overslept_time(self):
         return OVERSLEPT_TIME - self.time
-
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        return super().save(*args, **kwargs)
@@ -0,0 +1,67 @@
+import copy
+
+
+class DirtyFieldsMixin:
+    """Remembers each field's value as loaded from (or last written to) the database, so that save() can write
+    just the fields that changed -- or skip the UPDATE entirely when nothing did."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.reset_dirty_fields()
+
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self.reset_dirty_fields(fields)
+
+    def get_dirty_fields(self):
+        """Names of the fields that have changed since the last load or write. Every field counts as dirty if
+        there's nothing to compare against (eg objects that came out of a bulk_create)."""
+        fields = [field for field in self._meta.concrete_fields if not field.primary_key]
+        loaded_values = getattr(self, '_loaded_values', None)
+
+        if loaded_values is None:
+            return [field.name for field in fields]
+
+        return [
+            field.name for field in fields
+            # deferred fields that were never loaded aren't in __dict__, and can't have changed
+            if field.attname in self.__dict__
+            and (field.attname not in loaded_values or loaded_values[field.attname] != getattr(self, field.attname))
+        ]
+
+    def reset_dirty_fields(self, field_names=None):
+        """Treat the current values of the given fields (or all loaded fields) as what's in the database."""
+        if not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+
+        for field in self._meta.concrete_fields:
+            if field_names is not None and field.name not in field_names and field.attname not in field_names:
+                continue
+
+            if field.attname in self.__dict__:
+                # copied, so that in-place changes to mutable values (eg Session.fresh) still show up as dirty
+                self._loaded_values[field.attname] = copy.deepcopy(getattr(self, field.attname))
+
+    def mark_dirty_fields(self, *field_names):
+        """Count the given fields as changed whatever their values, eg so they're written even if they were changed
+        in the database behind this object's back."""
+        loaded_values = getattr(self, '_loaded_values', {})
+
+        for field_name in field_names:
+            loaded_values.pop(self._meta.get_field(field_name).attname, None)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and 'update_fields' not in kwargs and not kwargs.get('force_insert'):
+            dirty_fields = self.get_dirty_fields()
+
+            if not dirty_fields:
+                return
+
+            kwargs['update_fields'] = dirty_fields
+
+        super().save(*args, **kwargs)
+
+        self.reset_dirty_fields(kwargs.get('update_fields'))
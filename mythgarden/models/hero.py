@@ -3,14 +3,20 @@ from django.db import models
 from ._constants import DEFAULT_PORTRAIT, LUCK_DENOMINATOR, CROP, MINING_ITEM_TYPES, FISHING_ITEM_TYPES, \
     FORAGING_ITEM_TYPES
 from .farmer_portrait import FarmerPortrait
+from .dirty_fields import DirtyFieldsMixin
+from .unit_of_work import WriteBehindMixin
 
 
 class Hero(models.Model):
     name = models.CharField(max_length=16, default='New Farmer')
     portrait = models.ForeignKey(FarmerPortrait, on_delete=models.SET_DEFAULT, default=FarmerPortrait.get_default_pk)
+    # superseded by earned_achievement_ids -- only kept as the source for the migration that filled those in
     achievements = models.ManyToManyField('Achievement', blank=True)
     knowledge = models.ManyToManyField('Knowledge', blank=True)
 
+    # the ids of the (catalog) achievements the hero has earned, sorted, so reading & adding to them is one row
+    earned_achievement_ids = models.JSONField(default=list, blank=True)
+
     high_score = models.IntegerField(default=0)
     boost_level = models.IntegerField(default=0)
     luck_level = models.IntegerField(default=0)
@@ -20,6 +26,10 @@ class Hero(models.Model):
         new_hero = cls.objects.create()
         return new_hero.pk
 
+    def earn_achievements(self, *achievement_ids):
+        self.earned_achievement_ids = sorted(set(self.earned_achievement_ids).union(achievement_ids))
+        self.save(update_fields=['earned_achievement_ids'])
+
     def set_high_score(self, new_score):
         if new_score > self.high_score:
             self.high_score = new_score
@@ -59,7 +69,7 @@ class Hero(models.Model):
             return '{:.1%}'.format(luck_float)
 
 
-class HeroState(models.Model):
+class HeroState(WriteBehindMixin, DirtyFieldsMixin, models.Model):
     session = models.OneToOneField('Session', on_delete=models.CASCADE, primary_key=True, related_name='hero_state')
     hero = models.ForeignKey('Hero', on_delete=models.CASCADE, default=Hero.get_default_pk, null=True)
 
@@ -84,6 +94,9 @@ class HeroState(models.Model):
     depth_weighted_hearts_earned = models.IntegerField(default=0)
     mytheggs_found = models.IntegerField(default=0)
 
+    # how many villagers the hero has at least 1, 2, ... VillagerState.TOTAL_TIERS hearts with, kept up as affinities
+    # change (see move_villager_hearts) -- so achievements that count hearts across villagers don't go over them all
+    villagers_with_hearts = models.JSONField(default=list, blank=True)
 
     def increment_koin_earned(self, amount, item_type):
         self.koin_earned += amount
@@ -118,6 +131,26 @@ class HeroState(models.Model):
 
         return self
 
+    def move_villager_hearts(self, old_tier, new_tier):
+        """Counts a villager going from one affinity tier to another"""
+        counts = self.villagers_with_hearts + [0] * (max(old_tier, new_tier) - len(self.villagers_with_hearts))
+
+        for tier in range(old_tier + 1, new_tier + 1):
+            counts[tier - 1] += 1
+        for tier in range(new_tier + 1, old_tier + 1):
+            counts[tier - 1] -= 1
+
+        self.villagers_with_hearts = counts
+
+        return self
+
+    def count_villagers_with_hearts(self, hearts):
+        """How many villagers the hero has at least this many hearts (1 or more) with"""
+        if hearts <= 0 or hearts > len(self.villagers_with_hearts):
+            return 0
+
+        return self.villagers_with_hearts[hearts - 1]
+
     def __str__(self):
         return 'Hero ' + self.session.abbr_key_tag()
 
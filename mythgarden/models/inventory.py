@@ -1,15 +1,23 @@
 from django.db import models
 
+from .unit_of_work import ItemTokenHolderMixin
+
 from ._constants import MAX_ITEMS
 
 
-class Inventory(models.Model):
+class Inventory(ItemTokenHolderMixin, models.Model):
     session = models.OneToOneField('Session', on_delete=models.CASCADE, primary_key=True)
-    item_tokens = models.ManyToManyField('ItemToken', blank=True)
+    # item_tokens: the ItemTokens pointing here
+
+    container_field = 'inventory'
 
     @property
     def is_full(self):
-        return self.item_tokens.count() >= MAX_ITEMS
+        return len(self.get_item_tokens()) >= MAX_ITEMS
+
+    @property
+    def container_name(self):
+        return 'Inventory'
 
     def __str__(self):
         return 'Inventory ' + self.session.abbr_key_tag()
@@ -1,15 +1,43 @@
 from django.db import models
 from django.templatetags.static import static
 
-from ._constants import ITEM_EMOJIS, COMMON, GIFT, ITEM_TYPES, RARITY_CHOICES, SEED, SPROUT, CROP, \
-    CROP_PROFIT_MULTIPLIER, MYTHLING_TYPES, MYTHLING_GROWTH_STAGES, IMAGE_PREFIX, MYTHLING_PORTRAIT_DIR, \
-    MYTHLING_TYPE_TO_DRAW_VARIABLE, GOLD_CROP_PREFIX, GOLD_CROP_PROFIT_MULTIPLIER, RARITY_TO_INDEX, RARITIES
+from .dirty_fields import DirtyFieldsMixin
+from .unit_of_work import WriteBehindMixin
+from ..catalog import get_catalog, bump_catalog_generation
+from ..catalog.growth import next_growth_stage_fields, growth_stage_closure
+
+from ._constants import ITEM_EMOJIS, COMMON, GIFT, ITEM_TYPES, RARITY_CHOICES, SEED, SPROUT, MYTHLING_TYPES, \
+    MYTHLING_GROWTH_STAGES, IMAGE_PREFIX, MYTHLING_PORTRAIT_DIR, MYTHLING_TYPE_TO_DRAW_VARIABLE, MAX_ITEMS, MYTHEGG
 
 
 class ItemManager(models.Manager):
     def get_by_natural_key(self, name):
         return self.get(name=name)
 
+    def get_or_create_in_bulk(self, fields_list):
+        """Like get_or_create for each of the given sets of fields, but with one query to fetch the items that exist
+        and (at most) one to create the rest. Returns the items by name."""
+        items = {item.name: item for item in self.filter(name__in={fields['name'] for fields in fields_list})}
+        missing = {fields['name']: self.model(**fields) for fields in fields_list if fields['name'] not in items}
+
+        if missing:
+            self.bulk_create(missing.values())
+            # bulk_create doesn't send the post_save signal that would usually do this
+            bump_catalog_generation()
+            items.update(missing)
+
+        return items
+
+    def create_growth_stages(self):
+        """Creates whichever items the seeds & sprouts can grow into that don't exist yet, so that the catalog's
+        growth transitions are complete and growing never has to create one mid-game. Returns how many it created."""
+        stages = growth_stage_closure(self.filter(item_type__in=[SEED, SPROUT]))
+        existing_count = self.filter(name__in=[fields['name'] for fields in stages]).count()
+
+        self.get_or_create_in_bulk(stages)
+
+        return len(stages) - existing_count
+
 
 class Item(models.Model):
     name = models.CharField(max_length=255, unique=True)
@@ -35,65 +63,12 @@ class Item(models.Model):
     def emoji(self):
         return ITEM_EMOJIS[self.item_type]
 
-    def get_next_growth_stage(self, days_growing, grow_golden_crops):
-        """Get the next item that a seed/sprout grows into, taking into account how long this item takes to grow
-        and how many days it's been in the ground"""
-        
-        next_type = self.get_next_type(days_growing)
-        next_name = self.get_next_name(next_type, grow_golden_crops)
-        next_price = self.get_next_price(next_type, grow_golden_crops)
-        next_rarity = self.get_next_rarity(next_type, grow_golden_crops)
-
-        instance, created = Item.objects.get_or_create(
-                                name=next_name, item_type=next_type, price=next_price,
-                                rarity=next_rarity, growth_days=self.growth_days, effort_time=self.effort_time
-                            )
-
-        return instance
-
-    def get_next_type(self, days_growing):
-        if days_growing >= self.growth_days:
-            return CROP
-        else:
-            return SPROUT
-
-    def get_next_name(self, next_type, grow_golden_crops):
-        # could have some Item.name validation that ensures that the name ends with the item type for seed/sprout/crop
-        # e.g. Parsnip Seed -> Parsnip Sprout -> Parsnip
-
-        curr_type_name = dict(ITEM_TYPES)[self.item_type]
-        next_type_name = dict(ITEM_TYPES)[next_type]
-        
-        if next_type == CROP:
-            crop_name = self.name.replace(f' {curr_type_name}', '')
-            if grow_golden_crops:
-                return f'{GOLD_CROP_PREFIX} {crop_name.split()[-1]}'
-            else:
-                return crop_name
-        else:
-            return self.name.replace(curr_type_name, next_type_name)
+    def get_next_growth_stage_fields(self, next_type, grow_golden_crops):
+        """The fields of the item that a seed/sprout grows into at the given type, without looking it up"""
+        return next_growth_stage_fields(self, next_type, grow_golden_crops)
 
-    def get_next_price(self, next_type, grow_golden_crops):
-        # seed -> sprout is mostly irrelevant, so goal is to make seed -> crop hit the CROP_PROFIT_MULTIPLIER
-        # let's be ridiculous and say that seeds and sprouts are =, and then you multiply when you get to the crop
-
-        if next_type == CROP:
-            if grow_golden_crops:
-                return self.price * GOLD_CROP_PROFIT_MULTIPLIER
-            else:
-                return self.price * CROP_PROFIT_MULTIPLIER
-        else:
-            return self.price
-
-    def get_next_rarity(self, next_type, grow_golden_crops):
-        if next_type == CROP and grow_golden_crops:
-            # rarity += 1
-            return RARITIES[RARITY_TO_INDEX[self.rarity] + 1]
-        else:
-            return self.rarity
 
-
-class ItemToken(models.Model):
+class ItemToken(WriteBehindMixin, DirtyFieldsMixin, models.Model):
     session = models.ForeignKey('Session', on_delete=models.CASCADE, related_name='item_tokens')
     item = models.ForeignKey('Item', on_delete=models.CASCADE, related_name='tokens')
     bought_from_store = models.BooleanField(default=False)
@@ -102,13 +77,23 @@ class ItemToken(models.Model):
     has_been_watered = models.BooleanField(default=False)  # only defined for plants (seeds/sprouts/crops)
     days_growing = models.IntegerField(null=True, blank=True)  # only defined for plants (seeds/sprouts/crops)
 
+    # the container the token is in (if any) -- an inventory or a place state, never both -- and its slot there, so
+    # moving a token is an update of its own row (see ItemTokenHolderMixin)
+    inventory = models.ForeignKey('Inventory', on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name='item_tokens')
+    place_state = models.ForeignKey('PlaceState', on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='item_tokens')
+    slot = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    swappable_unique_fields = ('slot',)
+
     def __str__(self):
         return self.item.name + ' ' + self.session.abbr_key_tag()
 
     def serialize(self):
         return {
             'name': self.name,
-            'rarity': self.item.get_rarity_display(),
+            'rarity': self.item_record.get_rarity_display(),
             'emoji': self.emoji,
             'hasBeenWatered': self.has_been_watered,
             'id': self.id,
@@ -120,44 +105,81 @@ class ItemToken(models.Model):
     def make_copy(self):
         return ItemToken(session=self.session, item=self.item)
 
+    @property
+    def count(self):
+        """How many of the item the token stands for -- a shop's stock, or a stack in an inventory or chest"""
+        return self.quantity or 1
+
+    @property
+    def is_stackable(self):
+        # plants in the field grow (& get watered) one by one, and each mythegg is one of a kind
+        return self.item_type != MYTHEGG and not self.has_been_watered and self.days_growing is None
+
+    def can_stack_with(self, other):
+        is_same_item = self.item_id == other.item_id and self.bought_from_store == other.bought_from_store
+
+        return is_same_item and self.is_stackable and other.is_stackable
+
+    @property
+    def item_record(self):
+        # the item's fields, from the catalog -- so a token only needs its item_id, never a fetched item
+        return get_catalog().items[self.item_id]
+
     @property
     def name(self):
-        return self.item.name
+        return self.item_record.name
 
     @property
     def item_type(self):
-        return self.item.item_type
+        return self.item_record.item_type
 
     @property
     def rarity(self):
-        return self.item.rarity
+        return self.item_record.rarity
 
     @property
     def price(self):
-        return self.item.price
+        return self.item_record.price
 
     def get_display_price_if_known(self):
-        is_known = self.session.hero.knowledge.filter(
-            itemknowledge__item_type=self.item_type, itemknowledge__rarity=self.rarity
-        ).exists()
-
-        if is_known:
+        if self.session.aggregate.knows_item_price(self.item_type, self.rarity):
             return self.price
         else:
             return None
 
     def get_mythling_type_if_applicable(self):
-        try:
-            return self.item.mythling.mythling_type
-        except Mythling.DoesNotExist:
-            return
+        mythling = get_catalog().mythlings.get(self.item_id)
+
+        if mythling:
+            return mythling.mythling_type
 
     @property
     def emoji(self):
-        return self.item.emoji
+        return self.item_record.emoji
 
     class Meta:
         ordering = ['pk']
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(inventory__isnull=True) | models.Q(place_state__isnull=True),
+                name='item_token_in_one_container'
+            ),
+            models.CheckConstraint(
+                check=models.Q(slot__isnull=True) | models.Q(slot__lt=MAX_ITEMS),
+                name='item_token_slot_within_max_items'
+            ),
+            # one token per slot in each container
+            models.UniqueConstraint(
+                fields=['inventory', 'slot'],
+                condition=models.Q(inventory__isnull=False),
+                name='item_token_unique_inventory_slot'
+            ),
+            models.UniqueConstraint(
+                fields=['place_state', 'slot'],
+                condition=models.Q(place_state__isnull=False),
+                name='item_token_unique_place_state_slot'
+            ),
+        ]
 
 
 class Mythling(Item):
@@ -188,7 +210,7 @@ class Mythling(Item):
         return super().save(*args, **kwargs)
 
 
-class MythlingState(models.Model):
+class MythlingState(WriteBehindMixin, DirtyFieldsMixin, models.Model):
     session = models.ForeignKey('Session', on_delete=models.CASCADE, related_name='mythling_states')
     mythling = models.ForeignKey('Mythling', on_delete=models.CASCADE, related_name='states')
 
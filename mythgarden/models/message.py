@@ -1,7 +1,11 @@
 from django.db import models
 
+from .unit_of_work import WriteBehindMixin
+
+
+class Message(WriteBehindMixin, models.Model):
+    defer_inserts = True
 
-class Message(models.Model):
     session = models.ForeignKey('Session', on_delete=models.CASCADE, related_name='messages')
     text = models.CharField(max_length=255)
     is_error = models.BooleanField(default=False)
@@ -2,11 +2,12 @@ from django.db import models
 from django.templatetags.static import static
 from django.core.validators import MinValueValidator, MaxValueValidator
 
-from ._constants import PLACE_TYPES, FARM, TOWN, MOUNTAIN, FOREST, BEACH, HOME, MINUTES_IN_A_DAY, \
-    IMAGE_PREFIX, PLACE_IMAGE_DIR, SHOP, ACTIVITY_ICON_PATHS, WILD_TYPES, ITEM_POOL_TYPE_MAP, MAX_ITEMS
-from .action import Action
+from ._constants import PLACE_TYPES, FARM, TOWN, MINUTES_IN_A_DAY, IMAGE_PREFIX, PLACE_IMAGE_DIR, SHOP, \
+    ITEM_POOL_TYPE_MAP, MAX_ITEMS
 from .clock import Clock
 from .item import Item
+from .unit_of_work import ItemTokenHolderMixin
+from ..catalog import get_catalog
 
 
 class PlaceManager(models.Manager):
@@ -38,63 +39,6 @@ class Place(models.Model):
     def __str__(self):
         return self.name
 
-    def serialize(self):
-        return {
-            'name': self.name,
-            'imageUrl': self.image_url,
-            'id': self.id,
-            'hasInventory': self.has_inventory,
-            'arrows': self.get_arrows(),
-            'activities': self.get_activities()
-        }
-
-    def get_arrows(self):
-        arrows = []
-
-        for bridge in self.bridges_as_1.all():
-            new_arrow = {'direction': bridge.direction_2, 'id': bridge.place_2.id}
-            arrows.append(new_arrow)
-
-        for bridge in self.bridges_as_2.all():
-            new_arrow = {'direction': bridge.direction_1, 'id': bridge.place_1.id}
-            arrows.append(new_arrow)
-
-        return arrows
-
-    def get_activities(self):
-        activities = []
-
-        if self.place_type in WILD_TYPES:
-
-            if self.place_type == FOREST:
-                image_path = ACTIVITY_ICON_PATHS['BASKET']
-            if self.place_type == MOUNTAIN:
-                image_path = ACTIVITY_ICON_PATHS['PICKAXE']
-            if self.place_type == BEACH:
-                image_path = ACTIVITY_ICON_PATHS['FISHING_ROD']
-
-            activities.append({'actionType': Action.GATHER, 'imageUrl': static(f'{IMAGE_PREFIX}/{image_path}')})
-
-        try:
-            building = self.building
-            if building.surround is not None:
-                image_path = ACTIVITY_ICON_PATHS['DOOR']
-
-                activities.append({
-                    'actionType': Action.TRAVEL,
-                    'id': building.surround.id,
-                    'imageUrl': static(f'{IMAGE_PREFIX}/{image_path}')
-                })
-        except Building.DoesNotExist:
-            pass
-
-        if self.is_farmhouse:
-            image_path = ACTIVITY_ICON_PATHS['BED']
-            activities.append({'actionType': Action.SLEEP, 'imageUrl': static(f'{IMAGE_PREFIX}/{image_path}')})
-
-        return activities
-
-
     @property
     def image_url(self):
         if not self.image_path:
@@ -110,14 +54,6 @@ class Place(models.Model):
         else:
             super().save(*args, **kwargs)
 
-    @property
-    def is_farmhouse(self):
-        try:
-            is_building_on_farm = self.building.surround.pk == Place.get_default_pk()
-            return is_building_on_farm and self.place_type == HOME
-        except Building.DoesNotExist:
-            return False
-
     def populate_item_pool(self):
         """ Populates the item pool by filtering on item types based on this place type. """
         item_types = ITEM_POOL_TYPE_MAP.get(self.place_type)
@@ -141,18 +77,6 @@ class Building(Place):
     def __str__(self):
         return super().__str__()
 
-    def serialize(self):
-        building_data = {
-            'coords': self.coordinates,
-            'openingTime': self.opening_time,
-            'closingTime': self.closing_time,
-            'openingTimeDisplay': self.get_time_display(self.opening_time),
-            'closingTimeDisplay': self.get_time_display(self.closing_time)
-        }
-        combined_data = building_data | super().serialize()
-
-        return combined_data
-
     @property
     def coordinates(self):
         return {
@@ -176,16 +100,22 @@ class Building(Place):
         ordering = ['name']
 
 
-class PlaceState(models.Model):
+class PlaceState(ItemTokenHolderMixin, models.Model):
     session = models.ForeignKey('Session', on_delete=models.CASCADE, related_name='place_states')
     place = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='states')
 
-    item_tokens = models.ManyToManyField('ItemToken', blank=True)
+    # item_tokens: the ItemTokens pointing here
     # would be nice to have a validator that said "if placeState.place.has_inventory == False, then item_tokens has to be empty" basically
 
+    container_field = 'place_state'
+
     @property
     def is_full(self):
-        return self.item_tokens.count() >= MAX_ITEMS
+        return len(self.get_item_tokens()) >= MAX_ITEMS
+
+    @property
+    def container_name(self):
+        return get_catalog().places[self.place_id].name
 
     def __str__(self):
         return f'{self.place} state ' + self.session.abbr_key_tag()
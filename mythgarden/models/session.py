@@ -1,15 +1,20 @@
 from django.db import models
+from django.utils.functional import cached_property
 
-from . import Mythling, MythlingState
-from .villager import Villager, VillagerState
+from . import MythlingState
+from .villager import VillagerState
 from .hero import Hero
 from .place import Place, PlaceState
+from .session_aggregate import SessionAggregate
+from .dirty_fields import DirtyFieldsMixin
+from .unit_of_work import WriteBehindMixin
+from ..catalog import get_catalog
 from ..static_helpers import generate_uuid
 
-from ._constants import WELCOME_MESSAGE
+from ._constants import WELCOME_MESSAGE, MYTHLING_POWER_BITS
 
 
-class Session(models.Model):
+class Session(WriteBehindMixin, DirtyFieldsMixin, models.Model):
     key = models.CharField(max_length=32, primary_key=True, default=generate_uuid)
     _location = models.ForeignKey(Place, on_delete=models.SET_NULL, null=True, default=Place.get_default_pk)
     hero = models.ForeignKey('Hero', on_delete=models.CASCADE, related_name='current_session', null=True, default=Hero.get_default_pk)
@@ -22,6 +27,11 @@ class Session(models.Model):
 
     fresh = models.JSONField(default=dict, blank=True)
 
+    # a bit per mythling type (see MYTHLING_POWER_BITS) for the mythlings the hero has with them right now, so
+    # checking for a power is a bit test -- kept in step with MythlingState.is_in_possession by the MytheggFinder,
+    # and checked by the check_mythling_powers command
+    mythling_powers = models.PositiveSmallIntegerField(default=0)
+
     def mark_fresh(self, *args):
         for arg in args:
             self.fresh[arg] = True
@@ -35,52 +45,94 @@ class Session(models.Model):
     def get_fresh_keys(self):
         return [key for key, value in self.fresh.items() if value]
 
+    def has_mythling_power(self, mythling_type):
+        return self.mythling_powers & MYTHLING_POWER_BITS[mythling_type] != 0
+
+    def gain_mythling_power(self, mythling_type):
+        self.mythling_powers |= MYTHLING_POWER_BITS[mythling_type]
+
+    def lose_mythling_power(self, mythling_type):
+        self.mythling_powers &= ~MYTHLING_POWER_BITS[mythling_type]
+
+    @staticmethod
+    def get_mythling_powers_mask(mythling_types):
+        """The mythling_powers mask for having mythlings of the given types"""
+        mask = 0
+        for mythling_type in mythling_types:
+            mask |= MYTHLING_POWER_BITS[mythling_type]
+
+        return mask
+
     @property
     def location(self):
-        if not self._location:
-            self._location = Place.objects.get(pk=Place.get_default_pk())
-            print(self._location)
+        # world content comes from the catalog, so this never hits the db
+        catalog = get_catalog()
+        if self._location_id not in catalog.places:
+            self._location_id = catalog.default_place_id
 
-        return self._location
+        return catalog.places[self._location_id]
 
     @location.setter
     def location(self, value):
-        self._location = value
+        # accepts either a catalog record or a Place model
+        self._location_id = value.id if value else None
+
+    @property
+    def current_dialogue_line(self):
+        if self.current_dialogue_id is None:
+            return None
+
+        return get_catalog().dialogue_lines.get(self.current_dialogue_id)
+
+    @cached_property
+    def aggregate(self):
+        return SessionAggregate(self)
+
+    def forget_aggregate(self):
+        """Drop the loaded per-session rows, so the next access reloads them (eg after populating new ones)."""
+        self.__dict__.pop('aggregate', None)
+
+    def learn_knowledge(self, *knowledge_ids):
+        self.hero.knowledge.add(*knowledge_ids)
+
+        if 'aggregate' in self.__dict__:
+            self.aggregate.learn_knowledge(knowledge_ids)
+
+    def get_cached_actions(self, fingerprint):
+        """Returns the actions cached for this request, if the state they were generated from hasn't changed."""
+        cached_fingerprint, actions = self.__dict__.get('_cached_actions', (None, None))
+
+        return actions if cached_fingerprint == fingerprint else None
+
+    def cache_actions(self, fingerprint, actions):
+        self._cached_actions = (fingerprint, actions)
+
+    def forget_cached_actions(self):
+        self.__dict__.pop('_cached_actions', None)
 
     @property
     def location_state(self):
-        # session.place_states.place is prefetched
-        for place_state in self.place_states.all():
-            if place_state.place.name == self.location.name:
-                # don't worry, place names are unique.
-                # just matching by name so we don't have to grab the place object for self.location if it's a building
-                return place_state
+        return self.aggregate.get_place_state(self.location.id)
 
     def get_place_state(self, place):
         if not place:
             return None
 
-        return self.place_states.get(place=place)
+        return self.aggregate.get_place_state(place.id)
 
     @property
     def occupant_states(self):
-        return self.location_state.occupants.all()
+        return self.aggregate.get_occupant_states(self.location.id)
 
     def get_villager_state(self, villager):
-        # session.villager_states.villager is prefetched
         if not villager:
             return None
 
-        for villager_state in self.villager_states.all():
-            if villager_state.villager == villager:
-                if self.is_fresh('villagerStates') or self.is_fresh('speaker'):
-                    villager_state.refresh_from_db()
-
-                return villager_state
+        return self.aggregate.get_villager_state(villager.id)
 
     @property
     def local_item_tokens(self):
-        return self.location_state.item_tokens.all()
+        return self.location_state.get_item_tokens()
 
     @property
     def high_score(self):
@@ -106,35 +158,42 @@ class Session(models.Model):
     def populate_place_states(self):
         place_states = []
 
-        for place in list(Place.objects.all()):
-            place_states.append(PlaceState(session=self, place=place))
+        for place_id in get_catalog().places:
+            place_states.append(PlaceState(session=self, place_id=place_id))
 
         PlaceState.objects.bulk_create(place_states)
+        self.forget_aggregate()
         # Re-fetch to get objects with PKs (bulk_create doesn't return PKs on older SQLite)
-        return list(PlaceState.objects.filter(session=self).select_related('place'))
+        return list(PlaceState.objects.filter(session=self))
 
     def populate_villager_states(self, place_states):
         villager_states = []
-        place_to_state_dict = {state.place.pk: state for state in place_states}
+        place_to_state_dict = {state.place_id: state for state in place_states}
 
-        for villager in list(Villager.objects.all()):
+        for villager in get_catalog().villagers.values():
             if villager.home:
-                location_state = place_to_state_dict.get(villager.home.pk, None)
-                villager_state = VillagerState(session=self, villager=villager, location_state=location_state)
+                location_state = place_to_state_dict.get(villager.home.id, None)
+                villager_state = VillagerState(session=self, villager_id=villager.id, location_state=location_state)
             else:
-                villager_state = VillagerState(session=self, villager=villager)
+                villager_state = VillagerState(session=self, villager_id=villager.id)
 
             villager_states.append(villager_state)
 
-        return VillagerState.objects.bulk_create(villager_states)
+        villager_states = VillagerState.objects.bulk_create(villager_states)
+        self.forget_aggregate()
+
+        return villager_states
 
     def populate_mythling_states(self):
         mythling_states = []
 
-        for mythling in list(Mythling.objects.all()):
-            mythling_states.append(MythlingState(session=self, mythling=mythling))
+        for mythling_id in get_catalog().mythlings:
+            mythling_states.append(MythlingState(session=self, mythling_id=mythling_id))
+
+        mythling_states = MythlingState.objects.bulk_create(mythling_states)
+        self.forget_aggregate()
 
-        return MythlingState.objects.bulk_create(mythling_states)
+        return mythling_states
 
     def abbr_key_tag(self):
         return f'({self.key[:8]}...)'
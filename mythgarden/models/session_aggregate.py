@@ -0,0 +1,144 @@
+from collections import defaultdict
+
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .item import ItemToken, MythlingState
+from ..catalog import get_catalog
+from ..catalog.records import item_knowledge_key, villager_knowledge_key
+from .place import PlaceState
+from .villager import VillagerState
+
+
+class SessionAggregate:
+    """All the mutable rows belonging to one session (place states & their item tokens, villager states,
+    mythling states, inventory tokens), loaded in a fixed number of queries however big the world is,
+    and indexed by place/villager/mythling id -- villager states by the place state they're in, too. The hero's
+    knowledge is loaded too, but only once something asks.
+
+    Expects the session's one-to-ones (clock, wallet, hero, hero_state, inventory) to be select_related already."""
+
+    QUERY_COUNT = 4
+
+    def __init__(self, session):
+        self.session = session
+        self.inventory = getattr(session, 'inventory', None)
+
+        self.place_states = {state.place_id: state for state in PlaceState.objects.filter(session=session)}
+        self.villager_states = {state.villager_id: state for state in VillagerState.objects.filter(session=session)}
+        self.mythling_states = {state.mythling_id: state for state in MythlingState.objects.filter(session=session)}
+
+        # villager states are loaded in villager name order, same as place_state.occupants, and kept in it
+        self.__villager_order = {villager_id: index for index, villager_id in enumerate(self.villager_states)}
+        self.occupant_states = defaultdict(list)
+        for villager_state in self.villager_states.values():
+            self.occupant_states[villager_state.location_state_id].append(villager_state)
+
+        self.__load_item_tokens()
+        self.__link_to_session()
+
+    def get_place_state(self, place_id):
+        return self.place_states.get(place_id)
+
+    def get_villager_state(self, villager_id):
+        return self.villager_states.get(villager_id)
+
+    def get_occupant_states(self, place_id):
+        place_state = self.place_states.get(place_id)
+        if not place_state:
+            return []
+
+        return list(self.occupant_states.get(place_state.id, []))
+
+    def move_villager(self, villager_state, place_state):
+        """Moves a villager state to the given place state (or nowhere), keeping occupant_states up to date"""
+        self.occupant_states[villager_state.location_state_id].remove(villager_state)
+
+        villager_state.location_state = place_state
+
+        occupants = self.occupant_states[villager_state.location_state_id]
+        occupants.append(villager_state)
+        occupants.sort(key=lambda state: self.__villager_order[state.villager_id])
+
+    def get_mythling_state(self, mythling_id):
+        # mythling states are only populated on the first home page load, so older sessions can be missing some
+        if mythling_id not in self.mythling_states:
+            self.mythling_states[mythling_id], created = MythlingState.objects.get_or_create(
+                session=self.session, mythling_id=mythling_id
+            )
+
+        return self.mythling_states[mythling_id]
+
+    @cached_property
+    def knowledge_ids(self):
+        return set(self.session.hero.knowledge.values_list('id', flat=True))
+
+    def knows_of_mythegg(self, mythegg_id):
+        return any(knowledge_id in self.knowledge_ids for knowledge_id in get_catalog().mythegg_knowledge_ids(mythegg_id))
+
+    @cached_property
+    def knowledge_keys(self):
+        """The item types' prices & villagers' preferences the hero knows, keyed the way serialization asks after
+        them, so serializing any number of item tokens & villager states costs nothing past loading knowledge_ids"""
+        return get_catalog().knowledge_keys_for(self.knowledge_ids)
+
+    def knows_item_price(self, item_type, rarity):
+        return item_knowledge_key(item_type, rarity) in self.knowledge_keys
+
+    def knows_villager_preference(self, villager_id, valence):
+        return villager_knowledge_key(villager_id, valence) in self.knowledge_keys
+
+    def learn_knowledge(self, knowledge_ids):
+        # only worth keeping in step if they've been loaded -- otherwise they'll be loaded with these in anyway
+        if 'knowledge_ids' in self.__dict__:
+            self.knowledge_ids.update(knowledge_ids)
+
+        if 'knowledge_keys' in self.__dict__:
+            self.knowledge_keys.update(get_catalog().knowledge_keys_for(knowledge_ids))
+
+    @cached_property
+    def earned_achievement_ids(self):
+        return set(self.session.hero.earned_achievement_ids)
+
+    def __load_item_tokens(self):
+        """Load the tokens in every one of the session's containers in one query, and hand each container its own
+        list of them (see ItemTokenHolderMixin.loaded_item_tokens), which it keeps up to date as tokens move."""
+        holders = [*self.place_states.values()] + ([self.inventory] if self.inventory else [])
+        tokens_by_holder = {(holder.container_field, holder.pk): [] for holder in holders}
+
+        item_tokens = ItemToken.objects.select_related('item').filter(session=self.session).filter(
+            Q(inventory__isnull=False) | Q(place_state__isnull=False)
+        )
+
+        for item_token in item_tokens:
+            if item_token.inventory_id is not None:
+                holder_key = ('inventory', item_token.inventory_id)
+            else:
+                holder_key = ('place_state', item_token.place_state_id)
+
+            if holder_key in tokens_by_holder:
+                tokens_by_holder[holder_key].append(item_token)
+
+        for holder in holders:
+            held_tokens = tokens_by_holder[(holder.container_field, holder.pk)]
+            for item_token in held_tokens:
+                setattr(item_token, holder.container_field, holder)
+
+            holder.loaded_item_tokens = held_tokens
+
+    def __link_to_session(self):
+        """Point every loaded row back at the session (and villagers at their place states), so that following
+        those foreign keys doesn't go back to the database."""
+        place_states_by_pk = {state.pk: state for state in self.place_states.values()}
+        token_holders = [*self.place_states.values()] + ([self.inventory] if self.inventory else [])
+
+        for state in [*self.place_states.values(), *self.villager_states.values(), *self.mythling_states.values()]:
+            state.session = self.session
+
+        for villager_state in self.villager_states.values():
+            if villager_state.location_state_id in place_states_by_pk:
+                villager_state.location_state = place_states_by_pk[villager_state.location_state_id]
+
+        for holder in token_holders:
+            for item_token in holder.loaded_item_tokens:
+                item_token.session = self.session
@@ -0,0 +1,282 @@
+import threading
+from collections import defaultdict
+
+from django.core.validators import ValidationError
+from django.db import transaction
+
+from ._constants import MAX_ITEMS
+from .dirty_fields import DirtyFieldsMixin
+
+_local = threading.local()
+
+
+class UnitOfWork:
+    """Collects the writes made while handling one request, and flushes them together at the end:
+    one bulk_update per model (of just the fields that changed, for models that track them -- which takes in every
+    item token moved between containers, after clearing their slots), and one bulk_create for new messages.
+
+    Use as a context manager -- it flushes on a clean exit, and throws the pending writes away if an exception escapes
+    (since whatever transaction it's in is being rolled back anyway)."""
+
+    def __init__(self):
+        self._dirty = {}  # id(obj) -> obj, so each object is validated & written once however often it's saved
+        self._new = []
+
+    @classmethod
+    def current(cls):
+        return getattr(_local, 'unit_of_work', None)
+
+    def __enter__(self):
+        self._outer = UnitOfWork.current()
+        _local.unit_of_work = self
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.unit_of_work = self._outer
+
+        if exc_type is None:
+            self.flush()
+
+    def defers(self, obj, args, kwargs):
+        """Whether a save() call on obj can wait for the flush -- plain saves of existing rows can, and so can inserts
+        of models that nothing else points at (like messages)."""
+        if args or set(kwargs) - {'force_insert', 'using'}:
+            return False
+
+        if obj._state.adding:
+            return obj.defer_inserts
+
+        return not kwargs.get('force_insert')
+
+    def register(self, obj):
+        if obj._state.adding:
+            self._new.append(obj)
+        else:
+            self._dirty[id(obj)] = obj
+
+    def unregister(self, obj):
+        """Forgets any pending write of obj (eg because it's being deleted)"""
+        self._dirty.pop(id(obj), None)
+        self._new = [new_obj for new_obj in self._new if new_obj is not obj]
+
+    def flush(self):
+        with transaction.atomic():
+            self.__flush_new()
+            self.__flush_dirty()
+
+    def __flush_new(self):
+        new_by_model = defaultdict(list)
+        for obj in self._new:
+            new_by_model[type(obj)].append(obj)
+
+        for model, objs in new_by_model.items():
+            model.objects.bulk_create(objs)
+
+        self._new = []
+
+    def __flush_dirty(self):
+        dirty_by_model = defaultdict(list)
+        dirty_fields_by_model = defaultdict(set)
+
+        for obj in self._dirty.values():
+            # (deleted since it was saved -- there's no row left to write)
+            if obj.pk is None:
+                continue
+
+            if isinstance(obj, DirtyFieldsMixin):
+                dirty_fields = obj.get_dirty_fields()
+            else:
+                dirty_fields = [field.name for field in obj._meta.concrete_fields if not field.primary_key]
+
+            if not dirty_fields:
+                continue
+
+            if obj.validate_on_save:
+                obj.full_clean()
+
+            dirty_by_model[type(obj)].append(obj)
+            dirty_fields_by_model[type(obj)].update(dirty_fields)
+
+        for model, objs in dirty_by_model.items():
+            # every object gets the union of the fields, so keep them in model order for a stable statement
+            fields = [field.name for field in model._meta.concrete_fields if field.name in dirty_fields_by_model[model]]
+
+            # rows can trade unique values between them (like item tokens' slots), which a single update could write
+            # in the wrong order -- so those are cleared first, and there's no old value left for anyone to trip over
+            cleared_fields = [name for name in model.swappable_unique_fields if name in fields]
+            if cleared_fields:
+                model.objects.filter(pk__in=[obj.pk for obj in objs]).update(**{name: None for name in cleared_fields})
+
+            model.objects.bulk_update(objs, fields)
+
+            for obj in objs:
+                if isinstance(obj, DirtyFieldsMixin):
+                    obj.reset_dirty_fields(fields)
+
+        self._dirty = {}
+
+
+class WriteBehindMixin:
+    """Lets a model's save() wait for the current UnitOfWork to flush, when there is one (and delete() drop whatever
+    write it was waiting on)."""
+
+    # run full_clean before writing -- once per flush, rather than on every save()
+    validate_on_save = False
+    # whether a brand new row can wait for the flush too (only safe if nothing needs its pk in the meantime)
+    defer_inserts = False
+    # nullable fields under a unique constraint that rows can swap values of in one flush (see UnitOfWork)
+    swappable_unique_fields = ()
+
+    def save(self, *args, **kwargs):
+        unit_of_work = UnitOfWork.current()
+
+        if unit_of_work and unit_of_work.defers(self, args, kwargs):
+            unit_of_work.register(self)
+            return
+
+        if self.validate_on_save and self.__has_changes():
+            self.full_clean()
+
+        return super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        # a pending write of a row that's about to be gone would fail at the flush
+        unit_of_work = UnitOfWork.current()
+
+        if unit_of_work:
+            unit_of_work.unregister(self)
+
+        return super().delete(*args, **kwargs)
+
+    def __has_changes(self):
+        if self._state.adding or not isinstance(self, DirtyFieldsMixin):
+            return True
+
+        return len(self.get_dirty_fields()) > 0
+
+
+class ItemTokenHolderMixin:
+    """Moves item tokens in & out of a container (the models their inventory/place_state foreign keys point at),
+    keeping its loaded item tokens up to date. A move is just a save() of the token's own container fields & slot,
+    so with a UnitOfWork every token moved while handling a request is written in one bulk_update.
+
+    The container can hold up to MAX_ITEMS, checked against the tokens it has loaded -- so there's nothing to count
+    in the database, as long as they were loaded up front (see SessionAggregate).
+
+    Holders set container_field to the name of the ItemToken foreign key that points at them, and container_name
+    for error messages."""
+
+    container_field = None
+
+    # the tokens held, in pk order, when SessionAggregate has loaded them -- None means ask the database
+    loaded_item_tokens = None
+
+    def get_item_tokens(self):
+        """The tokens held, in pk order: as loaded, if they have been, else fresh from the database"""
+        return list(self.__get_held_item_tokens())
+
+    def add_item_tokens(self, *item_tokens):
+        held_tokens = self.__get_held_item_tokens()
+        new_tokens = [item_token for item_token in dict.fromkeys(item_tokens) if item_token not in held_tokens]
+
+        if len(held_tokens) + len(new_tokens) > MAX_ITEMS:
+            raise ValidationError(f'⚠️ {self.container_name} cannot hold more than {MAX_ITEMS} items.')
+
+        open_slots = sorted(set(range(MAX_ITEMS)) - {item_token.slot for item_token in held_tokens})
+
+        for item_token, slot in zip(new_tokens, open_slots):
+            item_token.inventory = None
+            item_token.place_state = None
+            setattr(item_token, self.container_field, self)
+            item_token.slot = slot
+            self.__save_container(item_token)
+
+            held_tokens.append(item_token)
+
+        # same order as item_tokens.all() (ItemToken is ordered by pk)
+        held_tokens.sort(key=lambda token: token.pk)
+
+    def remove_item_tokens(self, *item_tokens):
+        held_tokens = self.__get_held_item_tokens()
+
+        for item_token in item_tokens:
+            if item_token in held_tokens:
+                held_tokens.remove(item_token)
+
+            # (unless it's been added somewhere else since)
+            if getattr(item_token, f'{self.container_field}_id') == self.pk:
+                setattr(item_token, self.container_field, None)
+                item_token.slot = None
+                self.__save_container(item_token)
+
+    def stack_item_tokens(self, *item_tokens):
+        """Adds the tokens, each onto a held stack of the same item if there is one (see ItemToken.can_stack_with) --
+        which takes on the token's count, and the token itself is deleted, or never saved if it's new -- and
+        otherwise into an open slot, like add_item_tokens."""
+        held_tokens = self.__get_held_item_tokens()
+
+        for item_token in item_tokens:
+            stack = next((token for token in held_tokens if token != item_token and token.can_stack_with(item_token)), None)
+
+            if stack is None:
+                if item_token.pk is None:
+                    item_token.save()
+
+                self.add_item_tokens(item_token)
+                continue
+
+            stack.quantity = stack.count + item_token.count
+            stack.save()
+
+            # (deleting it also drops the move it may have been saved with, see WriteBehindMixin.delete)
+            if item_token.pk is not None:
+                item_token.delete()
+
+    def take_from_stack(self, item_token, quantity=1):
+        """Takes some of a held stack out of the container, as a token of their own (saved, but not in any container)
+        -- or the stack's own token, if that's all of them."""
+        if item_token.count <= quantity:
+            self.remove_item_tokens(item_token)
+            return item_token
+
+        self.__shrink_stack(item_token, quantity)
+
+        taken_token = item_token.make_copy()
+        taken_token.bought_from_store = item_token.bought_from_store
+        taken_token.quantity = quantity if quantity > 1 else None
+        taken_token.save()
+
+        return taken_token
+
+    def use_up_from_stack(self, item_token, quantity=1):
+        """Takes some of a held stack out of the container for good (eg sold, or given away), without a token of their
+        own to show for it."""
+        if item_token.count <= quantity:
+            self.remove_item_tokens(item_token)
+        else:
+            self.__shrink_stack(item_token, quantity)
+
+    def set_item_tokens(self, item_tokens):
+        held_tokens = self.__get_held_item_tokens()
+
+        self.remove_item_tokens(*[token for token in held_tokens if token not in item_tokens])
+        self.add_item_tokens(*item_tokens)
+
+    def __shrink_stack(self, item_token, quantity):
+        remaining = item_token.count - quantity
+        item_token.quantity = remaining if remaining > 1 else None
+        item_token.save()
+
+    def __save_container(self, item_token):
+        # the whole container reference, so the token can't end up in two containers at once (or none) however out of
+        # date its idea of what's in the database is
+        item_token.mark_dirty_fields('inventory', 'place_state', 'slot')
+        item_token.save()
+
+    def __get_held_item_tokens(self):
+        # the loaded list itself, so moves keep it up to date -- otherwise a fresh list, with nothing to keep up to date
+        if self.loaded_item_tokens is None:
+            return list(self.item_tokens.all())
+
+        return self.loaded_item_tokens
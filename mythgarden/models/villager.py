@@ -2,11 +2,12 @@ from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.templatetags.static import static
 
-from .item_type_preference import ItemTypePreference
-from .place import Place, PlaceState, Building
-from .dialogue import DialogueLine
+from .place import PlaceState, Building
+from .dirty_fields import DirtyFieldsMixin
+from .unit_of_work import WriteBehindMixin
+from ..catalog import get_catalog
 
-from ._constants import NEUTRAL, IMAGE_PREFIX, VILLAGER_PORTRAIT_DIR, LOVE, LIKE, ITEM_EMOJIS
+from ._constants import IMAGE_PREFIX, VILLAGER_PORTRAIT_DIR, LOVE, LIKE
 
 
 class VillagerManager(models.Manager):
@@ -48,32 +49,11 @@ class Villager(models.Model):
 
         return static(f'{IMAGE_PREFIX}/{VILLAGER_PORTRAIT_DIR}/{self.image_path}')
 
-    def gift_valence(self, item):
-        """return how villager feels about a gift"""
-        try:
-            preference = self.item_type_preferences.get(item_type=item.item_type)
-            return preference.valence
-        except ItemTypePreference.DoesNotExist:
-            try:
-                valence = ItemTypePreference.UNIVERSAL_PREFERENCES[item.item_type]
-                return valence
-            except KeyError:
-                return NEUTRAL
-
-    def get_dialogue(self, trigger, affinity_tier=None):
-        """return a dialogue object for a given trigger and affinity tier"""
-        try:
-            dialogue = self.dialogue_lines.get(trigger=trigger, affinity_tier=affinity_tier)
-        except DialogueLine.DoesNotExist:
-            raise DialogueLine.DoesNotExist(f'no dialogue for {self.name} with trigger {trigger} and affinity tier {affinity_tier}')
-
-        return dialogue
-
     class Meta:
         ordering = ['name']
 
 
-class VillagerState(models.Model):
+class VillagerState(WriteBehindMixin, DirtyFieldsMixin, models.Model):
     MAX_AFFINITY = 100
     AFFINITY_TIER_SIZE = 20
     TOTAL_TIERS = MAX_AFFINITY // AFFINITY_TIER_SIZE
@@ -94,20 +74,26 @@ class VillagerState(models.Model):
         return f'{self.villager} state ' + self.session.abbr_key_tag()
 
     def serialize(self):
+        villager = self.villager_record
+
         return {
-            'villager': self.villager.serialize(),
+            'villager': villager.serialize(),
             'affinity': {
                 'wholeHearts': self.affinity_tier,
                 'extraHeartFraction': self.affinity_fraction_of_next_tier,
                 'maxHearts': self.TOTAL_TIERS
             },
-            'name': self.villager.name,
-            'imageUrl': self.villager.image_url,
-            'description': self.villager.description,
-            'id': self.villager.id,
+            'name': villager.name,
+            'imageUrl': villager.image_url,
+            'description': villager.description,
+            'id': villager.id,
             'preferences': self.get_display_preferences_if_known()
         }
 
+    @property
+    def villager_record(self):
+        return get_catalog().villagers[self.villager_id]
+
     @property
     def display_affinity(self):
         full_hearts = ['❤️' for _ in range(self.affinity_tier)]
@@ -130,26 +116,17 @@ class VillagerState(models.Model):
     def get_display_preferences_if_known(self):
         display_preferences = {}
 
-        loved_gifts_known = self.session.hero.knowledge.filter(
-            villagerknowledge__villager=self.villager, villagerknowledge__valence=LOVE
-        ).exists()
-
-        liked_gifts_known = self.session.hero.knowledge.filter(
-            villagerknowledge__villager=self.villager, villagerknowledge__valence=LIKE
-        ).exists()
+        loved_gifts_known = self.session.aggregate.knows_villager_preference(self.villager_id, LOVE)
+        liked_gifts_known = self.session.aggregate.knows_villager_preference(self.villager_id, LIKE)
 
         if not loved_gifts_known and not liked_gifts_known:
             return
 
-        preferences = self.villager.item_type_preferences.all()
-
         if loved_gifts_known:
-            loved_emoji = [ITEM_EMOJIS[preference.item_type] for preference in preferences if preference.valence == LOVE]
-            display_preferences['lovedGifts'] = loved_emoji
+            display_preferences['lovedGifts'] = self.villager_record.loved_emoji
 
         if liked_gifts_known:
-            liked_emoji = [ITEM_EMOJIS[preference.item_type] for preference in preferences if preference.valence == LIKE]
-            display_preferences['likedGifts'] = liked_emoji
+            display_preferences['likedGifts'] = self.villager_record.liked_emoji
 
         return display_preferences
 
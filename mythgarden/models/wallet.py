@@ -1,9 +1,12 @@
 from django.db import models
 
+from .dirty_fields import DirtyFieldsMixin
+from .unit_of_work import WriteBehindMixin
+
 from ._constants import KOIN_SIGN
 
 
-class Wallet(models.Model):
+class Wallet(WriteBehindMixin, DirtyFieldsMixin, models.Model):
     session = models.OneToOneField('Session', on_delete=models.CASCADE, primary_key=True)
     money = models.IntegerField(default=0)
 
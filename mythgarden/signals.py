@@ -1,31 +1,25 @@
-from django.core.validators import ValidationError
-from django.db.models.signals import post_save, m2m_changed
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 
-from .models._constants import MAX_ITEMS
+from .catalog import bump_catalog_generation
+from .models.achievement import Achievement
+from .models.bridge import Bridge
 from .models.clock import Clock
+from .models.dialogue import DialogueLine
+from .models.event import ScheduledEvent, PopulateShopEvent, VillagerAppearsEvent
 from .models.hero import Hero, HeroState
 from .models.game_settings import GameSettings
 from .models.inventory import Inventory
+from .models.item import Item, Mythling
+from .models.item_type_preference import ItemTypePreference
+from .models.knowledge import Knowledge, ItemKnowledge, VillagerKnowledge, MytheggKnowledge, MythlingPowerKnowledge
 from .models.message import Message
-from .models.place import Place, PlaceState
+from .models.place import Place, PlaceState, Building
 from .models.session import Session
 from .models.villager import Villager, VillagerState
 from .models.wallet import Wallet
 
 
-@receiver(m2m_changed, sender=Inventory.item_tokens.through)
-def inventory_items_changed(sender, instance, action, **kwargs):
-    if action == 'post_add' and instance.item_tokens.count() > MAX_ITEMS:
-        raise ValidationError(f'⚠️ Inventory cannot hold more than {MAX_ITEMS} items.')
-
-
-@receiver(m2m_changed, sender=PlaceState.item_tokens.through)
-def local_items_changed(sender, instance, action, **kwargs):
-    if action == 'post_add' and instance.item_tokens.count() > MAX_ITEMS:
-        raise ValidationError(f'⚠️ {instance.place.name} cannot hold more than {MAX_ITEMS} items.')
-
-
 @receiver(post_save, sender=Session)
 def create_session_state(sender, instance, created, **kwargs):
     if created and not instance.skip_post_save_signal:
@@ -47,3 +41,25 @@ def create_session_state(sender, instance, created, **kwargs):
 def create_game_settings(sender, instance, created, **kwargs):
     if created:
         GameSettings.objects.create(hero=instance)
+
+
+# static world content, cached per process in the catalog
+CATALOG_MODELS = [
+    Place, Building, Bridge, Item, Mythling, Villager, ItemTypePreference, DialogueLine, Achievement,
+    Knowledge, ItemKnowledge, VillagerKnowledge, MytheggKnowledge, MythlingPowerKnowledge,
+    ScheduledEvent, PopulateShopEvent, VillagerAppearsEvent,
+]
+
+CATALOG_M2M_THROUGH_MODELS = [Place.item_pool.through, Villager.item_type_preferences.through]
+
+
+@receiver([post_save, post_delete])
+def world_content_changed(sender, **kwargs):
+    if sender in CATALOG_MODELS:
+        bump_catalog_generation()
+
+
+@receiver(m2m_changed)
+def world_content_relations_changed(sender, action, **kwargs):
+    if sender in CATALOG_M2M_THROUGH_MODELS and action.startswith('post_'):
+        bump_catalog_generation()
@@ -43,6 +43,7 @@ const PLANT_ACTION = 'PLANT'
 const HARVEST_ACTION = 'HARVEST'
 const BUY_ACTION = 'BUY'
 const SELL_ACTION = 'SELL'
+const SELL_ALL_ACTION = 'SELL_ALL'
 const STOW_ACTION = 'STOW'
 const RETRIEVE_ACTION = 'RETRIEVE'
 
@@ -107,11 +108,15 @@ class App extends React.Component<Partial<AppProps>, AppState> {
     actions.forEach(action => {
       const hasEntity = action.entityType != null && action.entityId != null
       const isGiftAction = action.giftReceiverId != null
+      const isSellAllAction = action.uniqueDigest.startsWith(`${SELL_ALL_ACTION}-`)
 
+      // selling a whole stack is kept out of the item's own key, so its pill still shows the single sell
       const key = hasEntity
         ? isGiftAction
           ? `gift-${action.entityId}`
-          : `${action.entityType}-${action.entityId}`
+          : isSellAllAction
+            ? `sell-all-${action.entityId}`
+            : `${action.entityType}-${action.entityId}`
         : 'no-entity'
 
       const {emoji, costAmount, costType, waitClass} = action
@@ -241,7 +246,13 @@ class App extends React.Component<Partial<AppProps>, AppState> {
     }
 
     else if (this.hasClass(target, 'item')) {
-      // relying on assumption that any item has only ONE action available at a time (excluding gift actions)
+      // shift-click sells a whole stack at once
+      if ((e.nativeEvent as MouseEvent).shiftKey && this.findMatchingAction(SELL_ALL_ACTION, this.grabId(target.dataset) as number) != null) {
+        this.fireActionIfAvailable(SELL_ALL_ACTION, target)
+        return
+      }
+
+      // relying on assumption that any item has only ONE action available at a time (excluding gift and sell-all actions)
       ITEM_ACTIONS.forEach(actionType => {
         this.fireActionIfAvailable(actionType, target)
       })
@@ -3,15 +3,24 @@ from itertools import count
 from sqlite3 import IntegrityError
 from unittest.mock import MagicMock, patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 # noinspection PyUnresolvedReferences
-from mythgarden.game_logic import ActionExecutor
+from mythgarden.catalog import ItemRecord
+# noinspection PyUnresolvedReferences
+from mythgarden.catalog import get_catalog
+# noinspection PyUnresolvedReferences
+from mythgarden.catalog.luck import get_luck_percent
+# noinspection PyUnresolvedReferences
+from mythgarden.game_logic import ActionExecutor, ActionGenerator, ActionResolver, EventOperator, MytheggFinder
 # noinspection PyUnresolvedReferences
 from mythgarden.models import Item, Place, Session, Wallet, Action, Villager, Building, Bridge, Clock, ItemToken, \
-    VillagerState, DialogueLine
+    VillagerState, DialogueLine, Knowledge, UnitOfWork
 # noinspection PyUnresolvedReferences
-from mythgarden.models._constants import EAST, GIFT, COMMON, UNCOMMON, RARE, EPIC, TOWN, FARM, HOME, RARITIES, \
-    RARITY_WEIGHTS, WELCOME_MESSAGE
+from mythgarden.models._constants import EAST, GIFT, COMMON, UNCOMMON, RARE, EPIC, MYTHIC, TOWN, FARM, HOME, \
+    RARITIES, RARITY_WEIGHTS, WELCOME_MESSAGE, MOUNTAIN, SPOOPY, SPARKLY, MAX_LUCK_LEVEL, LUCK_DENOMINATOR, BEACH, \
+    SHOP, FISH, CROP
+# noinspection PyUnresolvedReferences
+from mythgarden.view_helpers import load_session_with_related_data
 
 
 def create_item(name=None, item_type=GIFT, price=1, rarity=COMMON, counter=count()):
@@ -305,10 +314,100 @@ class ExecuteTalkActionTests(TestCase):
             self.assertEqual(messages[2].text, 'You and Sal have developed more of a bond! +❤️')
 
 
-# for random.choices, return the first item in the list
-# this will make pull_item_from_pool go through rarities deterministically:
-# common -> uncommon -> rare -> epic
-@patch('random.choices', side_effect=lambda c, *args, **kwargs: [c[0]])
+class ExecuteJourneyActionTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        self.ae = ActionExecutor()
+        self.ag = ActionGenerator()
+
+        session = Session.objects.create(skip_post_save_signal=False)
+        self.session = load_session_with_related_data(session.key)
+
+        self.farmhouse = Place.objects.get(name='lil farmhouse')
+        self.old_town = Place.objects.get(name='Old Town')
+        self.shop = Place.objects.get(name='mom and pop shop')
+
+        self.session.location = self.farmhouse
+
+    def journey_to(self, place):
+        return self.ag.gen_journey_action(self.session.location, place)
+
+    def test_travels_all_the_way_to_the_destination(self):
+        """
+        execute_journey_action ends up at the destination, with the clock moved on by every hop
+        """
+        self.session.clock.time = 9 * 60
+        message_count = self.session.messages.count()
+
+        self.ae.execute_journey_action(self.journey_to(self.shop), self.session)
+
+        self.assertEqual(self.session.location.id, self.shop.id)
+        self.assertEqual(self.session.clock.time, 9 * 60 + 70)
+        self.assertEqual(self.session.messages.count(), message_count + 3)
+
+    def test_lets_time_pass_between_hops(self):
+        """
+        execute_journey_action reacts to time passing after every hop but the last
+        """
+        self.session.clock.time = 9 * 60
+
+        with patch.object(EventOperator, 'react_to_time_passing') as mock:
+            self.ae.execute_journey_action(self.journey_to(self.shop), self.session)
+
+        self.assertEqual(mock.call_count, 2)
+
+    def test_stops_outside_closed_buildings(self):
+        """
+        execute_journey_action stops short of a building that's closed when the hero gets there
+        """
+        self.session.hero.settings.building_hours = True
+        self.session.clock.time = 5 * 60
+
+        self.ae.execute_journey_action(self.journey_to(self.shop), self.session)
+
+        self.assertEqual(self.session.location.id, self.old_town.id)
+        self.assertTrue(self.session.messages.filter(is_error=True).exists())
+
+    def test_journeys_endpoint_lists_journeys_the_action_endpoint_takes(self):
+        """
+        The journeys endpoint lists a journey to every place more than one hop away, and posting one's digest to the
+        action endpoint takes the hero all the way there
+        """
+        self.session.clock.time = 9 * 60
+        self.session.clock.save()
+        self.session.save()
+
+        client_session = self.client.session
+        client_session['session_key'] = self.session.key
+        client_session.save()
+
+        journeys = self.client.get('/journeys', secure=True).json()['journeys']
+        journeys_by_place_id = {int(journey['entityId']): journey for journey in journeys}
+        journey = journeys_by_place_id[self.shop.id]
+
+        self.assertEqual((journey['uniqueDigest'], journey['costAmount']), (f'JOURNEY-{self.shop.id}', 70))
+        self.assertNotIn(Place.objects.get(name='The Farm').id, journeys_by_place_id)
+
+        response = self.client.post('/action', {'uniqueDigest': journey['uniqueDigest']},
+                                    content_type='application/json', secure=True)
+
+        self.assertNotIn('error', response.json())
+        self.assertEqual(Session.objects.get(pk=self.session.key).location.id, self.shop.id)
+
+    def test_only_offers_journeys_of_more_than_one_hop(self):
+        """
+        gen_journey_action leaves single hops to the plain travel actions
+        """
+        self.assertIsNone(self.ag.gen_journey_action(self.farmhouse, self.farmhouse))
+        self.assertIsNone(self.ag.gen_journey_action(self.old_town, self.shop))
+        self.assertEqual(self.journey_to(self.shop).cost_amount, 70)
+
+
+# this will make the item pool's alias tables always draw the outcome in their first column:
+# the commonest rarity in the pool (that has any chance of coming up), then its first item
+@patch('random.random', return_value=0.0)
+@patch('random.randrange', return_value=0)
 class PullItemFromPoolTests(TestCase):
     def setUp(self) -> None:
         self.ae = ActionExecutor()
@@ -316,7 +415,7 @@ class PullItemFromPoolTests(TestCase):
         self.session = MagicMock(spec=Session)
         self.location = create_place()
 
-    def test_pull_item_from_pool_returns_an_item(self, mock_random_choices):
+    def test_pull_item_from_pool_returns_an_item(self, mock_randrange, mock_random):
         """
         pull_item_from_pool returns an item
         """
@@ -324,14 +423,15 @@ class PullItemFromPoolTests(TestCase):
 
         item = self.pull_item_from_pool(self.location)
 
-        self.assertIsInstance(item, Item)
+        self.assertIsInstance(item, ItemRecord)
 
-    def test_pull_returns_item_of_correct_rarity_when_only_rarity_in_pool(self, mock_random_choices):
+    def test_pull_returns_item_of_correct_rarity_when_only_rarity_in_pool(self, mock_randrange, mock_random):
         """
         pull_item_from_pool returns the right rarity of item when only that rarity of item is in the pool
+        (mythic items have no weight, so a pool of only those has nothing to give -- see below)
         """
 
-        for rarity in RARITIES:
+        for rarity in RARITIES[:-1]:
             with self.subTest(rarity=rarity):
                 self.location.item_pool.set([
                     create_item(rarity=rarity),
@@ -342,10 +442,10 @@ class PullItemFromPoolTests(TestCase):
 
                 self.assertEqual(item.rarity, rarity)
 
-    def test_pull_returns_valid_item_when_multiple_rarities_in_pool(self, mock_random_choices):
+    def test_pull_returns_valid_item_when_multiple_rarities_in_pool(self, mock_randrange, mock_random):
         """
         pull_item_from_pool returns a valid item when multiple rarities of item are in the pool
-        we've mocked random.choices to return first item in list, so expect a common item
+        we've mocked the draws to come out as the first outcome, so expect a common item
         """
         self.location.item_pool.set([
             create_item(rarity=COMMON),
@@ -358,25 +458,260 @@ class PullItemFromPoolTests(TestCase):
 
         self.assertEqual(item.rarity, COMMON)
 
-    def test_pull_calls_random_choices_with_correct_weights(self, mock_random_choices):
+    def test_pull_item_from_pool_raises_error_if_pool_is_empty(self, mock_randrange, mock_random):
         """
-        pull_item_from_pool calls random.choices with the correct weights
+        pull_item_from_pool raises error if pool is empty
         """
-        self.location.item_pool.set([create_item(), create_item()])
-
-        self.pull_item_from_pool(self.location)
+        self.location.item_pool.set(Item.objects.none())
 
-        mock_random_choices.assert_called_with(
-            RARITIES,
-            weights=[v for k, v in RARITY_WEIGHTS.items()],
-            k=1
-        )
+        with self.assertRaises(ValueError):
+            self.pull_item_from_pool(self.location)
 
-    def test_pull_item_from_pool_raises_error_if_pool_is_empty(self, mock_random_choices):
+    def test_pull_item_from_pool_raises_error_if_nothing_in_pool_can_come_up(self, mock_randrange, mock_random):
         """
-        pull_item_from_pool raises error if pool is empty
+        pull_item_from_pool raises error if every item in the pool is of a rarity with no weight
         """
-        self.location.item_pool.set(Item.objects.none())
+        self.location.item_pool.set([create_item(rarity=MYTHIC)])
 
         with self.assertRaises(ValueError):
             self.pull_item_from_pool(self.location)
+
+
+class HeroOddsTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        catalog = get_catalog()
+        self.mountains = next(place for place in catalog.places.values() if place.place_type == MOUNTAIN)
+        self.mythegg = catalog.mythlings_by_type[SPOOPY]
+
+        self.session = Session.objects.create(skip_post_save_signal=False)
+        self.session.location = self.mountains
+        self.session.save()
+
+        self.session.hero.luck_level = MAX_LUCK_LEVEL + 10
+        self.session.hero.save()
+        self.session.hero.knowledge.add(*Knowledge.objects.filter(mytheggknowledge__mythegg_id=self.mythegg.id))
+
+        self.session.hero_state.mining_attempts = 10
+        self.session.hero_state.save()
+
+        client_session = self.client.session
+        client_session['session_key'] = self.session.key
+        client_session.save()
+
+    @override_settings(DEBUG=True)
+    def test_odds_endpoint_shows_the_odds_the_draws_go_by(self):
+        """
+        The odds endpoint shows the hero's luck (capped at the max), the odds of each rarity when gathering where
+        they are, and their chance of finding the local mythegg -- the same numbers gathering draws with
+        """
+        odds = self.client.get('/odds', secure=True).json()
+
+        self.assertEqual(odds['heroLuckLevel'], MAX_LUCK_LEVEL + 10)
+        self.assertEqual(odds['luckLevel'], MAX_LUCK_LEVEL)
+        self.assertEqual(odds['luckPercent'], MAX_LUCK_LEVEL / LUCK_DENOMINATOR)
+        self.assertEqual(odds['gatherOdds'], get_catalog().gather_rarity_odds(self.mountains.id, MAX_LUCK_LEVEL))
+        self.assertEqual(odds['gatherOdds'][COMMON], 0)
+
+        expected_chance = 10 * self.mythegg.acquisition_increase_step * (1 + get_luck_percent(MAX_LUCK_LEVEL))
+        self.assertEqual(odds['mytheggOdds']['id'], self.mythegg.id)
+        self.assertAlmostEqual(odds['mytheggOdds']['chance'], expected_chance)
+
+    def test_odds_endpoint_is_only_there_when_debugging(self):
+        """
+        The odds endpoint 404s outside of DEBUG
+        """
+        response = self.client.get('/odds', secure=True)
+
+        self.assertEqual(response.status_code, 404)
+
+
+class MytheggDrawTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        self.mythegg_finder = MytheggFinder()
+        self.sparkly_mythegg = get_catalog().mythlings_by_type[SPARKLY]
+
+        session = Session.objects.create(skip_post_save_signal=False)
+        session.populate_mythling_states()
+        session.hero.knowledge.add(*Knowledge.objects.filter(mytheggknowledge__mythegg_id=self.sparkly_mythegg.id))
+        session.hero_state.depth_weighted_hearts_earned = 10
+        session.hero_state.save()
+
+        self.session = load_session_with_related_data(session.key)
+        self.villager_state = MagicMock(affinity_tier=4)
+
+        # 2 hearts up to tier 4 is 4 + 3 draws
+        draw_chance = self.mythegg_finder.get_mythegg_draw_chance(self.sparkly_mythegg, self.session.hero_state, 0)
+        self.combined_draw_chance = 1 - (1 - draw_chance) ** 7
+
+    def test_combined_draw_chance_is_the_chance_of_any_draw_coming_up(self):
+        """
+        get_combined_draw_chance is the chance of at least one of the draws coming up, and chances past 1 count as 1
+        """
+        self.assertAlmostEqual(self.mythegg_finder.get_combined_draw_chance(0.1, 3), 1 - 0.9 ** 3)
+        self.assertEqual(self.mythegg_finder.get_combined_draw_chance(0.1, 0), 0)
+        self.assertEqual(self.mythegg_finder.get_combined_draw_chance(2.5, 2), 1)
+
+    def test_draws_once_for_all_the_hearts_gained(self):
+        """
+        Drawing for the hearts gained takes one random number, against the chance of any of its draws coming up
+        """
+        with patch('random.random', return_value=self.combined_draw_chance - 1e-9) as mock_random:
+            mythegg, _ = self.mythegg_finder.draw_for_hearts_gained_mythegg(self.session, self.villager_state, 2)
+
+        self.assertEqual(mythegg, self.sparkly_mythegg)
+        self.assertEqual(mock_random.call_count, 1)
+
+        with patch('random.random', return_value=self.combined_draw_chance + 1e-9):
+            self.assertIsNone(self.mythegg_finder.draw_for_hearts_gained_mythegg(self.session, self.villager_state, 2))
+
+    def test_draws_from_the_loaded_session(self):
+        """
+        Drawing for mytheggs loads the hero's knowledge once, then goes by what's loaded
+        """
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                self.mythegg_finder.draw_for_hearts_gained_mythegg(self.session, self.villager_state, 2)
+                self.mythegg_finder.draw_for_mythegg(self.session, self.sparkly_mythegg)
+
+    def test_only_draws_for_mytheggs_the_hero_knows_of(self):
+        """
+        There's no drawing for a mythegg the hero doesn't know of, until they learn of it
+        """
+        spoopy_mythegg = get_catalog().mythlings_by_type[SPOOPY]
+        self.session.hero_state.mining_attempts = 10
+
+        with patch('random.random', return_value=0.0):
+            self.assertIsNone(self.mythegg_finder.draw_for_mythegg(self.session, spoopy_mythegg, draw_count=100))
+
+            self.session.learn_knowledge(*get_catalog().mythegg_knowledge_ids(spoopy_mythegg.id))
+            mythegg, _ = self.mythegg_finder.draw_for_mythegg(self.session, spoopy_mythegg, draw_count=100)
+
+        self.assertEqual(mythegg, spoopy_mythegg)
+
+
+class StackedItemTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        self.ae = ActionExecutor()
+        self.ag = ActionGenerator()
+        self.catalog = get_catalog()
+        self.fish = Item.objects.filter(item_type=FISH).first()
+
+        session = Session.objects.create(skip_post_save_signal=False)
+        self.session = load_session_with_related_data(session.key)
+
+    def test_gathering_an_item_already_in_the_inventory_stacks_it(self):
+        """
+        Gathering more of an item the hero already has adds to that stack, rather than making another token
+        """
+        self.session.location = next(place for place in self.catalog.places.values() if place.place_type == BEACH)
+
+        with patch.object(self.ae, '_ActionExecutor__pull_item_from_pool', return_value=self.fish), \
+                patch.object(self.ae.mythegg_finder, 'draw_for_mythegg', return_value=None):
+            for _ in range(3):
+                self.ae.execute_gather_action(self.ag.gen_fishing_action(), self.session)
+
+        [stack] = self.session.inventory.get_item_tokens()
+        self.assertEqual((stack.item_id, stack.count), (self.fish.id, 3))
+        self.assertEqual(ItemToken.objects.filter(session=self.session, item=self.fish).count(), 1)
+
+    def move_onto_stack(self, place, item, execute, gen_action, from_inventory, **token_fields):
+        """Puts a stack of the item in one container and another of the same item in the other (the field, or the
+        inventory), reloads the session as a request would, then moves the lone token onto the stack inside a unit of
+        work -- returning the stack, reloaded"""
+        self.session.location = place
+        self.session.save()
+
+        stack = ItemToken.objects.create(session=self.session, item=item, quantity=2)
+        moved_token = ItemToken.objects.create(session=self.session, item=item, **token_fields)
+        stack_holder, moved_holder = self.session.location_state, self.session.inventory
+        if not from_inventory:
+            stack_holder, moved_holder = moved_holder, stack_holder
+
+        stack_holder.add_item_tokens(stack)
+        moved_holder.add_item_tokens(moved_token)
+        self.session = load_session_with_related_data(self.session.key)
+
+        with UnitOfWork():
+            execute(gen_action(moved_token), self.session)
+
+        self.assertFalse(ItemToken.objects.filter(pk=moved_token.pk).exists())
+
+        return ItemToken.objects.get(pk=stack.pk)
+
+    def test_stows_onto_a_stack_in_the_chest(self):
+        """
+        Stowing an item the chest already has a stack of adds it to that stack, within a unit of work
+        """
+        farmhouse = next(place for place in self.catalog.places.values() if place.is_farmhouse)
+
+        stack = self.move_onto_stack(farmhouse, self.fish, self.ae.execute_stow_action, self.ag.gen_stow_action,
+                                     from_inventory=True)
+
+        self.assertEqual((stack.count, stack.place_state_id), (3, self.session.location_state.pk))
+
+    def test_retrieves_onto_a_stack_in_the_inventory(self):
+        """
+        Retrieving an item the inventory already has a stack of adds it to that stack, within a unit of work
+        """
+        farmhouse = next(place for place in self.catalog.places.values() if place.is_farmhouse)
+
+        stack = self.move_onto_stack(farmhouse, self.fish, self.ae.execute_retrieve_action,
+                                     self.ag.gen_retrieve_action, from_inventory=False)
+
+        self.assertEqual((stack.count, stack.inventory_id), (3, self.session.inventory.pk))
+
+    def test_harvests_onto_a_stack_in_the_inventory(self):
+        """
+        Harvesting a crop the inventory already has a stack of adds it to that stack, within a unit of work
+        """
+        farm = next(place for place in self.catalog.places.values() if place.place_type == FARM)
+        crop = Item.objects.filter(item_type=CROP).first()
+
+        stack = self.move_onto_stack(farm, crop, self.ae.execute_harvest_action, self.ag.gen_harvest_action,
+                                     from_inventory=False, days_growing=3)
+
+        self.assertEqual((stack.count, stack.inventory_id), (3, self.session.inventory.pk))
+
+    def test_shop_offers_selling_one_of_a_stack_or_the_whole_stack(self):
+        """
+        At the shop, a stack gets a sell-all action in the action list as well as the single sell, and a lone item
+        just the single sell
+        """
+        self.session.location = next(place for place in self.catalog.places.values() if place.place_type == SHOP)
+        stack = ItemToken.objects.create(session=self.session, item=self.fish, quantity=3)
+        lone_token = ItemToken.objects.create(session=self.session, item=self.fish, bought_from_store=True)
+        self.session.inventory.add_item_tokens(stack, lone_token)
+
+        digests = [action.unique_digest for action in self.ag.get_actions_for_session(self.session)]
+
+        self.assertIn(f'{Action.SELL_ALL}-{stack.pk}', digests)
+        self.assertIn(f'{Action.SELL}-{stack.pk}', digests)
+        self.assertNotIn(f'{Action.SELL_ALL}-{lone_token.pk}', digests)
+        self.assertIn(f'{Action.SELL}-{lone_token.pk}', digests)
+
+    def test_sells_one_of_a_stack_or_the_whole_stack(self):
+        """
+        Selling from a stack sells one of it, and selling all of it sells the whole stack
+        """
+        self.session.location = next(place for place in self.catalog.places.values() if place.place_type == SHOP)
+        stack = ItemToken.objects.create(session=self.session, item=self.fish, quantity=3)
+        self.session.inventory.add_item_tokens(stack)
+
+        sell_all_action, sell_action = self.ag.gen_shopping_actions([], [stack])
+        self.ae.execute_sell_action(sell_action, self.session)
+
+        self.assertEqual(stack.count, 2)
+        self.assertEqual(self.session.wallet.money, self.fish.price)
+
+        sell_all_action = ActionResolver().resolve(f'{Action.SELL_ALL}-{stack.pk}', self.session)
+        self.ae.execute(sell_all_action, self.session)
+
+        self.assertEqual(self.session.inventory.get_item_tokens(), [])
+        self.assertEqual(self.session.wallet.money, self.fish.price * 3)
+        self.assertEqual(self.session.hero_state.koin_earned, self.fish.price * 3)
@@ -4,13 +4,17 @@ from unittest.mock import MagicMock, patch
 
 from django.test import TestCase
 # noinspection PyUnresolvedReferences
-from mythgarden.game_logic import ActionGenerator
+from mythgarden.game_logic import ActionGenerator, ActionExecutor, ActionResolver
 # noinspection PyUnresolvedReferences
 from mythgarden.models import Item, Action, Villager, Place, Bridge, Building, Hero, Clock, Session, ItemToken, \
     VillagerState
 # noinspection PyUnresolvedReferences
 from mythgarden.models._constants import NORTH, SOUTH, EAST, WEST, GIFT, COMMON, SEED, SPROUT, CROP, TOWN, FARM, \
-    MOUNTAIN, FOREST, BEACH, HOME, SHOP
+    MOUNTAIN, FOREST, BEACH, HOME, SHOP, DAWN, SUNSET
+# noinspection PyUnresolvedReferences
+from mythgarden.catalog import get_catalog
+# noinspection PyUnresolvedReferences
+from mythgarden.view_helpers import load_session_with_related_data
 
 
 def assertAnyActionsOfType(actions, action_type):
@@ -1662,3 +1666,137 @@ class ApplySpeedBoostTests(TestCase):
                 cost_amounts = [action.cost_amount for action in actions]
 
                 self.assertEqual(cost_amounts, self.expected_rows[boost_level])
+
+
+class GetActionsForSessionTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        self.ag = ActionGenerator()
+
+        session = Session.objects.create(skip_post_save_signal=False)
+        self.session = load_session_with_related_data(session.key)
+
+    def test_reuses_actions_while_state_is_unchanged(self):
+        """
+        get_actions_for_session returns the same actions without regenerating them if nothing has changed
+        """
+        actions = self.ag.get_actions_for_session(self.session)
+
+        with patch.object(self.ag, 'gen_available_actions') as mock:
+            self.assertIs(self.ag.get_actions_for_session(self.session), actions)
+            mock.assert_not_called()
+
+    def test_regenerates_actions_when_state_changes(self):
+        """
+        get_actions_for_session regenerates the actions once the session's state has changed
+        """
+        actions = self.ag.get_actions_for_session(self.session)
+
+        self.session.clock.advance(60)
+
+        self.assertIsNot(self.ag.get_actions_for_session(self.session), actions)
+
+    def test_executing_an_action_forgets_cached_actions(self):
+        """
+        Executing an action forgets the cached actions, even if the state summary happens to match
+        """
+        actions = self.ag.get_actions_for_session(self.session)
+        fingerprint = self.session.__dict__['_cached_actions'][0]
+
+        ActionExecutor().execute(actions[0], self.session)
+
+        self.assertIsNone(self.session.get_cached_actions(fingerprint))
+
+
+class ActionResolverTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        self.ag = ActionGenerator()
+        self.resolver = ActionResolver()
+
+        session = Session.objects.create(skip_post_save_signal=False)
+
+        # something of every type in the inventory, and planted in the field, so every kind of item action is on offer
+        item_names = ['Weedbulb Seed', 'Weedbulb', 'Lovely Postcard']
+        inventory_tokens = [ItemToken.objects.create(session=session, item=Item.objects.get(name=name)) for name in item_names]
+        session.inventory.item_tokens.add(*inventory_tokens)
+
+        for place_state in session.place_states.all():
+            place_tokens = [ItemToken.objects.create(session=session, item=Item.objects.get(name=name)) for name in item_names]
+            place_state.item_tokens.add(*place_tokens)
+
+        self.session = load_session_with_related_data(session.key)
+
+    def visit(self, place, time):
+        """Moves the hero -- and every villager -- to the given place, at the given time of day"""
+        self.session.location = place
+        self.session.clock.time = time
+
+        for villager_state in self.session.aggregate.villager_states.values():
+            self.session.aggregate.move_villager(villager_state, self.session.location_state)
+
+    def test_resolves_every_available_action(self):
+        """
+        Every action on offer anywhere, at any time of day, resolves from its digest to the same action
+        """
+        for place in get_catalog().places.values():
+            for time in [DAWN, 12 * 60, SUNSET, 23 * 60]:
+                self.visit(place, time)
+
+                for action in self.ag.get_actions_for_session(self.session):
+                    with self.subTest(place=place.name, time=time, digest=action.unique_digest):
+                        resolved = self.resolver.resolve(action.unique_digest, self.session)
+
+                        self.assertIsNotNone(resolved)
+                        self.assertEqual(resolved.description, action.description)
+                        self.assertEqual(resolved.cost_amount, action.cost_amount)
+                        self.assertEqual(resolved.target_count, action.target_count)
+
+    def test_does_not_resolve_unavailable_actions(self):
+        """
+        A well-formed digest for an action that isn't on offer right now doesn't resolve
+        """
+        farm = next(place for place in get_catalog().places.values() if place.place_type == FARM)
+        self.visit(farm, 12 * 60)
+
+        available = {action.unique_digest for action in self.ag.get_actions_for_session(self.session)}
+        unavailable = [f'{action_type}-{target_id}' for action_type in ['TRAVEL', 'TALK', 'BUY', 'SELL', 'STOW']
+                       for target_id in range(1, 50)] + ['SLEEP', 'GATHER']
+
+        for digest in unavailable:
+            if digest not in available:
+                with self.subTest(digest=digest):
+                    self.assertIsNone(self.resolver.resolve(digest, self.session))
+
+    def test_resolves_journeys_to_any_place_more_than_one_hop_away(self):
+        """
+        Journeys aren't listed with the other actions, but resolve for any place more than one hop away
+        """
+        catalog = get_catalog()
+        self.visit(catalog.places_by_name['lil farmhouse'], 12 * 60)
+
+        shop = catalog.places_by_name['mom and pop shop']
+        journey = self.resolver.resolve(f'JOURNEY-{shop.id}', self.session)
+
+        self.assertEqual(journey.description, 'Travel to mom and pop shop')
+        self.assertEqual(journey.cost_amount, catalog.travel_minutes(self.session.location.id, shop.id))
+        self.assertIsNone(self.resolver.resolve(f'JOURNEY-{catalog.default_place_id}', self.session))
+
+    def test_does_not_resolve_malformed_digests(self):
+        """
+        A digest that doesn't parse doesn't resolve, rather than raising
+        """
+        for digest in ['', 'DANCE-1', 'TRAVEL', 'TRAVEL-x', 'GIVE-1', 'TALK-1-2', None, 12]:
+            with self.subTest(digest=digest):
+                self.assertIsNone(self.resolver.resolve(digest, self.session))
+
+    def test_resolves_without_queries(self):
+        """
+        Resolving an action on a loaded session doesn't go back to the database
+        """
+        action = self.ag.get_actions_for_session(self.session)[0]
+
+        with self.assertNumQueries(0):
+            self.resolver.resolve(action.unique_digest, self.session)
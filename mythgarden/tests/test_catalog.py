@@ -0,0 +1,698 @@
+import io
+import os
+import random
+import tempfile
+from collections import Counter, defaultdict
+from dataclasses import FrozenInstanceError
+from unittest.mock import MagicMock
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+# noinspection PyUnresolvedReferences
+from mythgarden.catalog import get_catalog, reset_catalog, refresh_catalog_if_stale, read_artifact, PlaceRecord, \
+    VillagerRecord
+# noinspection PyUnresolvedReferences
+from mythgarden.catalog.loader import load_snapshot, load_compiled_snapshot
+# noinspection PyUnresolvedReferences
+from mythgarden.catalog.luck import LUCK_GROWTH_BY_RARITY, LUCK_LEVELS, get_luck_level, get_luck_percent, \
+    get_rarity_weights, get_rarity_odds
+# noinspection PyUnresolvedReferences
+from mythgarden.catalog.sampling import AliasTable
+
+# noinspection PyUnresolvedReferences
+from mythgarden.models import Place, Item, Villager, DialogueLine, Achievement, ItemTypePreference, CatalogGeneration, \
+    Clock
+
+# noinspection PyUnresolvedReferences
+from mythgarden.models._constants import FARM, HOME, TOWN, EAST, WEST, NORTH, SOUTH, SEED, GIFT, HATE, LOVE, \
+    NEUTRAL, SCORE_POINTS, MONDAY, TUESDAY, SUNDAY, CROP, COMMON, RARE, EPIC, RARITIES, FOREST, FISH, HERB, MINERAL, \
+    MAGIC, RARITY_WEIGHTS, LUCK_DENOMINATOR, MAX_LUCK_LEVEL, GAIN_ACHIEVEMENT, BESTEST_FRIENDS, BEST_FRIENDS
+
+
+class CatalogTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        reset_catalog()
+        self.catalog = get_catalog()
+
+        self.farm = Place.objects.get(name='The Farm')
+        self.farmhouse = Place.objects.get(name='lil farmhouse')
+
+    def test_indexes_every_place_by_id(self):
+        """
+        Indexes every place by id, as a PlaceRecord
+        """
+        self.assertEqual(set(self.catalog.places), set(Place.objects.values_list('id', flat=True)))
+
+        for place in self.catalog.places.values():
+            self.assertIsInstance(place, PlaceRecord)
+
+    def test_default_place_is_the_farm(self):
+        """
+        Uses the farm as the default place
+        """
+        self.assertEqual(self.catalog.default_place.id, self.farm.id)
+        self.assertEqual(self.catalog.default_place.place_type, FARM)
+
+    def test_links_buildings_to_their_surround(self):
+        """
+        Links buildings to their surround, and lists them under it in name order
+        """
+        farmhouse = self.catalog.places[self.farmhouse.id]
+
+        self.assertTrue(farmhouse.is_building)
+        self.assertIs(farmhouse.surround, self.catalog.places[self.farm.id])
+        self.assertIn(farmhouse, self.catalog.buildings_in(self.farm.id))
+
+        for place_id in self.catalog.places:
+            names = [building.name for building in self.catalog.buildings_in(place_id)]
+            self.assertEqual(names, sorted(names))
+
+    def test_marks_only_the_home_on_the_farm_as_the_farmhouse(self):
+        """
+        Marks only the home building on the farm as the farmhouse
+        """
+        farmhouses = [place for place in self.catalog.places.values() if place.is_farmhouse]
+
+        self.assertEqual([place.id for place in farmhouses], [self.farmhouse.id])
+
+    def test_lists_bridges_from_both_sides(self):
+        """
+        Lists each bridge under both of the places it connects
+        """
+        for bridge in self.catalog.bridges.values():
+            self.assertIn(bridge, self.catalog.bridges_for(bridge.place_1_id))
+            self.assertIn(bridge, self.catalog.bridges_for(bridge.place_2_id))
+
+    def test_precomputes_arrows_for_each_place(self):
+        """
+        Precomputes the same arrows a place used to build from its bridges
+        """
+        for place in self.catalog.places.values():
+            expected = []
+
+            for bridge in self.catalog.bridges_for(place.id):
+                if bridge.place_1_id == place.id:
+                    expected.append((bridge.direction_2, bridge.place_2_id))
+
+            for bridge in self.catalog.bridges_for(place.id):
+                if bridge.place_2_id == place.id:
+                    expected.append((bridge.direction_1, bridge.place_1_id))
+
+            self.assertEqual(list(place.arrows), expected)
+
+    def test_routes_take_the_quickest_way(self):
+        """
+        Routes go hop by hop to the destination, out of buildings & across bridges, the quickest way
+        """
+        old_town = Place.objects.get(name='Old Town')
+        shop = Place.objects.get(name='mom and pop shop')
+
+        self.assertEqual(self.catalog.route(self.farmhouse.id, shop.id), (self.farm.id, old_town.id, shop.id))
+        self.assertEqual(self.catalog.travel_minutes(self.farmhouse.id, shop.id), 70)
+
+        self.assertEqual(self.catalog.route(self.farm.id, self.farm.id), ())
+        self.assertEqual(self.catalog.travel_minutes(self.farm.id, self.farm.id), 0)
+
+    def test_routes_between_every_pair_of_places(self):
+        """
+        Every place can reach every other, one neighbor at a time, in the same time both ways
+        """
+        for origin_id in self.catalog.places:
+            for destination_id in self.catalog.places:
+                with self.subTest(origin=origin_id, destination=destination_id):
+                    route = self.catalog.route(origin_id, destination_id)
+                    minutes = 0
+
+                    for from_id, to_id in zip((origin_id,) + route, route):
+                        minutes += dict(self.catalog.neighbors_of(from_id))[to_id]
+
+                    self.assertEqual(route[-1:], () if origin_id == destination_id else (destination_id,))
+                    self.assertEqual(minutes, self.catalog.travel_minutes(origin_id, destination_id))
+                    self.assertEqual(minutes, self.catalog.travel_minutes(destination_id, origin_id))
+
+    def test_indexes_items_and_mythlings(self):
+        """
+        Indexes items by id and name, and mythlings by type
+        """
+        self.assertEqual(len(self.catalog.items), Item.objects.count())
+
+        for mythling in self.catalog.mythlings.values():
+            self.assertIs(self.catalog.items[mythling.id], mythling)
+            self.assertIs(self.catalog.mythlings_by_type[mythling.mythling_type], mythling)
+
+    def test_gets_dialogue_for_a_villager(self):
+        """
+        Gets the dialogue line for a villager, trigger and affinity tier
+        """
+        line = DialogueLine.objects.filter(affinity_tier__isnull=False).first()
+
+        record = self.catalog.get_dialogue(line.speaker_id, line.trigger, line.affinity_tier)
+
+        self.assertEqual(record.id, line.id)
+        self.assertEqual(record.full_text, line.full_text)
+
+    def test_raises_key_error_for_missing_dialogue(self):
+        """
+        Raises a KeyError when a villager has no dialogue for the given trigger and tier
+        """
+        villager = Villager.objects.first()
+
+        with self.assertRaises(KeyError):
+            self.catalog.get_dialogue(villager.id, DialogueLine.TALKED_TO, 99)
+
+    def test_groups_achievements_by_trigger_type(self):
+        """
+        Groups achievements by trigger type
+        """
+        achievement_ids = [a.id for a in self.catalog.achievements_triggered_by(SCORE_POINTS)]
+        expected_ids = list(Achievement.objects.filter(trigger_type=SCORE_POINTS).order_by('pk').values_list('id', flat=True))
+
+        self.assertEqual(achievement_ids, expected_ids)
+
+    def test_compiles_a_check_for_every_achievement_by_trigger_type(self):
+        """
+        Indexes a compiled check for each achievement under its trigger type, with its threshold bound in
+        """
+        achievement_checks = self.catalog.achievement_checks_for(SCORE_POINTS)
+
+        self.assertEqual([a for a, _ in achievement_checks], list(self.catalog.achievements_triggered_by(SCORE_POINTS)))
+
+        for achievement, check in achievement_checks:
+            with self.subTest(achievement=achievement.name):
+                self.assertFalse(check(hero_state=MagicMock(score=achievement.threshold - 1)))
+                self.assertTrue(check(hero_state=MagicMock(score=achievement.threshold)))
+
+    def test_compiled_checks_count_earned_achievements_from_the_earned_set(self):
+        """
+        The checks for earning so many achievements of a type count them in the earned achievement ids they're given
+        """
+        achievement, check = next((a, c) for a, c in self.catalog.achievement_checks_for(GAIN_ACHIEVEMENT)
+                                  if a.achievement_type == BESTEST_FRIENDS)
+        best_friends_ids = [a.id for a in self.catalog.achievements.values() if a.achievement_type == BEST_FRIENDS]
+        others_ids = {a.id for a in self.catalog.achievements.values() if a.achievement_type != BEST_FRIENDS}
+
+        self.assertFalse(check(earned_achievement_ids=others_ids | set(best_friends_ids[:achievement.threshold - 1])))
+        self.assertTrue(check(earned_achievement_ids=set(best_friends_ids[:achievement.threshold])))
+
+    def test_orders_events_by_time_then_daily_first(self):
+        """
+        Orders events by time, then daily events before one-day events
+        """
+        keys = [(event.time, not event.is_daily, event.id) for event in self.catalog.ordered_events]
+
+        self.assertEqual(keys, sorted(keys))
+
+    def test_finds_events_in_a_window_of_time(self):
+        """
+        Finds the events after one time and up to another on the same day, daily or on that day, in trigger order
+        """
+        events = self.catalog.events_between(5 * 60, 12 * 60)
+
+        expected = [event for event in self.catalog.ordered_events
+                    if (event.is_daily or event.day == MONDAY) and 5 * 60 < event.time <= 12 * 60]
+
+        self.assertTrue(len(expected) > 0)
+        self.assertEqual(events, expected)
+        self.assertEqual(self.catalog.events_between(12 * 60, 12 * 60), [])
+
+    def test_finds_events_in_a_window_across_midnight(self):
+        """
+        Across midnight, the window is the rest of the first day's events and then the second day's so far
+        """
+        events = self.catalog.events_between(20 * 60, Clock.convert_to_week_minute(TUESDAY, 12 * 60))
+
+        rest_of_monday = [event for event in self.catalog.ordered_events
+                          if (event.is_daily or event.day == MONDAY) and event.time > 20 * 60]
+        tuesday_so_far = [event for event in self.catalog.ordered_events
+                          if (event.is_daily or event.day == TUESDAY) and event.time <= 12 * 60]
+
+        self.assertEqual(events, rest_of_monday + tuesday_so_far)
+
+    def test_finds_events_in_a_window_across_the_end_of_the_week(self):
+        """
+        Across the end of the week, the window is the rest of the last day's events and then the first day's so far
+        """
+        events = self.catalog.events_between(Clock.convert_to_week_minute(SUNDAY, 20 * 60), 12 * 60)
+
+        rest_of_sunday = [event for event in self.catalog.ordered_events
+                          if (event.is_daily or event.day == SUNDAY) and event.time > 20 * 60]
+        monday_so_far = [event for event in self.catalog.ordered_events
+                         if (event.is_daily or event.day == MONDAY) and event.time <= 12 * 60]
+
+        self.assertEqual(events, rest_of_sunday + monday_so_far)
+
+    def test_lookups_do_not_query_the_database(self):
+        """
+        Doesn't query the database once the catalog is loaded
+        """
+        with self.assertNumQueries(0):
+            catalog = get_catalog()
+            catalog.places[self.farm.id].serialize()
+            catalog.buildings_in(self.farm.id)
+            catalog.bridges_for(self.farm.id)
+            catalog.achievements_triggered_by(SCORE_POINTS)
+
+            for villager in catalog.villagers.values():
+                villager.serialize()
+
+    def test_records_are_read_only(self):
+        """
+        Refuses to modify records, since they're shared between requests
+        """
+        with self.assertRaises(FrozenInstanceError):
+            self.catalog.default_place.name = 'Not The Farm'
+
+    def test_saving_world_content_resets_the_catalog(self):
+        """
+        Rebuilds the catalog after world content is saved
+        """
+        Place.objects.create(name='Nowheresville', place_type=TOWN)
+
+        new_catalog = get_catalog()
+
+        self.assertIsNot(new_catalog, self.catalog)
+        self.assertIn('Nowheresville', new_catalog.places_by_name)
+
+
+class VillagerScheduleTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        reset_catalog()
+        self.catalog = get_catalog()
+
+        self.trix = next(villager for villager in self.catalog.villagers.values() if villager.name == 'Trix')
+        self.beach = Place.objects.get(name='Bric-a-Brackish Beach')
+
+    def test_finds_villagers_where_their_last_event_put_them(self):
+        """
+        A villager is wherever their latest appears event put them, until the next one moves them on
+        """
+        self.assertEqual(self.catalog.villager_location_id(self.trix.id, 9 * 60), self.beach.id)
+        self.assertEqual(self.catalog.villager_location_id(self.trix.id, 10 * 60 + 59), self.beach.id)
+        self.assertIsNone(self.catalog.villager_location_id(self.trix.id, 11 * 60))
+
+    def test_villagers_are_at_home_before_their_first_event(self):
+        """
+        Before their first appears event of the week, a villager is at home
+        """
+        for villager in self.catalog.villagers.values():
+            with self.subTest(villager=villager.name):
+                location_id = self.catalog.villager_location_id(villager.id, 0)
+                self.assertEqual(location_id, villager.home.id if villager.home else None)
+
+    def test_matches_every_one_day_event(self):
+        """
+        Right at each one-day appears event, the villager is where it put them
+        """
+        for event in self.catalog.events.values():
+            if event.villager and not event.is_daily:
+                with self.subTest(event=event.id):
+                    minute = Clock.convert_to_week_minute(event.day, event.time)
+                    location_id = self.catalog.villager_location_id(event.villager.id, minute)
+                    self.assertEqual(location_id, event.place.id if event.place else None)
+
+    def test_only_some_villagers_move_when_villagers_move_is_off(self):
+        """
+        With villagers_move off, villagers stay home all week -- except the ones who always move
+        """
+        for villager in self.catalog.villagers.values():
+            with self.subTest(villager=villager.name):
+                location_id = self.catalog.villager_location_id(villager.id, 9 * 60, villagers_move=False)
+
+                if villager.always_moves:
+                    self.assertEqual(location_id, self.beach.id)
+                else:
+                    self.assertEqual(location_id, villager.home.id if villager.home else None)
+                    self.assertIsNone(self.catalog.villager_next_move(villager.id, 9 * 60, False))
+
+    def test_finds_the_next_move(self):
+        """
+        The next move is the next point in the week the villager goes somewhere else
+        """
+        self.assertEqual(self.catalog.villager_next_move(self.trix.id, 9 * 60), (11 * 60, None))
+        self.assertEqual(self.catalog.villager_next_move(self.trix.id, Clock.convert_to_week_minute(SUNDAY, 23 * 60)), None)
+
+
+class GatherSamplerTests(TestCase):
+    # the 99.9th percentile of the chi-squared distribution, by degrees of freedom
+    CHI_SQUARED_CRITICAL_VALUES = {3: 16.27, 4: 18.47}
+
+    def setUp(self):
+        self.place = Place.objects.create(name='Testing Grounds', place_type=FOREST)
+        self.pool = [
+            Item.objects.create(name='Test Trout', item_type=FISH, rarity=COMMON),
+            Item.objects.create(name='Test Bass', item_type=FISH, rarity=COMMON),
+            Item.objects.create(name='Test Sage', item_type=HERB, rarity=COMMON),
+            Item.objects.create(name='Test Geode', item_type=MINERAL, rarity=RARE),
+            Item.objects.create(name='Test Relic', item_type=MAGIC, rarity=EPIC),
+        ]
+        self.place.item_pool.set(self.pool)
+
+        self.catalog = get_catalog()
+
+    def chi_squared(self, counts, odds, draw_count):
+        return sum((counts[outcome] - draw_count * p) ** 2 / (draw_count * p) for outcome, p in odds.items())
+
+    @staticmethod
+    def old_luck_modified_weight(rarity, luck_level):
+        return RARITY_WEIGHTS[rarity] + luck_level / LUCK_DENOMINATOR * LUCK_GROWTH_BY_RARITY[rarity]
+
+    def odds_the_old_way(self, luck_level):
+        """The chance of each item coming up the way gathering has always drawn them: pick a rarity by its luck
+        modified weight and, if the pool has none of it, pick again from the other rarities; then pick an item type
+        of that rarity, then an item of that type"""
+        weights = {rarity: self.old_luck_modified_weight(rarity, luck_level) for rarity in RARITIES}
+        present = {item.rarity for item in self.pool}
+
+        def rarity_odds(rarities):
+            total = sum(weights[rarity] for rarity in rarities)
+            odds = defaultdict(float)
+
+            for rarity in rarities:
+                chance = weights[rarity] / total
+                if chance == 0:
+                    continue
+
+                if rarity in present:
+                    odds[rarity] += chance
+                else:
+                    for other_rarity, other_chance in rarity_odds([r for r in rarities if r != rarity]).items():
+                        odds[other_rarity] += chance * other_chance
+
+            return odds
+
+        odds = {}
+        for rarity, chance in rarity_odds(RARITIES).items():
+            items = [item for item in self.pool if item.rarity == rarity]
+            item_types = {item.item_type for item in items}
+
+            for item in items:
+                same_type_count = len([other for other in items if other.item_type == item.item_type])
+                odds[item.id] = chance / len(item_types) / same_type_count
+
+        return odds
+
+    def test_alias_table_encodes_its_weights_exactly(self):
+        """
+        An alias table gives each outcome its share of the total weight, and never gives weightless ones a chance
+        """
+        table = AliasTable(['a', 'b', 'c', 'd', 'e'], [1, 2, 3, 4, 0])
+
+        for outcome, weight in [('a', 1), ('b', 2), ('c', 3), ('d', 4), ('e', 0)]:
+            self.assertAlmostEqual(table.probability_of(outcome), weight / 10)
+
+    def test_alias_table_draws_in_proportion_to_weights(self):
+        """
+        Draws from an alias table come up in proportion to their weights (a chi-squared test, at the 0.1% level)
+        """
+        random.seed(2718)
+        table = AliasTable(['a', 'b', 'c', 'd'], [5, 1, 3, 1])
+        draw_count = 20000
+
+        counts = Counter(table.draw() for _ in range(draw_count))
+
+        odds = {'a': 0.5, 'b': 0.1, 'c': 0.3, 'd': 0.1}
+        self.assertLess(self.chi_squared(counts, odds, draw_count), self.CHI_SQUARED_CRITICAL_VALUES[3])
+
+    def test_draws_items_with_the_same_odds_as_before(self):
+        """
+        Drawing from an item pool reproduces the odds of picking a rarity (retrying when the pool has none of it),
+        then an item type, then an item -- at no luck and at high luck
+        """
+        draw_count = 20000
+
+        for luck_level in [0, 100]:
+            with self.subTest(luck_level=luck_level):
+                random.seed(31415 + luck_level)
+
+                counts = Counter(self.catalog.draw_from_item_pool(self.place.id, luck_level).id
+                                 for _ in range(draw_count))
+
+                odds = self.odds_the_old_way(luck_level)
+                self.assertEqual(set(counts), set(odds))
+                self.assertLess(self.chi_squared(counts, odds, draw_count), self.CHI_SQUARED_CRITICAL_VALUES[4])
+
+    def test_gather_rarity_odds_are_the_odds_draws_go_by(self):
+        """
+        gather_rarity_odds gives the same odds of each rarity as drawing from the item pool does
+        """
+        for luck_level in [0, 100]:
+            with self.subTest(luck_level=luck_level):
+                odds = self.catalog.gather_rarity_odds(self.place.id, luck_level)
+                old_odds = self.odds_the_old_way(luck_level)
+
+                for rarity in RARITIES:
+                    expected = sum(chance for item_id, chance in old_odds.items()
+                                   if self.catalog.items[item_id].rarity == rarity)
+                    self.assertAlmostEqual(odds[rarity], expected)
+
+    def test_draws_without_querying_the_database(self):
+        """
+        Drawing from an item pool doesn't query the database
+        """
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                self.catalog.draw_from_item_pool(self.place.id, 50)
+
+
+class LuckTableTests(TestCase):
+    def test_rarity_weights_match_the_luck_math_at_every_level(self):
+        """
+        The rarity weights worked out ahead of time for each luck level are the ones luck has always given
+        """
+        for luck_level in LUCK_LEVELS:
+            weights = get_rarity_weights(luck_level)
+
+            for rarity in RARITIES:
+                expected = RARITY_WEIGHTS[rarity] + luck_level / LUCK_DENOMINATOR * LUCK_GROWTH_BY_RARITY[rarity]
+                self.assertAlmostEqual(weights[rarity], expected)
+
+    def test_rarity_weights_are_a_distribution_at_every_level(self):
+        """
+        At every luck level the rarity weights add up to 1 with none below 0, and at max luck commons never come up
+        """
+        for luck_level in LUCK_LEVELS:
+            weights = get_rarity_weights(luck_level)
+
+            self.assertAlmostEqual(sum(weights.values()), 1)
+            self.assertTrue(all(weight >= 0 for weight in weights.values()))
+
+        self.assertEqual(get_rarity_weights(MAX_LUCK_LEVEL)[COMMON], 0)
+
+    def test_luck_past_the_max_counts_as_the_max(self):
+        """
+        A luck level pushed past MAX_LUCK_LEVEL (say, by a luck bonus) counts as MAX_LUCK_LEVEL, for rarities and
+        for mythegg draws alike
+        """
+        self.assertEqual(get_luck_level(MAX_LUCK_LEVEL - 10, 40), MAX_LUCK_LEVEL)
+        self.assertEqual(get_luck_percent(MAX_LUCK_LEVEL + 40), MAX_LUCK_LEVEL / LUCK_DENOMINATOR)
+        self.assertEqual(get_rarity_weights(MAX_LUCK_LEVEL + 40), get_rarity_weights(MAX_LUCK_LEVEL))
+
+    def test_rarity_odds_leave_out_rarities_not_on_offer(self):
+        """
+        get_rarity_odds shares all the chances out between just the rarities it's given
+        """
+        odds = get_rarity_odds(0, [COMMON, RARE])
+
+        self.assertAlmostEqual(odds[COMMON], RARITY_WEIGHTS[COMMON] / (RARITY_WEIGHTS[COMMON] + RARITY_WEIGHTS[RARE]))
+        self.assertAlmostEqual(odds[COMMON] + odds[RARE], 1)
+        self.assertEqual(set(odds), {COMMON, RARE})
+
+
+class GrowthTransitionTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        reset_catalog()
+        self.catalog = get_catalog()
+
+        self.seed = self.catalog.get_item_by_name('Hallowed Pumpkin Seed')
+        self.sprout = self.catalog.get_item_by_name('Hallowed Pumpkin Sprout')
+
+    def next_stage_name(self, item, days_growing, advanced_crops, grow_golden_crops):
+        return self.catalog.items[
+            self.catalog.next_growth_stage_id(item.id, days_growing, advanced_crops, grow_golden_crops)
+        ].name
+
+    def test_basic_crops_grow_a_stage_a_day(self):
+        """
+        In basic mode a seed grows into its sprout, and a sprout into its crop, whatever its growth days
+        """
+        self.assertEqual(self.next_stage_name(self.seed, 1, False, False), 'Hallowed Pumpkin Sprout')
+        self.assertEqual(self.next_stage_name(self.sprout, 2, False, False), 'Hallowed Pumpkin')
+
+    def test_advanced_crops_stay_sprouts_until_their_growth_days(self):
+        """
+        In advanced mode a plant is a sprout until it's been growing for its growth days, then a crop
+        """
+        self.assertEqual(self.next_stage_name(self.seed, 1, True, False), 'Hallowed Pumpkin Sprout')
+        self.assertEqual(self.next_stage_name(self.sprout, 2, True, False), 'Hallowed Pumpkin Sprout')
+        self.assertEqual(self.next_stage_name(self.sprout, 3, True, False), 'Hallowed Pumpkin')
+
+    def test_only_crops_come_out_golden(self):
+        """
+        With golden crops on, crops come out golden but sprouts are still sprouts
+        """
+        self.assertEqual(self.next_stage_name(self.seed, 1, False, True), 'Hallowed Pumpkin Sprout')
+        self.assertEqual(self.next_stage_name(self.sprout, 2, False, True), 'Golden Pumpkin')
+
+    def test_every_seed_has_every_stage(self):
+        """
+        Every seed in the content can grow all the way (the fixture's growth stages are complete)
+        """
+        for item in self.catalog.items.values():
+            if item.item_type == SEED:
+                with self.subTest(seed=item.name):
+                    for advanced_crops in [False, True]:
+                        for grow_golden_crops in [False, True]:
+                            sprout_id = self.catalog.next_growth_stage_id(item.id, 0, advanced_crops, grow_golden_crops)
+                            crop_id = self.catalog.next_growth_stage_id(sprout_id, 99, advanced_crops, grow_golden_crops)
+
+                            self.assertEqual(self.catalog.items[crop_id].item_type, CROP)
+
+    def test_create_growth_stages_fills_in_missing_stages(self):
+        """
+        Item.objects.create_growth_stages creates the stages a new seed can grow into, and nothing else
+        """
+        Item.objects.create(name='Moon Bean Seed', item_type=SEED, price=3, rarity=COMMON, growth_days=1)
+
+        self.assertEqual(Item.objects.create_growth_stages(), 3)
+        self.assertEqual(Item.objects.create_growth_stages(), 0)
+        self.assertIsNotNone(get_catalog().next_growth_stage_id(
+            get_catalog().get_item_by_name('Moon Bean Seed').id, 0, False, False
+        ))
+
+
+class CatalogGenerationTests(TestCase):
+    def setUp(self):
+        reset_catalog()
+        self.catalog = get_catalog()
+
+    def test_saving_world_content_bumps_the_generation(self):
+        """
+        Bumps the stored generation when world content is saved
+        """
+        generation = CatalogGeneration.get_current()
+
+        Place.objects.create(name='Nowheresville', place_type=TOWN)
+
+        self.assertGreater(CatalogGeneration.get_current(), generation)
+
+    def test_refresh_keeps_catalog_if_generation_has_not_moved(self):
+        """
+        Keeps the loaded catalog (with a single query) if the generation hasn't moved
+        """
+        with self.assertNumQueries(1):
+            refresh_catalog_if_stale()
+
+        self.assertIs(get_catalog(), self.catalog)
+
+    def test_refresh_drops_catalog_if_another_process_bumped_the_generation(self):
+        """
+        Drops the loaded catalog if the generation was bumped elsewhere (eg by another worker)
+        """
+        # a plain update doesn't send signals, so this process doesn't hear about it
+        CatalogGeneration.objects.update(generation=F('generation') + 1)
+
+        refresh_catalog_if_stale()
+
+        self.assertIsNot(get_catalog(), self.catalog)
+
+
+class CatalogArtifactTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, 'catalog.bin')
+
+        call_command('compile_catalog', output=self.path, stdout=io.StringIO())
+        reset_catalog()
+
+    def test_artifact_round_trips_the_snapshot(self):
+        """
+        Reads back exactly the snapshot that was compiled
+        """
+        self.assertEqual(read_artifact(self.path), load_snapshot())
+
+    def test_returns_none_for_missing_or_foreign_files(self):
+        """
+        Returns None for a missing file, or one that isn't a catalog artifact
+        """
+        self.assertIsNone(read_artifact(self.path + '.missing'))
+
+        with open(self.path, 'wb') as f:
+            f.write(b'not a catalog')
+
+        self.assertIsNone(read_artifact(self.path))
+
+    def test_returns_none_for_empty_or_truncated_artifacts(self):
+        """
+        Returns None for an empty artifact, or one cut off partway through, and falls back to the database
+        """
+        with open(self.path, 'rb') as f:
+            contents = f.read()
+
+        with open(self.path, 'wb') as f:
+            f.write(contents[:len(contents) // 2])
+
+        self.assertIsNone(read_artifact(self.path))
+
+        open(self.path, 'wb').close()
+
+        self.assertIsNone(read_artifact(self.path))
+
+        with override_settings(CATALOG_ARTIFACT_PATH=self.path):
+            self.assertIn('The Farm', get_catalog().places_by_name)
+
+    def test_loads_catalog_from_artifact_with_a_single_query(self):
+        """
+        Loads the catalog from an up-to-date artifact with just the generation check
+        """
+        with override_settings(CATALOG_ARTIFACT_PATH=self.path):
+            with self.assertNumQueries(1):
+                catalog = get_catalog()
+
+        self.assertEqual(catalog.generation, CatalogGeneration.get_current())
+        self.assertIn('The Farm', catalog.places_by_name)
+
+    def test_ignores_artifact_compiled_from_an_older_generation(self):
+        """
+        Ignores an artifact once world content has changed since it was compiled
+        """
+        Place.objects.create(name='Nowheresville', place_type=TOWN)
+
+        self.assertIsNone(load_compiled_snapshot(self.path))
+
+        with override_settings(CATALOG_ARTIFACT_PATH=self.path):
+            self.assertIn('Nowheresville', get_catalog().places_by_name)
+
+
+class VillagerRecordTests(TestCase):
+    def setUp(self):
+        self.villager = VillagerRecord(
+            id=1, name='Bob', full_name='Bob', description='', friendliness=4, image_path='bob.png',
+            preferences=((SEED, LOVE),)
+        )
+
+    def test_gift_valence_uses_villager_preference_first(self):
+        """
+        Uses the villager's own preference for an item type when there is one
+        """
+        seed = Item(name='Parsnip Seed', item_type=SEED)
+
+        self.assertEqual(self.villager.gift_valence(seed), LOVE)
+
+    def test_gift_valence_falls_back_to_universal_preferences(self):
+        """
+        Falls back to the universal preference for an item type
+        """
+        gift = Item(name='Nice Gift', item_type=GIFT)
+
+        self.assertEqual(self.villager.gift_valence(gift), ItemTypePreference.UNIVERSAL_PREFERENCES[GIFT])
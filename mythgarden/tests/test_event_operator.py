@@ -0,0 +1,146 @@
+from django.test import TestCase
+# noinspection PyUnresolvedReferences
+from mythgarden.catalog import get_catalog
+# noinspection PyUnresolvedReferences
+from mythgarden.game_logic import EventOperator
+# noinspection PyUnresolvedReferences
+from mythgarden.models import Session, VillagerState, ScheduledEvent, Item, ItemToken, PlaceState
+# noinspection PyUnresolvedReferences
+from mythgarden.models._constants import FARM, SEED, SPROUT
+# noinspection PyUnresolvedReferences
+from mythgarden.models.unit_of_work import UnitOfWork
+# noinspection PyUnresolvedReferences
+from mythgarden.view_helpers import load_session_with_related_data
+
+
+class PlaceVillagersTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        self.eo = EventOperator()
+
+        session = Session.objects.create(skip_post_save_signal=False)
+        self.session = load_session_with_related_data(session.key)
+        self.session.hero.settings.villagers_move = True
+
+        self.catalog = get_catalog()
+        self.trix = next(villager for villager in self.catalog.villagers.values() if villager.name == 'Trix')
+
+    def test_moves_villagers_to_where_their_schedule_has_them(self):
+        """
+        place_villagers moves every villager state to their scheduled place, and saves the ones that moved
+        """
+        clock = self.session.clock
+        clock.minute = 9 * 60
+
+        self.eo.place_villagers(clock, self.session)
+
+        for villager_state in VillagerState.objects.filter(session=self.session).select_related('location_state'):
+            with self.subTest(villager=villager_state.villager_id):
+                expected_place_id = self.catalog.villager_location_id(villager_state.villager_id, 9 * 60)
+                location_state = villager_state.location_state
+
+                self.assertEqual(location_state.place_id if location_state else None, expected_place_id)
+
+    def test_saves_nothing_when_nobody_moves(self):
+        """
+        place_villagers doesn't write anything if everyone is already where they should be
+        """
+        clock = self.session.clock
+        clock.minute = 9 * 60
+        self.eo.place_villagers(clock, self.session)
+
+        with self.assertNumQueries(0):
+            self.eo.place_villagers(clock, self.session)
+
+    def test_whereabouts_endpoint_lists_everyone(self):
+        """
+        The whereabouts endpoint lists every villager, with where they are & where they're headed next
+        """
+        client_session = self.client.session
+        client_session['session_key'] = self.session.key
+        client_session.save()
+
+        villagers = self.client.get('/whereabouts', secure=True).json()['villagers']
+        trix = next(villager for villager in villagers if villager['id'] == self.trix.id)
+
+        self.assertEqual(len(villagers), len(self.catalog.villagers))
+        self.assertEqual(trix['next']['time'], 9 * 60)
+        self.assertEqual(trix['next']['place']['name'], 'Bric-a-Brackish Beach')
+
+
+class BuildEventsToTriggerQueueTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        self.eo = EventOperator()
+
+        session = Session.objects.create(skip_post_save_signal=False)
+        self.session = load_session_with_related_data(session.key)
+
+    def test_queues_shop_events_since_last_triggered_without_queries(self):
+        """
+        build_events_to_trigger_queue finds the (non-villager) events since events were last triggered, from the
+        catalog alone
+        """
+        clock = self.session.clock
+        clock.last_triggered_minute, clock.minute = 0, 12 * 60
+
+        with self.assertNumQueries(0):
+            queue = self.eo.build_events_to_trigger_queue(clock)
+
+        self.assertTrue(len(queue) > 0)
+        self.assertTrue(all(event.event_type == ScheduledEvent.SHOP_POPULATES for event in queue))
+        self.assertTrue(all(0 < event.time <= 12 * 60 for event in queue))
+
+
+class GrowCropsTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        self.eo = EventOperator()
+        self.seeds = list(Item.objects.filter(item_type=SEED).order_by('pk')[:4])
+
+    def load_session_with_farm(self, watered_seeds, dry_seeds):
+        session = Session.objects.create(skip_post_save_signal=False)
+        farm = next(place for place in get_catalog().places.values() if place.place_type == FARM)
+
+        tokens = [ItemToken.objects.create(session=session, item=seed, has_been_watered=True, days_growing=0)
+                  for seed in watered_seeds]
+        tokens += [ItemToken.objects.create(session=session, item=seed, days_growing=0) for seed in dry_seeds]
+        PlaceState.objects.get(session=session, place_id=farm.id).item_tokens.set(tokens)
+
+        session = load_session_with_related_data(session.key)
+        return session, session.aggregate.get_place_state(farm.id)
+
+    def test_grows_watered_plants_in_place(self):
+        """
+        grow_crops replaces each watered seed with its sprout, one day older, and leaves dry ones as they were
+        """
+        session, farm_state = self.load_session_with_farm(self.seeds[:3], self.seeds[3:])
+        dry_token = farm_state.get_item_tokens()[3]
+
+        self.eo.grow_crops(session.aggregate.place_states.values(), session)
+
+        contents = list(PlaceState.objects.get(pk=farm_state.pk).item_tokens.all())
+        grown_tokens = [token for token in contents if token != dry_token]
+
+        self.assertIn(dry_token, contents)
+        self.assertEqual(sorted(token.item.name for token in grown_tokens),
+                         sorted(seed.name.replace('Seed', 'Sprout') for seed in self.seeds[:3]))
+        self.assertTrue(all(token.item_type == SPROUT and token.days_growing == 1 for token in grown_tokens))
+
+    def test_grows_the_whole_farm_in_a_fixed_number_of_queries(self):
+        """
+        grow_crops creates the grown tokens in bulk, however many plants there are, without fetching the items
+        they grow into (the catalog has their ids) or ever having to create one
+        """
+        session, farm_state = self.load_session_with_farm(self.seeds, [])
+        item_count = Item.objects.count()
+
+        with UnitOfWork():
+            with self.assertNumQueries(1):
+                self.eo.grow_crops(session.aggregate.place_states.values(), session)
+
+        self.assertEqual(PlaceState.objects.get(pk=farm_state.pk).item_tokens.filter(item__item_type=SPROUT).count(), 4)
+        self.assertEqual(Item.objects.count(), item_count)
@@ -1,11 +1,26 @@
+import io
+from unittest.mock import MagicMock
+
+from django.core.management import call_command, CommandError
+from django.db import connection, transaction, IntegrityError
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.core.validators import ValidationError
 
 # noinspection PyUnresolvedReferences
-from mythgarden.models import Action, Clock, Session
+from mythgarden.catalog import get_catalog, reset_catalog
+# noinspection PyUnresolvedReferences
+from mythgarden.models import Action, Clock, Session, SessionAggregate, Place, PlaceState, Villager, VillagerState, \
+    UnitOfWork, Wallet, Message, ItemToken, Item, MythlingState, Achievement, Hero
+# noinspection PyUnresolvedReferences
+from mythgarden.game_logic import MytheggFinder, MytheggPowers
+# noinspection PyUnresolvedReferences
+from mythgarden.view_helpers import load_session_with_related_data, custom_serialize
 
 # noinspection PyUnresolvedReferences
-from mythgarden.models._constants import MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY, SATURDAY, SUNDAY
+from mythgarden.models._constants import TOWN, MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY, SATURDAY, SUNDAY, \
+    GIFT_ENTITY, TIME_TYPE, SPOOPY, CORAL, SCORE_POINTS, GAIN_ACHIEVEMENT, GAIN_HEARTS, BEST_FRIENDS, HIGH_SCORE, \
+    MULTIPLE_BEST_FRIENDS, ALL_VILLAGERS_HEARTS, MULTIPLE_MYTHEGGS, MAX_ITEMS, MYTHEGG
 
 def create_session(skip_post_save_signal=True):
     return Session.objects.create(skip_post_save_signal=skip_post_save_signal)
@@ -28,6 +43,40 @@ class ActionModelTests(TestCase):
 
         self.assertEqual(action.display_cost, '⚜️5')
 
+    def test_computes_digest_and_entity_info_up_front(self):
+        """
+        An action's digest, entity info & emoji are set as soon as it's built, from the ids of its targets
+        """
+        action = Action(action_type=Action.GIVE, description='Gift Rose to Sal', target_item_id=12, target_villager_id=3)
+
+        self.assertEqual(action.unique_digest, 'GIVE-12-3')
+        self.assertEqual(action.entity_id, '12')
+        self.assertEqual(action.entity_type, GIFT_ENTITY)
+        self.assertEqual(action.gift_receiver_id, 3)
+        self.assertEqual(action.emoji, Action.ACTION_EMOJIS[Action.GIVE])
+
+    def test_serializes_wait_class_display(self):
+        """
+        Serializing an action gives its wait class's display name
+        """
+        action = Action(action_type=Action.TRAVEL, description='Go North', target_place_id=2, cost_amount=60,
+                        cost_unit=Action.MIN, cost_wait_class=Action.MEDIUM)
+
+        serialized = action.serialize()
+
+        self.assertEqual(serialized['waitClass'], 'medium')
+        self.assertEqual(serialized['costType'], TIME_TYPE)
+        self.assertEqual(serialized['uniqueDigest'], 'TRAVEL-2')
+
+    def test_does_not_accept_unknown_attributes(self):
+        """
+        Actions are slotted, so misspelled attributes fail loudly instead of being silently ignored
+        """
+        action = Action(action_type=Action.SLEEP)
+
+        with self.assertRaises(AttributeError):
+            action.target_object = 'somewhere'
+
 
 class ClockModelTests(TestCase):
     def setUp(self):
@@ -91,6 +140,26 @@ class ClockModelTests(TestCase):
 
         self.assertEqual(self.clock.day, SUNDAY)
 
+    def test_advance_should_count_minutes_from_the_start_of_the_run(self):
+        """
+        advance should keep counting minutes up from the start of the run, marking it a new day across midnight
+        """
+        self.clock.advance(2*60*24)
+
+        self.assertEqual(self.clock.minute, 2*60*24 + 9*60)
+        self.assertTrue(self.clock.is_new_day)
+        self.assertFalse(self.clock.is_end_of_week)
+
+    def test_clock_should_be_at_end_of_week_after_the_last_day(self):
+        """
+        the clock should be at the end of the week once it passes midnight at the end of Sunday
+        """
+        self.clock.day = SUNDAY
+        self.clock.time = 23*60
+        self.clock.advance(2*60)
+
+        self.assertEqual(self.clock.day, MONDAY)
+        self.assertTrue(self.clock.is_end_of_week)
 
     def test_get_time_display_should_show_pm_if_time_is_after_12(self):
         """
@@ -165,3 +234,620 @@ class ClockModelTests(TestCase):
 
 
 
+
+
+class SessionAggregateTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        reset_catalog()
+        session = create_session(skip_post_save_signal=False)
+        session.populate_mythling_states()
+
+        self.session_key = session.key
+        self.load_query_count = 1 + SessionAggregate.QUERY_COUNT  # the session & its one-to-ones, then the aggregate
+
+    def test_loads_session_in_a_fixed_number_of_queries(self):
+        """
+        Loads the session and all its per-session rows in a fixed number of queries
+        """
+        get_catalog()
+
+        with self.assertNumQueries(self.load_query_count):
+            load_session_with_related_data(self.session_key)
+
+    def test_query_count_does_not_grow_with_the_world(self):
+        """
+        Takes the same number of queries to load however many places and villagers the world has
+        """
+        session = Session.objects.get(pk=self.session_key)
+
+        for i in range(5):
+            place = Place.objects.create(name=f'Nowheresville {i}', place_type=TOWN)
+            place_state = PlaceState.objects.create(session=session, place=place)
+            villager = Villager.objects.create(name=f'Nobody {i}')
+            VillagerState.objects.create(session=session, villager=villager, location_state=place_state)
+
+        get_catalog()
+
+        with self.assertNumQueries(self.load_query_count):
+            load_session_with_related_data(self.session_key)
+
+    def test_accessors_do_not_query_once_loaded(self):
+        """
+        Looks up place states, villager states, occupants and item tokens without going back to the database
+        """
+        session = load_session_with_related_data(self.session_key)
+        catalog = get_catalog()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(session.location_state.place_id, session.location.id)
+            list(session.local_item_tokens)
+            session.inventory.get_item_tokens()
+
+            for villager in catalog.villagers.values():
+                self.assertEqual(session.get_villager_state(villager).villager_id, villager.id)
+
+            for place_id in catalog.places:
+                for villager_state in session.aggregate.get_occupant_states(place_id):
+                    self.assertEqual(villager_state.location_state.place_id, place_id)
+
+    def test_keeps_occupants_indexed_as_villagers_move(self):
+        """
+        Moves villager states between the occupants of place states, keeping each place's in villager name order
+        """
+        session = load_session_with_related_data(self.session_key)
+        place_state = session.location_state
+        villager_states = list(session.aggregate.villager_states.values())
+
+        for villager_state in reversed(villager_states):
+            session.aggregate.move_villager(villager_state, place_state)
+
+        self.assertEqual(session.aggregate.get_occupant_states(place_state.place_id), villager_states)
+
+        session.aggregate.move_villager(villager_states[0], None)
+
+        self.assertEqual(session.aggregate.get_occupant_states(place_state.place_id), villager_states[1:])
+        self.assertIsNone(villager_states[0].location_state_id)
+
+    def test_serializes_items_and_villagers_without_querying_knowledge(self):
+        """
+        Serializes item prices & villager preferences from the hero's knowledge as loaded once, and keeps it in
+        step as the hero learns more
+        """
+        session = load_session_with_related_data(self.session_key)
+        catalog = get_catalog()
+
+        item_knowledge = next(k for k in catalog.knowledge.values() if k.item_type is not None)
+        villager_knowledge = next(k for k in catalog.knowledge.values() if k.villager_id is not None)
+        item = Item.objects.filter(item_type=item_knowledge.item_type, rarity=item_knowledge.rarity).first()
+        session.inventory.item_tokens.add(ItemToken.objects.create(session=session, item=item))
+        session.forget_aggregate()
+
+        session.aggregate.knowledge_keys  # loading the hero's knowledge is the one query it takes
+
+        with self.assertNumQueries(0):
+            [serialized_token] = custom_serialize(session.inventory.get_item_tokens())
+            serialized_states = custom_serialize(session.aggregate.villager_states.values())
+
+        self.assertIsNone(serialized_token['price'])
+        self.assertTrue(all(serialized['preferences'] is None for serialized in serialized_states))
+
+        session.learn_knowledge(item_knowledge.id, villager_knowledge.id)
+
+        with self.assertNumQueries(0):
+            [serialized_token] = custom_serialize(session.inventory.get_item_tokens())
+            serialized_villager = session.aggregate.get_villager_state(villager_knowledge.villager_id).serialize()
+
+        self.assertEqual(serialized_token['price'], item.price)
+        self.assertIsNotNone(serialized_villager['preferences'])
+
+    def test_forgetting_the_aggregate_reloads_it(self):
+        """
+        Reloads the per-session rows on next access after the aggregate is forgotten
+        """
+        session = load_session_with_related_data(self.session_key)
+        aggregate = session.aggregate
+
+        session.forget_aggregate()
+
+        self.assertIsNot(session.aggregate, aggregate)
+
+
+class MythlingPowersTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        session = create_session(skip_post_save_signal=False)
+        session.populate_mythling_states()
+        self.session = load_session_with_related_data(session.key)
+
+        self.mythegg_finder = MytheggFinder()
+        self.mythegg_powers = MytheggPowers()
+        self.spoopy_mythegg = get_catalog().mythlings_by_type[SPOOPY]
+
+    def award_spoopy_mythegg(self):
+        mythling_state = self.session.aggregate.get_mythling_state(self.spoopy_mythegg.id)
+        self.mythegg_finder.award_mythegg(self.session, self.session.inventory, self.spoopy_mythegg, mythling_state)
+
+    def test_finding_a_mythegg_gains_its_power(self):
+        """
+        Finding a mythegg sets its type's bit in the session's mythling powers, and nothing else's
+        """
+        self.award_spoopy_mythegg()
+
+        self.assertTrue(self.mythegg_powers.spoopy_active(self.session))
+        self.assertFalse(self.mythegg_powers.coral_active(self.session))
+        self.assertEqual(Session.objects.get(pk=self.session.key).mythling_powers, self.session.mythling_powers)
+
+    def test_giving_a_mythegg_away_loses_its_power(self):
+        """
+        Giving a mythegg away clears its type's bit in the session's mythling powers
+        """
+        self.award_spoopy_mythegg()
+        mythegg_token = self.session.inventory.item_tokens.get(item_id=self.spoopy_mythegg.id)
+
+        self.mythegg_finder.mark_mythegg_token_given_away(self.session, mythegg_token)
+
+        self.assertFalse(self.mythegg_powers.spoopy_active(self.session))
+        self.assertEqual(Session.objects.get(pk=self.session.key).mythling_powers, 0)
+
+    def test_power_checks_do_not_query(self):
+        """
+        Checking for a mythling power is a bit test on the session
+        """
+        with self.assertNumQueries(0):
+            self.mythegg_powers.spoopy_active(self.session)
+
+    def test_check_command_finds_and_fixes_masks_out_of_step(self):
+        """
+        check_mythling_powers reports sessions whose mythling powers don't match their mythling states, and
+        fixes them with --fix
+        """
+        MythlingState.objects.filter(session=self.session, mythling__mythling_type=CORAL).update(is_in_possession=True)
+
+        with self.assertRaises(CommandError):
+            call_command('check_mythling_powers', stdout=io.StringIO())
+
+        call_command('check_mythling_powers', fix=True, stdout=io.StringIO())
+
+        session = Session.objects.get(pk=self.session.key)
+        self.assertTrue(session.has_mythling_power(CORAL))
+        self.assertFalse(session.has_mythling_power(SPOOPY))
+        call_command('check_mythling_powers', stdout=io.StringIO())
+
+
+class AchievementTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        session = create_session(skip_post_save_signal=False)
+        self.session = load_session_with_related_data(session.key)
+        self.catalog = get_catalog()
+
+    def test_checks_without_queries_when_nothing_is_notched(self):
+        """
+        Once the hero's earned achievements are loaded, checking achievements that aren't completed doesn't query
+        """
+        self.session.aggregate.earned_achievement_ids
+        self.session.hero_state.score  # (which looks up the hero's settings)
+
+        with self.assertNumQueries(0):
+            count = Achievement.check_triggered_achievements(SCORE_POINTS, self.session, hero_state=self.session.hero_state)
+
+        self.assertEqual(count, 0)
+
+    def test_awards_newly_notched_achievements_once(self):
+        """
+        Awards achievements (& their knowledge) when they're completed, and skips them once they've been earned
+        """
+        self.session.hero_state.koin_earned, self.session.hero_state.hearts_earned = 10 ** 6, 10 ** 3
+        novice = min(self.catalog.achievement_checks_for(SCORE_POINTS), key=lambda pair: pair[0].threshold)[0]
+
+        count = Achievement.check_triggered_achievements(SCORE_POINTS, self.session, hero_state=self.session.hero_state)
+
+        self.assertEqual(count, len(self.catalog.achievement_checks_for(SCORE_POINTS)))
+        self.assertIn(novice.id, Hero.objects.get(pk=self.session.hero_id).earned_achievement_ids)
+        self.assertIn(novice.id, self.session.aggregate.earned_achievement_ids)
+        self.assertTrue(set(novice.unlocked_knowledge_ids) <= self.session.aggregate.knowledge_ids)
+
+        with self.assertNumQueries(0):
+            count = Achievement.check_triggered_achievements(SCORE_POINTS, self.session, hero_state=self.session.hero_state)
+
+        self.assertEqual(count, 0)
+
+    def test_keeps_earned_achievements_on_the_hero_row(self):
+        """
+        Reads the hero's earned achievements from their own row, as loaded with the session, and writes newly
+        earned ones back to it in a single update
+        """
+        achievement_ids = sorted(self.catalog.achievements)[:3]
+        Hero.objects.filter(pk=self.session.hero_id).update(earned_achievement_ids=achievement_ids[:2])
+        session = load_session_with_related_data(self.session.key)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(session.aggregate.earned_achievement_ids, set(achievement_ids[:2]))
+
+        with self.assertNumQueries(1):
+            session.hero.earn_achievements(achievement_ids[2], achievement_ids[0])
+
+        self.assertEqual(Hero.objects.get(pk=session.hero_id).earned_achievement_ids, achievement_ids)
+
+    def test_counts_villagers_hearts_as_affinities_change(self):
+        """
+        The hero state counts how many villagers are at each number of hearts as they go up & down
+        """
+        hero_state = self.session.hero_state
+
+        hero_state.move_villager_hearts(0, 5).move_villager_hearts(0, 2).move_villager_hearts(5, 3)
+
+        self.assertEqual([hero_state.count_villagers_with_hearts(hearts) for hearts in range(1, 6)], [2, 2, 1, 0, 0])
+        self.assertEqual(hero_state.count_villagers_with_hearts(0), 0)
+
+    def test_checks_hearts_across_villagers_from_the_counters(self):
+        """
+        Achievements for hearts across every villager go by the hero state's counters
+        """
+        hero_state = self.session.hero_state
+        villager_count = len(self.session.aggregate.villager_states)
+        for _ in range(villager_count - 1):
+            hero_state.move_villager_hearts(0, 5)
+
+        state = {'villager_state': MagicMock(), 'hero_state': hero_state, 'villager_count': villager_count,
+                 'clock': self.session.clock}
+        notched_types = lambda: {self.catalog.achievements[a_id].achievement_type
+                                 for a_id in self.session.aggregate.earned_achievement_ids}
+
+        Achievement.check_triggered_achievements(GAIN_HEARTS, self.session, **state)
+        self.assertIn(MULTIPLE_BEST_FRIENDS, notched_types())
+        self.assertNotIn(ALL_VILLAGERS_HEARTS, notched_types())
+
+        hero_state.move_villager_hearts(0, 1)
+        Achievement.check_triggered_achievements(GAIN_HEARTS, self.session, **state)
+        self.assertIn(ALL_VILLAGERS_HEARTS, notched_types())
+
+    def test_serializes_progress_towards_unearned_achievements(self):
+        """
+        Shows how far along the hero is with each achievement they're counting up towards, and leaves out the
+        ones they've earned
+        """
+        self.session.hero_state.mytheggs_found = 2
+        earned = next(a for a in self.catalog.achievements.values() if a.achievement_type == HIGH_SCORE)
+        self.session.aggregate.earned_achievement_ids.add(earned.id)
+        self.session.hero_state.score  # (which looks up the hero's settings)
+
+        with self.assertNumQueries(0):
+            progress = {p['id']: p['progress'] for p in custom_serialize(Achievement.get_progress(self.session))}
+
+        for achievement in self.catalog.achievements.values():
+            if achievement.achievement_type == MULTIPLE_MYTHEGGS:
+                self.assertEqual(progress[achievement.id], {'current': 2, 'threshold': achievement.threshold})
+
+        self.assertNotIn(earned.id, progress)
+        self.assertNotIn(next(a.id for a in self.catalog.achievements.values() if a.achievement_type == BEST_FRIENDS),
+                         progress)
+
+    def test_counts_achievements_notched_earlier_in_the_request(self):
+        """
+        Achievements for earning other achievements count the ones just notched, without going back to the database
+        """
+        best_friends_ids = [a.id for a in self.catalog.achievements.values() if a.achievement_type == BEST_FRIENDS]
+        self.session.aggregate.earned_achievement_ids.update(best_friends_ids)
+
+        count = Achievement.check_triggered_achievements(GAIN_ACHIEVEMENT, self.session)
+
+        self.assertEqual(count, 1)
+
+
+class UnitOfWorkTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        reset_catalog()
+        session = create_session(skip_post_save_signal=False)
+
+        self.session = load_session_with_related_data(session.key)
+        self.item = Item.objects.first()
+
+    def test_holds_back_saves_until_the_flush(self):
+        """
+        Holds back saves of existing rows until the unit of work flushes
+        """
+        with UnitOfWork():
+            self.session.wallet.money = 50
+            self.session.wallet.save()
+
+            self.assertEqual(Wallet.objects.get(pk=self.session.key).money, 0)
+
+        self.assertEqual(Wallet.objects.get(pk=self.session.key).money, 50)
+
+    def test_writes_each_object_once(self):
+        """
+        Writes an object saved several times with a single update
+        """
+        with CaptureQueriesContext(connection) as context:
+            with UnitOfWork():
+                for i in range(5):
+                    self.session.clock.advance(10).save()
+
+        updates = [query for query in context.captured_queries if query['sql'].startswith('UPDATE')]
+
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Clock.objects.get(pk=self.session.key).time, self.session.clock.time)
+
+    def test_validates_on_flush(self):
+        """
+        Validates models that validate on save when the unit of work flushes
+        """
+        with self.assertRaises(ValidationError):
+            with UnitOfWork():
+                self.session.clock.time = -1
+                self.session.clock.save()
+
+    def test_creates_messages_on_flush(self):
+        """
+        Creates new messages in bulk when the unit of work flushes
+        """
+        message_count = self.session.messages.count()
+
+        with UnitOfWork():
+            self.session.messages.create(text='Hello')
+            self.session.messages.create(text='Goodbye')
+
+            self.assertEqual(self.session.messages.count(), message_count)
+
+        self.assertEqual(list(self.session.messages.values_list('text', flat=True))[-2:], ['Hello', 'Goodbye'])
+
+    def test_moves_item_tokens_in_memory_then_on_flush(self):
+        """
+        Moves item tokens between prefetched containers straight away, and in the database on flush
+        """
+        item_token = ItemToken.objects.create(session=self.session, item=self.item)
+        self.session.inventory.item_tokens.add(item_token)
+        self.session = load_session_with_related_data(self.session.key)
+        location_state = self.session.location_state
+
+        with UnitOfWork():
+            self.session.inventory.remove_item_tokens(item_token)
+            location_state.add_item_tokens(item_token)
+
+            self.assertNotIn(item_token, self.session.inventory.get_item_tokens())
+            self.assertIn(item_token, location_state.get_item_tokens())
+            self.assertEqual(ItemToken.objects.get(pk=item_token.pk).inventory_id, self.session.inventory.pk)
+
+        moved_token = ItemToken.objects.get(pk=item_token.pk)
+        self.assertIsNone(moved_token.inventory_id)
+        self.assertEqual(moved_token.place_state_id, location_state.pk)
+
+    def test_moves_item_tokens_with_a_fixed_number_of_updates(self):
+        """
+        Writes item tokens moved between containers with two updates of their own rows (clearing their slots, then
+        filling them in), into the lowest open slots
+        """
+        item_tokens = [ItemToken.objects.create(session=self.session, item=self.item) for _ in range(3)]
+        self.session.inventory.add_item_tokens(*item_tokens)
+        self.session = load_session_with_related_data(self.session.key)
+        inventory, location_state = self.session.inventory, self.session.location_state
+        first_token, second_token, third_token = inventory.get_item_tokens()
+
+        with CaptureQueriesContext(connection) as context:
+            with UnitOfWork():
+                inventory.remove_item_tokens(first_token, third_token)
+                location_state.add_item_tokens(first_token, third_token)
+
+        writes = [query for query in context.captured_queries if query['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))]
+        moved_tokens = ItemToken.objects.filter(pk__in=[first_token.pk, third_token.pk])
+
+        self.assertEqual(len(writes), 2)
+        self.assertEqual([(token.place_state_id, token.slot) for token in moved_tokens],
+                         [(location_state.pk, 0), (location_state.pk, 1)])
+
+        with UnitOfWork():
+            location_state.remove_item_tokens(first_token)
+            inventory.add_item_tokens(first_token)
+
+        self.assertEqual(ItemToken.objects.get(pk=first_token.pk).slot, 0)
+        self.assertEqual(ItemToken.objects.get(pk=second_token.pk).slot, 1)
+
+    def test_hands_a_slot_on_within_one_flush(self):
+        """
+        Lets a token take the slot another one leaves in the same flush, though the database won't have two tokens
+        in one slot
+        """
+        waiting_token = ItemToken.objects.create(session=self.session, item=self.item)
+        leaving_token = ItemToken.objects.create(session=self.session, item=self.item)
+        self.session.inventory.add_item_tokens(leaving_token)
+        self.session = load_session_with_related_data(self.session.key)
+        inventory = self.session.inventory
+
+        with UnitOfWork():
+            inventory.remove_item_tokens(leaving_token)
+            inventory.add_item_tokens(waiting_token)
+
+        self.assertEqual((ItemToken.objects.get(pk=waiting_token.pk).slot, waiting_token.slot), (0, 0))
+        self.assertIsNone(ItemToken.objects.get(pk=leaving_token.pk).inventory_id)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ItemToken.objects.filter(pk=leaving_token.pk).update(inventory=inventory, slot=0)
+
+    def test_refuses_to_fill_a_container_past_max_items(self):
+        """
+        Won't put more than MAX_ITEMS tokens in a container, going by the tokens it has loaded
+        """
+        item_tokens = [ItemToken.objects.create(session=self.session, item=self.item) for _ in range(MAX_ITEMS + 1)]
+        self.session.inventory.add_item_tokens(*item_tokens[:MAX_ITEMS])
+        self.session = load_session_with_related_data(self.session.key)
+
+        with self.assertNumQueries(0):
+            with self.assertRaises(ValidationError):
+                self.session.inventory.add_item_tokens(item_tokens[MAX_ITEMS])
+
+        self.assertEqual(len(self.session.inventory.get_item_tokens()), MAX_ITEMS)
+        self.assertIsNone(ItemToken.objects.get(pk=item_tokens[MAX_ITEMS].pk).inventory_id)
+
+    def test_drops_pending_writes_of_deleted_rows(self):
+        """
+        Forgets a held-back save of a row that's deleted before the flush, and skips anything left without a pk
+        """
+        deleted_token = ItemToken.objects.create(session=self.session, item=self.item)
+        pkless_token = ItemToken.objects.create(session=self.session, item=self.item)
+
+        with UnitOfWork():
+            for item_token in [deleted_token, pkless_token]:
+                item_token.quantity = 2
+                item_token.save()
+
+            deleted_token.delete()
+
+            # (deleted behind the model's back, so it's still registered)
+            ItemToken.objects.filter(pk=pkless_token.pk).delete()
+            pkless_token.pk = None
+
+        self.assertFalse(ItemToken.objects.filter(session=self.session).exists())
+
+    def test_discards_writes_if_an_exception_escapes(self):
+        """
+        Throws away pending writes if an exception escapes the unit of work
+        """
+        with self.assertRaises(ValueError):
+            with UnitOfWork():
+                self.session.wallet.money = 50
+                self.session.wallet.save()
+                raise ValueError('oops')
+
+        self.assertEqual(Wallet.objects.get(pk=self.session.key).money, 0)
+
+    def test_saves_straight_through_without_a_unit_of_work(self):
+        """
+        Saves straight to the database when there's no unit of work
+        """
+        self.session.wallet.money = 50
+        self.session.wallet.save()
+
+        self.assertEqual(Wallet.objects.get(pk=self.session.key).money, 50)
+
+
+class ItemStackTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        session = create_session(skip_post_save_signal=False)
+
+        self.session = load_session_with_related_data(session.key)
+        self.item = Item.objects.exclude(item_type=MYTHEGG).first()
+
+    def test_stacks_tokens_of_the_same_item(self):
+        """
+        Adds a token onto a held stack of the same item, deleting it (or never saving it, if it's new), and starts a
+        new stack for anything that doesn't match
+        """
+        inventory = self.session.inventory
+        moved_token = ItemToken.objects.create(session=self.session, item=self.item)
+
+        inventory.stack_item_tokens(ItemToken(session=self.session, item=self.item))
+        inventory.stack_item_tokens(moved_token, ItemToken(session=self.session, item=self.item, bought_from_store=True))
+
+        stack, bought_token = inventory.get_item_tokens()
+        self.assertEqual((stack.count, bought_token.count), (2, 1))
+        self.assertFalse(ItemToken.objects.filter(pk=moved_token.pk).exists())
+        self.assertEqual(ItemToken.objects.filter(session=self.session).count(), 2)
+
+    def test_takes_some_off_a_stack(self):
+        """
+        Takes some of a stack as a token of their own, or the stack's own token once it's all of them
+        """
+        inventory = self.session.inventory
+        stack = ItemToken.objects.create(session=self.session, item=self.item, quantity=3)
+        inventory.add_item_tokens(stack)
+
+        taken_token = inventory.take_from_stack(stack)
+        inventory.use_up_from_stack(stack)
+
+        self.assertNotEqual(taken_token, stack)
+        self.assertEqual((taken_token.count, taken_token.inventory_id), (1, None))
+        self.assertEqual(ItemToken.objects.get(pk=stack.pk).quantity, None)
+
+        self.assertEqual(inventory.take_from_stack(stack), stack)
+        self.assertEqual(inventory.get_item_tokens(), [])
+
+
+class DirtyFieldsTests(TestCase):
+    fixtures = ['initial_data.json']
+
+    def setUp(self):
+        reset_catalog()
+        session = create_session(skip_post_save_signal=False)
+
+        self.session = load_session_with_related_data(session.key)
+
+    def test_skips_save_when_nothing_changed(self):
+        """
+        Skips the UPDATE entirely when no fields have changed since the last load
+        """
+        with self.assertNumQueries(0):
+            self.session.save()
+            self.session.clock.save()
+            self.session.wallet.save()
+
+    def test_writes_only_changed_fields(self):
+        """
+        Writes only the fields that changed, and not eg the session's fresh json
+        """
+        self.session.current_dialogue_id = None
+        self.session.game_over = True
+
+        with CaptureQueriesContext(connection) as context:
+            self.session.save()
+
+        sql = context.captured_queries[0]['sql']
+
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertIn('"game_over"', sql)
+        self.assertNotIn('"fresh"', sql)
+        self.assertTrue(Session.objects.get(pk=self.session.key).game_over)
+
+    def test_notices_in_place_changes_to_json_fields(self):
+        """
+        Counts in-place changes to a json field (like marking a model fresh) as a change
+        """
+        self.session.mark_fresh('clock')
+
+        self.assertEqual(self.session.get_dirty_fields(), ['fresh'])
+
+    def test_is_clean_after_saving(self):
+        """
+        Treats saved values as clean, so a second save doesn't write again
+        """
+        self.session.wallet.money = 10
+        self.session.wallet.save()
+
+        with self.assertNumQueries(0):
+            self.session.wallet.save()
+
+    def test_refresh_resets_what_counts_as_changed(self):
+        """
+        Compares against the refreshed values after refresh_from_db
+        """
+        wallet = self.session.wallet
+        Wallet.objects.filter(pk=wallet.pk).update(money=10)
+
+        wallet.refresh_from_db()
+        wallet.money = 0
+        wallet.save()
+
+        self.assertEqual(Wallet.objects.get(pk=wallet.pk).money, 0)
+
+    def test_unit_of_work_skips_unchanged_objects(self):
+        """
+        Leaves objects that were saved without changes out of the unit of work's flush
+        """
+        with CaptureQueriesContext(connection) as context:
+            with UnitOfWork():
+                self.session.save()
+                self.session.wallet.money = 10
+                self.session.wallet.save()
+
+        updates = [query['sql'] for query in context.captured_queries if query['sql'].startswith('UPDATE')]
+
+        self.assertEqual(len(updates), 1)
+        self.assertIn('mythgarden_wallet', updates[0])
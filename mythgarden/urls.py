@@ -10,5 +10,8 @@ urlpatterns = [
     path('settings', views.get_settings, name='get_settings'),
     path('settings/update', views.update_settings, name='update_settings'),
     path('kys', views.kys, name='kys'),
+    path('whereabouts', views.whereabouts, name='whereabouts'),
+    path('journeys', views.journeys, name='journeys'),
+    path('odds', views.odds, name='odds'),
     path('test_time/<int:time>/<str:day>', views.test_time, name='test_time')
 ]
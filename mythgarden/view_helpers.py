@@ -2,24 +2,27 @@ import json
 from typing import Iterable
 from django.core.validators import ValidationError
 
-from .game_logic import ActionGenerator, ActionValidator
-from .models import Session, FarmerPortrait
+from .catalog import get_catalog
+from .catalog.luck import get_luck_level, get_luck_percent, get_rarity_odds
+from .game_logic import ActionGenerator, ActionResolver, ActionValidator, MytheggFinder, MytheggPowers
+from .models import Session, FarmerPortrait, Clock, Achievement
 
 
 MODEL_LAMBDAS = {
-    'achievements': lambda session: session.hero.achievements.all(),
+    'achievements': lambda session: get_catalog().achievements_for_ids(session.aggregate.earned_achievement_ids),
+    'achievementProgress': lambda session: Achievement.get_progress(session),
     'actions': lambda session: ActionGenerator().get_actions_for_session(session),
-    'buildings': lambda session: session.location.buildings.all(),
+    'buildings': lambda session: get_catalog().buildings_in(session.location.id),
     'clock': lambda session: session.clock,
-    'dialogue': lambda session: session.current_dialogue,
-    'localItemTokens': lambda session: session.local_item_tokens.all(),
+    'dialogue': lambda session: session.current_dialogue_line,
+    'localItemTokens': lambda session: session.local_item_tokens,
     'hero': lambda session: session.hero_state,
-    'inventory': lambda session: session.inventory.item_tokens.all(),
+    'inventory': lambda session: session.inventory.get_item_tokens(),
     'messages': lambda session: session.messages.all(),
     'place': lambda session: session.location,
     'portraitUrls': lambda session: FarmerPortrait.get_gallery_portrait_urls(),
-    'speaker': lambda session: session.get_villager_state(session.current_dialogue.speaker),
-    'villagerStates': lambda session: session.occupant_states.all(),
+    'speaker': lambda session: session.get_villager_state(session.current_dialogue_line.speaker),
+    'villagerStates': lambda session: session.occupant_states,
     'wallet': lambda session: session.wallet,
 }
 
@@ -46,33 +49,28 @@ def retrieve_session(request):
 def ensure_state_objects_created(session):
     # populate_* methods create objects with session FK already set via bulk_create
     # No need to call .set() - the relationship is established during creation
-    if session.place_states.count() == 0:
+    if not session.aggregate.place_states:
         session.populate_place_states()
 
-    if session.villager_states.count() == 0:
-        place_states = list(session.place_states.all())
-        session.populate_villager_states(place_states)
+    if not session.aggregate.villager_states:
+        session.populate_villager_states(list(session.aggregate.place_states.values()))
 
-    if session.mythling_states.count() == 0:
+    if not session.aggregate.mythling_states:
         session.populate_mythling_states()
 
     return session
 
 
 def load_session_with_related_data(session_key):
-    one_to_one_session_relations = ['hero', '_location', 'hero_state', 'wallet', 'clock', 'inventory']
-    # many_to_many_session_relations = ['villager_states', 'place_states']
+    # world content (places, villagers, items, dialogue) comes from the in-process catalog, and the session's own rows
+    # come from its aggregate, so loading takes the same number of queries however big the world is
+    one_to_one_session_relations = ['hero', 'hero__settings', 'hero_state', 'wallet', 'clock', 'inventory']
 
-    session_data_queryset = Session.objects.select_related(*one_to_one_session_relations)
-    session_data_queryset = session_data_queryset.prefetch_related('inventory__item_tokens__item')
-
-    # session_data_queryset = session_data_queryset.prefetch_related(*many_to_many_session_relations)
-    session_data_queryset = session_data_queryset.prefetch_related('villager_states__villager__home', 'villager_states__location_state__place')
-    session_data_queryset = session_data_queryset.prefetch_related('place_states__place', 'place_states__item_tokens__item', 'place_states__occupants')
-
-    session = session_data_queryset.get(pk=session_key)
+    session = Session.objects.select_related(*one_to_one_session_relations).get(pk=session_key)
     session.clear_fresh()  # reset this every call
 
+    session.aggregate  # load every per-session row up front, in SessionAggregate.QUERY_COUNT queries
+
     return session
 
 
@@ -81,6 +79,7 @@ def get_home_models(session):
 
     home_model_keys = [
         'achievements',
+        'achievementProgress',
         'actions',
         'buildings',
         'clock',
@@ -100,6 +99,10 @@ def get_home_models(session):
 def get_fresh_models(session):
     """Returns a dictionary of models that have been updated on this call."""
 
+    # achievement progress goes by the hero state's counters, so it's sent again whenever they might have moved
+    if session.is_fresh('hero') or session.is_fresh('achievements'):
+        session.mark_fresh('achievementProgress')
+
     return get_models(session.get_fresh_keys(), session)
 
 
@@ -113,18 +116,91 @@ def get_models(model_keys, session):
 
 def get_requested_action(request, session):
     action_digest = json.loads(request.body)['uniqueDigest']
-    available_actions = ActionGenerator().get_actions_for_session(session)
+    requested_action = ActionResolver().resolve(action_digest, session)
 
-    try:
-        return [a for a in available_actions if a.unique_digest == action_digest][0]
-    except IndexError:
+    if requested_action is None:
         raise ValidationError("⚠️ Oops, that action isn't available")
 
+    return requested_action
+
 
 def get_serialized_messages(session):
     return custom_serialize(list(session.messages.all()))
 
 
+def get_villager_whereabouts(session):
+    """Where every villager is, and where they're off to next, by their schedules -- as of the last time events were
+    triggered, which is the point the session's villager states were last moved to"""
+    catalog = get_catalog()
+    clock = session.clock
+    settings = session.hero.settings if hasattr(session.hero, 'settings') else None
+    villagers_move = not settings or settings.villagers_move
+
+    minute = clock.last_triggered_minute
+
+    def serialize_place(place_id):
+        return {'id': place_id, 'name': catalog.places[place_id].name} if place_id else None
+
+    whereabouts = []
+    for villager in catalog.villagers.values():
+        next_move = catalog.villager_next_move(villager.id, minute, villagers_move)
+        next_day, next_time = Clock.convert_from_week_minute(next_move[0]) if next_move else (None, None)
+
+        whereabouts.append({
+            'id': villager.id,
+            'name': villager.name,
+            'place': serialize_place(catalog.villager_location_id(villager.id, minute, villagers_move)),
+            'next': {
+                'day': next_day,
+                'time': next_time,
+                'timeDisplay': Clock.convert_time_to_display(next_time),
+                'place': serialize_place(next_move[1]),
+            } if next_move else None,
+        })
+
+    return whereabouts
+
+
+def get_journeys(session):
+    """The journey action to every place the hero can't get to in one hop from where they are, worked out from the
+    catalog's place graph. Requested like any other action, by posting its digest to the action endpoint."""
+    action_generator = ActionGenerator()
+
+    journeys = action_generator.gen_journey_actions(session.location)
+
+    return custom_serialize(action_generator.apply_speed_boost(journeys, session.hero.boost_level))
+
+
+def get_hero_odds(session):
+    """The hero's luck, and what it does for them where they are right now: the odds of each rarity in general and
+    when gathering here, and the chance of finding the local mythegg (if they know of it & haven't found it yet)"""
+    catalog = get_catalog()
+    place = session.location
+
+    luck_bonus = MytheggPowers().gather_luck_bonus(session)
+    luck_level = get_luck_level(session.hero.luck_level, luck_bonus)
+
+    mythegg = catalog.mythegg_at(place.id)
+    mythegg_finder = MytheggFinder()
+    mythegg_odds = None
+    if mythegg and mythegg_finder.can_find_mythegg(session, mythegg):
+        mythegg_odds = {
+            'id': mythegg.id,
+            'name': mythegg.name,
+            'chance': mythegg_finder.get_mythegg_draw_chance(mythegg, session.hero_state, luck_level),
+        }
+
+    return {
+        'heroLuckLevel': session.hero.luck_level,
+        'luckBonus': luck_bonus,
+        'luckLevel': luck_level,
+        'luckPercent': get_luck_percent(luck_level),
+        'rarityOdds': get_rarity_odds(luck_level),
+        'gatherOdds': catalog.gather_rarity_odds(place.id, luck_level) if catalog.item_pool(place.id) else None,
+        'mytheggOdds': mythegg_odds,
+    }
+
+
 def validate_action(session, requested_action):
     av = ActionValidator()
     if not av.can_afford_action(session.wallet, requested_action):
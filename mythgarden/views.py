@@ -12,9 +12,10 @@ from django.views.decorators.csrf import ensure_csrf_cookie
 from django.conf import settings
 
 from .view_helpers import retrieve_session, ensure_state_objects_created, get_home_models, get_fresh_models, get_requested_action, get_serialized_messages, \
-    validate_action, custom_serialize, set_user_data, load_session_with_related_data
+    validate_action, custom_serialize, set_user_data, load_session_with_related_data, get_villager_whereabouts, \
+    get_hero_odds, get_journeys
 from .game_logic import ActionExecutor, EventOperator
-from .models import Session
+from .models import Session, UnitOfWork
 from .models import Achievement
 from .models import GameSettings
 
@@ -65,7 +66,8 @@ def action(request):
     try:
         requested_action = get_requested_action(request, session)
         validate_action(session, requested_action)
-        with transaction.atomic():
+        # the unit of work holds back the action's writes, then flushes them all together as the block ends
+        with transaction.atomic(), UnitOfWork():
             ActionExecutor().execute(requested_action, session)
             if session.is_fresh('clock'):
                 EventOperator().react_to_time_passing(session.clock, session)
@@ -131,6 +133,47 @@ def user_data(request):
     return JsonResponse({'hero': custom_serialize(session.hero_state), 'messages': get_serialized_messages(session)})
 
 
+def whereabouts(request):
+    """Endpoint for where everyone is right now, and where they're headed next. Worked out from the villager
+    schedules in the catalog, so it only needs the session's clock & settings."""
+    session_key = request.session.get('session_key')
+    if not session_key:
+        return HttpResponseRedirect(reverse('mythgarden:home'))
+
+    session = get_object_or_404(Session.objects.select_related('clock', 'hero__settings'), pk=session_key)
+
+    return JsonResponse({'villagers': get_villager_whereabouts(session)})
+
+
+def journeys(request):
+    """Endpoint for the places too far away to reach in one hop, with the journey action that gets the hero to each.
+    Only needs the session's location & the hero's speed boost, since routes come from the catalog."""
+    session_key = request.session.get('session_key')
+    if not session_key:
+        return HttpResponseRedirect(reverse('mythgarden:home'))
+
+    session = get_object_or_404(Session.objects.select_related('hero'), pk=session_key)
+
+    return JsonResponse({'journeys': get_journeys(session)})
+
+
+def odds(request):
+    """Debug endpoint for the hero's current luck, and the odds it gives them where they are"""
+    if not settings.DEBUG:
+        return HttpResponseNotFound()
+
+    session_key = request.session.get('session_key')
+    if not session_key:
+        return HttpResponseRedirect(reverse('mythgarden:home'))
+
+    try:
+        session = load_session_with_related_data(session_key)
+    except Session.DoesNotExist:
+        return HttpResponseNotFound()
+
+    return JsonResponse(get_hero_odds(session))
+
+
 def test_time(request, time, day):
     if not settings.DEBUG:
         return HttpResponseNotFound()
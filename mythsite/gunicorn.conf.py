@@ -0,0 +1,10 @@
+# Gunicorn settings (see start.sh)
+
+# import the app in the master, so the catalog can be loaded once before the workers fork off it
+preload_app = True
+
+
+def when_ready(server):
+    from mythgarden.catalog import preload_catalog
+
+    preload_catalog()
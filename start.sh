@@ -13,5 +13,8 @@ else
     echo "Data already exists ($ITEM_COUNT items), skipping fixtures."
 fi
 
+echo "Compiling world catalog..."
+python manage.py compile_catalog
+
 echo "Starting gunicorn..."
-exec gunicorn --bind :8000 --workers 2 mythsite.wsgi
+exec gunicorn --config mythsite/gunicorn.conf.py --bind :8000 --workers 2 mythsite.wsgi